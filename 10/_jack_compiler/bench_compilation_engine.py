@@ -0,0 +1,54 @@
+import argparse
+import io
+import resource
+import time
+import xml.dom.minidom as XML
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from compilation_engine import CompilationEngine
+from jack_tokenizer import JackTokenizer
+
+# Compares compiling a Jack class to indented XML directly against the former
+# minidom round-trip (flatten, parse, toprettyxml). Each variant runs in a
+# fresh worker process so that its peak RSS is not shared with the other.
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def direct_xml(code: str) -> str:
+    return CompilationEngine(JackTokenizer(code).iter_tokens()).get_compiled_xml()
+
+
+def minidom_xml(code: str) -> str:
+    output = io.StringIO()
+    CompilationEngine(JackTokenizer(code).iter_tokens()).write_xml(output)
+    xml = ''.join(line.strip() for line in output.getvalue().splitlines())
+    return XML.parseString(xml).toprettyxml(indent='  ')
+
+
+VARIANTS = {'direct': direct_xml, 'minidom': minidom_xml}
+
+
+def run_variant(name: str, code: str, repeat: int) -> tuple[float, int]:
+    compile_xml = VARIANTS[name]
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compile_xml(code)
+        best = min(best, time.perf_counter() - start)
+    # ru_maxrss is in kilobytes on Linux
+    return best, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='bench_compilation_engine.py')
+    arg_parser.add_argument('filename', nargs='?', default=(ROOT / '10' / 'Square' / 'SquareGame.jack').as_posix())
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    code = Path(args.filename).read_text()
+    for name in VARIANTS:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            seconds, max_rss = executor.submit(run_variant, name, code, args.repeat).result()
+        print(f'{name:8} {seconds * 1000:7.2f} ms, peak RSS {max_rss / 1024:.1f} MB')
@@ -0,0 +1,164 @@
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+# the VM translator, the assembler and the CPU emulator live in 8/
+sys.path.insert(0, (Path(__file__).resolve().parents[2] / '8').as_posix())
+
+from hack_assembler import assemble, clean_lines
+from hack_emulator import HackEmulator, compile_block
+from vm_os import SCREEN, KBD
+from vm_translator import VMClass, inline_functions, parse_lines, split_functions, translate_commands, translate_init
+
+from bench_native_os import STAND_IN_DIR, os_files
+from code_generator import CodeGenerator
+from compilation_engine import CompilationEngine
+from jack_tokenizer import JackTokenizer
+from vm_writer import VMWriter
+
+# Runs the 8/FunctionCalls programs and 11/Pong (linked with a Jack OS) on
+# the CPU emulator, once as translated and once with the small leaf functions
+# inlined, checks both leave the same results and counts the instructions
+# executed until the first jump into the final loop of Sys.init. Pong is run for a number of frames (calls of
+# PongGame.moveBall), with no key pressed.
+
+ROOT = Path(__file__).resolve().parents[2]
+MAX_CYCLES = 2_000_000_000
+
+# program -> the label it is run to: the final loop of Sys.init, or a frame of the game
+PROGRAMS = {
+    'FibonacciElement': 'Sys.init$END',
+    'NestedCall': 'Sys.init$LOOP',
+    'StaticsTest': 'Sys.init$END',
+    'InlineArguments': 'Sys.init$END',
+    'Pong': 'PongGame.moveBall',
+}
+
+# leaves that use their arguments out of order, whose results tell the arguments apart
+INLINE_ARGUMENTS = {
+    'Main': """
+        function Main.second 0
+        push argument 1
+        return
+        function Main.difference 0
+        push argument 1
+        push argument 0
+        sub
+        return
+        function Main.mix 0
+        push argument 2
+        push argument 0
+        sub
+        push argument 1
+        sub
+        return
+    """,
+    'Sys': """
+        function Sys.init 0
+        push constant 3
+        push constant 10
+        call Main.second 2
+        push constant 3
+        push constant 10
+        call Main.difference 2
+        push constant 20
+        push constant 5
+        push constant 2
+        call Main.mix 3
+        label END
+        goto END
+    """,
+}
+
+# what Pong uses of the classes that are still empty stubs in 12/ and
+# bench_native_os has no stand-in for
+PONG_STAND_IN_DIR = STAND_IN_DIR / 'pong'
+
+
+def compile_class(code: str, name: str) -> VMClass:
+    vm = io.StringIO()
+    CodeGenerator(VMWriter(vm)).visit(CompilationEngine(JackTokenizer(code, name=name).iter_tokens()).compile_class())
+    return (Path(name).stem, list(parse_lines(vm.getvalue().splitlines())))
+
+
+def load_classes(program: str) -> list[VMClass]:
+    if program == 'Pong':
+        pong_files = sorted((ROOT / '11' / 'Pong').glob('*.jack'))
+        return [compile_class(p.read_text(), p.as_posix()) for p in pong_files + os_files([STAND_IN_DIR, PONG_STAND_IN_DIR])]
+    if program == 'InlineArguments':
+        return [(name, list(parse_lines(code.splitlines()))) for name, code in INLINE_ARGUMENTS.items()]
+    directory = ROOT / '8' / 'FunctionCalls' / program
+    return [(p.stem, list(parse_lines(p.read_text().splitlines()))) for p in sorted(directory.glob('*.vm'))]
+
+
+def translate(classes: list[VMClass]) -> str:
+    return translate_init()[0] + ''.join(translate_commands(commands, name)[0] for name, commands in classes)
+
+
+def label_address(asm: str, label: str) -> int:
+    address = 0
+    for instruction in clean_lines(asm.split('\n')):
+        if instruction == f'({label})':
+            return address
+        if instruction[0] != '(':
+            address += 1
+    raise ValueError(f'no label {label}')
+
+
+def run_until(emulator: HackEmulator, address: int, times: int) -> float:
+    # runs block-compiled as HackEmulator.run_blocks does, until a block has ended
+    # with a jump to address for the given number of times
+    blocks = emulator.blocks
+    ram = emulator.ram
+    a, d, pc = emulator.a, emulator.d, emulator.pc
+    start = time.perf_counter()
+    while times:
+        block = blocks.get(pc)
+        if block is None:
+            block = blocks[pc] = compile_block(emulator.words, pc)
+        pc, a, d, executed = block[0](ram, a, d)
+        emulator.cycles += executed
+        if pc == address:
+            times -= 1
+        if emulator.cycles > MAX_CYCLES:
+            raise RuntimeError(f'did not get there in {MAX_CYCLES:,} instructions')
+    emulator.a, emulator.d, emulator.pc = a, d, pc
+    return time.perf_counter() - start
+
+
+def results(emulator: HackEmulator, classes: list[VMClass], program: str) -> list[int]:
+    if program == 'Pong':
+        return list(emulator.ram[SCREEN:KBD])
+    # THIS, THAT, temp and what Sys.init left on its stack
+    sys_init_locals = next(lines[0].arg2 for _, commands in classes for name, lines in split_functions(commands) if name == 'Sys.init')
+    return list(emulator.ram[3:13]) + list(emulator.ram[emulator.ram[1] + sys_init_locals:emulator.ram[0]])
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='bench_inline.py')
+    arg_parser.add_argument('programs', nargs='*', default=list(PROGRAMS), help=f'programs to run (default: {" ".join(PROGRAMS)})')
+    arg_parser.add_argument('--frames', type=int, default=100, help='frames of Pong to run')
+    args = arg_parser.parse_args()
+
+    differ = False
+    for program in args.programs:
+        classes = load_classes(program)
+        inlined_classes, inlined = inline_functions(classes)
+        runs = []
+        for build_classes in (classes, inlined_classes):
+            asm = translate(build_classes)
+            words = assemble(asm.split('\n'))
+            emulator = HackEmulator(words, jit=True)
+            seconds = run_until(emulator, label_address(asm, PROGRAMS[program]), args.frames if program == 'Pong' else 1)
+            runs.append((len(words), emulator.cycles, seconds, results(emulator, build_classes, program)))
+
+        (words, cycles, seconds, result), (inlined_words, inlined_cycles, inlined_seconds, inlined_result) = runs
+        calls = sum(len(class_inlined) for class_inlined in inlined)
+        differ |= result != inlined_result
+        print(f'{program}: {calls} calls inlined, {"same results" if result == inlined_result else "RESULTS DIFFER"}')
+        print(f'  translated {words:>7,} words {cycles:>13,} instructions {seconds:7.2f}s')
+        print(f'  inlined    {inlined_words:>7,} words {inlined_cycles:>13,} instructions {inlined_seconds:7.2f}s  {100 * (inlined_cycles - cycles) / cycles:+6.2f}%')
+    if differ:
+        sys.exit(1)
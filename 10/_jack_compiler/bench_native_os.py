@@ -0,0 +1,85 @@
+from typing import List
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+# the VM interpreter and the native OS live in 8/
+sys.path.insert(0, (Path(__file__).resolve().parents[2] / '8').as_posix())
+
+from vm_interpreter import VMInterpreter
+from vm_os import NativeOS, OS_CLASSES, SCREEN, KBD
+from vm_translator import ParsedLine, parse_lines
+
+from code_generator import CodeGenerator
+from compilation_engine import CompilationEngine
+from jack_tokenizer import JackTokenizer
+from vm_writer import VMWriter
+
+# Runs 12/MathTest and 12/ScreenTest on the VM interpreter with the OS classes
+# they exercise once as bytecode compiled from Jack and once native, and
+# checks both runs leave the same results in RAM. The classes that are still
+# empty stubs in 12/ are compiled from the stand-ins in bench_os/.
+
+OS_DIR = Path(__file__).resolve().parents[2] / '12'
+MAX_CYCLES = 100_000_000
+
+# the other classes are native in both runs
+BYTECODE_CLASSES = {
+    'MathTest': {'Math', 'Array'},
+    'ScreenTest': {'Screen', 'Math', 'Array'},
+}
+
+# Jack versions of the OS classes the bytecode runs need, in place of the 12/ stubs
+STAND_IN_DIR = Path(__file__).resolve().parent / 'bench_os'
+
+
+def os_files(stand_in_dirs: List[Path]) -> List[Path]:
+    # the 12/ classes, each replaced by its stand-in in the last of stand_in_dirs that has one
+    stand_ins = {path.stem: path for directory in stand_in_dirs for path in sorted(directory.glob('*.jack'))}
+    return [stand_ins.get(path.stem, path) for path in sorted(OS_DIR.glob('*.jack'))]
+
+
+def compile_classes(input_file_paths: List[Path]) -> list[tuple[str, list[ParsedLine]]]:
+    classes = []
+    for path in input_file_paths:
+        vm = io.StringIO()
+        tokens = JackTokenizer(path.read_text(), name=path.as_posix()).iter_tokens()
+        CodeGenerator(VMWriter(vm)).visit(CompilationEngine(tokens).compile_class())
+        classes.append((path.stem, list(parse_lines(vm.getvalue().splitlines()))))
+    return classes
+
+
+def run(classes: list[tuple[str, list[ParsedLine]]], native_classes: set[str]) -> tuple[VMInterpreter, float]:
+    interpreter = VMInterpreter(classes, bootstrap=True, native_os=NativeOS(native_classes))
+    start = time.perf_counter()
+    interpreter.run(MAX_CYCLES)
+    seconds = time.perf_counter() - start
+    if interpreter.halt_reason != 'Sys.halt':
+        raise RuntimeError(f'did not halt normally: {interpreter.halt_reason or "out of cycles"}')
+    return interpreter, seconds
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='bench_native_os.py')
+    arg_parser.add_argument('tests', nargs='*', default=list(BYTECODE_CLASSES), help=f'12/ tests to run (default: {" ".join(BYTECODE_CLASSES)})')
+    args = arg_parser.parse_args()
+
+    for test in args.tests:
+        classes = compile_classes([OS_DIR / test / 'Main.jack'] + os_files([STAND_IN_DIR]))
+        bytecode_classes = BYTECODE_CLASSES[test]
+        bytecode, bytecode_seconds = run(classes, set(OS_CLASSES) - bytecode_classes)
+        native, native_seconds = run(classes, set(OS_CLASSES))
+
+        if test == 'MathTest':
+            # the expected row of MathTest.cmp
+            compare_lines = (OS_DIR / test / 'MathTest.cmp').read_text().splitlines()
+            expected = [int(value) for value in compare_lines[1].strip('|').split('|')]
+            same = list(bytecode.ram[8000:8014]) == expected == list(native.ram[8000:8014])
+        else:
+            same = bytecode.ram[SCREEN:KBD] == native.ram[SCREEN:KBD]
+
+        print(f'{test}: {"same results" if same else "RESULTS DIFFER"}')
+        print(f'  bytecode {", ".join(sorted(bytecode_classes)):20} {bytecode.cycles:>9,} VM commands {bytecode_seconds * 1000:8.1f} ms')
+        print(f'  native   {"":20} {native.cycles:>9,} VM commands {native_seconds * 1000:8.1f} ms  {bytecode_seconds / native_seconds:6.1f}x')
@@ -0,0 +1,54 @@
+import argparse
+import time
+from pathlib import Path
+
+from jack_tokenizer import JackTokenizer, TokenizerMode
+
+# Tokenizes large Jack sources in both tokenizer modes, checks that the token
+# streams are identical and reports the speedup of the regex scanner. The
+# token streams of a few edge cases are compared too.
+
+ROOT = Path(__file__).resolve().parents[2]
+
+EDGE_CASES = {
+    'ends in a // comment': 'class A {}\n// end',
+    'ends in an unterminated /* comment': 'class A {}\n/* end',
+    'ends in a token': 'class A {}',
+}
+
+
+def load_sources() -> dict[str, str]:
+    sources = {'12/Output.jack': (ROOT / '12' / 'Output.jack').read_text()}
+    pong = sorted((ROOT / '11' / 'Pong').glob('*.jack'))
+    sources['11/Pong/*.jack'] = ''.join(p.read_text() for p in pong)
+    return sources
+
+
+def time_mode(code: str, mode: TokenizerMode, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        JackTokenizer(code, mode).tokenize()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='bench_tokenizer.py')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    for name, code in EDGE_CASES.items():
+        if JackTokenizer(code, 'regex').tokenize() != JackTokenizer(code, 'scan').tokenize():
+            print(f'{name}: token streams differ')
+            exit(1)
+
+    for name, code in load_sources().items():
+        tokens = JackTokenizer(code, 'regex').tokenize()
+        if tokens != JackTokenizer(code, 'scan').tokenize():
+            print(f'{name}: token streams differ')
+            exit(1)
+
+        scan = time_mode(code, 'scan', args.repeat)
+        regex = time_mode(code, 'regex', args.repeat)
+        print(f'{name}: {len(code)} chars, {len(tokens)} tokens, scan {scan * 1000:.1f} ms, regex {regex * 1000:.1f} ms ({scan / regex:.1f}x)')
@@ -0,0 +1,244 @@
+from typing import Dict, List
+from jack_ast import (
+    Visitor, Class, ClassVarDec, SubroutineDec, VarDec, Statement,
+    LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    Expression, IntegerConstant, StringConstant, KeywordConstant, VarTerm, SubroutineCall, ParenthesizedTerm, UnaryTerm,
+)
+from symbol_table import SymbolTable, Symbol, KIND_SEGMENTS
+from vm_writer import VMWriter, ArithmeticCommand
+
+# Jack -> VM code generation over the syntax tree, following the conventions
+# of the nand2tetris JackCompiler (label names, array and string handling).
+
+BINARY_COMMANDS: Dict[str, ArithmeticCommand] = {
+    '+': 'add',
+    '-': 'sub',
+    '&': 'and',
+    '|': 'or',
+    '<': 'lt',
+    '>': 'gt',
+    '=': 'eq',
+}
+# operators implemented by the OS
+BINARY_CALLS = {
+    '*': 'Math.multiply',
+    '/': 'Math.divide',
+}
+UNARY_COMMANDS: Dict[str, ArithmeticCommand] = {
+    '-': 'neg',
+    '~': 'not',
+}
+
+
+class CodeGenerator(Visitor):
+    writer: VMWriter
+    symbols: SymbolTable
+    class_name: str
+    subroutine_name: str
+    if_count: int
+    while_count: int
+
+    def __init__(self, writer: VMWriter):
+        super().__init__()
+        self.writer = writer
+        self.symbols = SymbolTable()
+        self.class_name = ''
+        self.subroutine_name = ''
+        self.if_count = 0
+        self.while_count = 0
+
+
+    def visit_Class(self, node: Class):
+        self.class_name = node.name
+        for var_dec in node.var_decs:
+            self.visit(var_dec)
+        for subroutine in node.subroutines:
+            self.visit(subroutine)
+
+
+    def visit_ClassVarDec(self, node: ClassVarDec):
+        for name in node.names:
+            self.symbols.define(name, node.type, node.kind)
+
+
+    def visit_SubroutineDec(self, node: SubroutineDec):
+        self.symbols.start_subroutine()
+        self.subroutine_name = node.name
+        self.if_count = 0
+        self.while_count = 0
+
+        if node.kind == 'method':
+            self.symbols.define('this', self.class_name, 'argument')
+        for parameter in node.parameters:
+            self.symbols.define(parameter.name, parameter.type, 'argument')
+        for var_dec in node.var_decs:
+            self.visit(var_dec)
+
+        self.writer.write_function(f'{self.class_name}.{node.name}', self.symbols.var_count('local'))
+        if node.kind == 'constructor':
+            self.writer.write_push('constant', self.symbols.var_count('field'))
+            self.writer.write_call('Memory.alloc', 1)
+            self.writer.write_pop('pointer', 0)
+        elif node.kind == 'method':
+            self.writer.write_push('argument', 0)
+            self.writer.write_pop('pointer', 0)
+
+        self.statements(node.statements)
+
+
+    def visit_VarDec(self, node: VarDec):
+        for name in node.names:
+            self.symbols.define(name, node.type, 'local')
+
+
+    def statements(self, statements: List[Statement]):
+        for statement in statements:
+            self.visit(statement)
+
+
+    def visit_LetStatement(self, node: LetStatement):
+        symbol = self.lookup(node.name)
+        if node.index is None:
+            self.visit(node.value)
+            self.writer.write_pop(KIND_SEGMENTS[symbol.kind], symbol.index)
+            return
+
+        # the value may itself use 'that', so the address is set only after it
+        self.push_variable(symbol)
+        self.visit(node.index)
+        self.writer.write_arithmetic('add')
+        self.visit(node.value)
+        self.writer.write_pop('temp', 0)
+        self.writer.write_pop('pointer', 1)
+        self.writer.write_push('temp', 0)
+        self.writer.write_pop('that', 0)
+
+
+    def visit_IfStatement(self, node: IfStatement):
+        count = self.if_count
+        self.if_count += 1
+
+        self.visit(node.condition)
+        self.writer.write_if(f'IF_TRUE{count}')
+        self.writer.write_goto(f'IF_FALSE{count}')
+        self.writer.write_label(f'IF_TRUE{count}')
+        self.statements(node.statements)
+        if node.else_statements is None:
+            self.writer.write_label(f'IF_FALSE{count}')
+            return
+        self.writer.write_goto(f'IF_END{count}')
+        self.writer.write_label(f'IF_FALSE{count}')
+        self.statements(node.else_statements)
+        self.writer.write_label(f'IF_END{count}')
+
+
+    def visit_WhileStatement(self, node: WhileStatement):
+        count = self.while_count
+        self.while_count += 1
+
+        self.writer.write_label(f'WHILE_EXP{count}')
+        self.visit(node.condition)
+        self.writer.write_arithmetic('not')
+        self.writer.write_if(f'WHILE_END{count}')
+        self.statements(node.statements)
+        self.writer.write_goto(f'WHILE_EXP{count}')
+        self.writer.write_label(f'WHILE_END{count}')
+
+
+    def visit_DoStatement(self, node: DoStatement):
+        self.visit(node.call)
+        self.writer.write_pop('temp', 0)
+
+
+    def visit_ReturnStatement(self, node: ReturnStatement):
+        if node.value is None:
+            self.writer.write_push('constant', 0)
+        else:
+            self.visit(node.value)
+        self.writer.write_return()
+
+
+    def visit_Expression(self, node: Expression):
+        self.visit(node.terms[0])
+        for operator, term in zip(node.operators, node.terms[1:]):
+            self.visit(term)
+            if operator in BINARY_CALLS:
+                self.writer.write_call(BINARY_CALLS[operator], 2)
+            else:
+                self.writer.write_arithmetic(BINARY_COMMANDS[operator])
+
+
+    def visit_IntegerConstant(self, node: IntegerConstant):
+        self.writer.write_push('constant', node.value)
+
+
+    def visit_StringConstant(self, node: StringConstant):
+        self.writer.write_push('constant', len(node.value))
+        self.writer.write_call('String.new', 1)
+        for c in node.value:
+            self.writer.write_push('constant', ord(c))
+            self.writer.write_call('String.appendChar', 2)
+
+
+    def visit_KeywordConstant(self, node: KeywordConstant):
+        match node.value:
+            case 'true':
+                self.writer.write_push('constant', 0)
+                self.writer.write_arithmetic('not')
+            case 'false' | 'null':
+                self.writer.write_push('constant', 0)
+            case 'this':
+                self.writer.write_push('pointer', 0)
+
+
+    def visit_VarTerm(self, node: VarTerm):
+        symbol = self.lookup(node.name)
+        self.push_variable(symbol)
+        if node.index is not None:
+            self.visit(node.index)
+            self.writer.write_arithmetic('add')
+            self.writer.write_pop('pointer', 1)
+            self.writer.write_push('that', 0)
+
+
+    def visit_SubroutineCall(self, node: SubroutineCall):
+        n_args = len(node.arguments)
+        if node.receiver is None:
+            # method of this object
+            self.writer.write_push('pointer', 0)
+            name = f'{self.class_name}.{node.name}'
+            n_args += 1
+        else:
+            symbol = self.symbols.lookup(node.receiver)
+            if symbol is None:
+                # function or constructor of a class
+                name = f'{node.receiver}.{node.name}'
+            else:
+                # method of the object in a variable
+                self.push_variable(symbol)
+                name = f'{symbol.type}.{node.name}'
+                n_args += 1
+
+        for argument in node.arguments:
+            self.visit(argument)
+        self.writer.write_call(name, n_args)
+
+
+    def visit_ParenthesizedTerm(self, node: ParenthesizedTerm):
+        self.visit(node.expression)
+
+
+    def visit_UnaryTerm(self, node: UnaryTerm):
+        self.visit(node.term)
+        self.writer.write_arithmetic(UNARY_COMMANDS[node.operator])
+
+
+    def push_variable(self, symbol: Symbol):
+        self.writer.write_push(KIND_SEGMENTS[symbol.kind], symbol.index)
+
+
+    def lookup(self, name: str) -> Symbol:
+        symbol = self.symbols.lookup(name)
+        if symbol is None:
+            raise ValueError(f'{self.class_name}.{self.subroutine_name}: undefined variable {name}')
+        return symbol
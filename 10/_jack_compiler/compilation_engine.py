@@ -1,488 +1,376 @@
-from jack_tokenizer import Token, JackTokenizer, TokenType, xml_to_tokens
-from typing import List, Literal, Any
-from dataclasses import dataclass
-import sys
-import textwrap
-import xml.dom.minidom as XML
-
-
-def escape_xml(value: str | int | None) -> str | int:
-    if isinstance(value, int):
-        return value
-    if value is None:
-        return ''
-    return (
-        value.replace("&", "&amp;")
-            .replace("<", "&lt;")
-            .replace(">", "&gt;")
-            .replace('"', "&quot;")
-            .replace("'", "&apos;")
-    )
+from jack_tokenizer import Token, xml_to_tokens, keyword, symbol, IDENTIFIER, INTEGER_CONSTANT, STRING_CONSTANT
+from xml_writer import XmlWriter, XmlVisitor
+from vm_writer import VMWriter
+from code_generator import CodeGenerator
+from jack_ast import (
+    Class, ClassVarDec, SubroutineDec, Parameter, VarDec, Type,
+    Statement, LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    Expression, Term, IntegerConstant, StringConstant, KeywordConstant, VarTerm, SubroutineCall, ParenthesizedTerm, UnaryTerm,
+)
+from typing import Iterable, List, TextIO
+from collections import deque
+import io
+
+
+# lexemes of token groups
+BINARY_OPERATORS = {symbol(op).lexeme for op in ['+', '-', '*', '/', '&', '|', '<', '>', '=']}
+UNARY_OPERATORS = {symbol(op).lexeme for op in ['-', '~']}
+KEYWORD_CONSTANTS = {keyword(value).lexeme for value in ['true', 'false', 'null', 'this']}
+CALL_SYMBOLS = {symbol(value).lexeme for value in ['.', '(']}
+SUBROUTINE_KINDS = [keyword('constructor'), keyword('function'), keyword('method')]
+CLASS_VAR_KINDS = [keyword('static'), keyword('field')]
+TYPE_KEYWORDS = [keyword('int'), keyword('char'), keyword('boolean')]
 
 
 class CompilationEngine():
-    tokens: List[Token]
+    tokens: Iterable[Token]
+    # lookahead of at most two tokens, current counts the consumed ones
+    buffer: deque[Token]
     current: int
 
-    indent: int
-
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
+    def __init__(self, tokens: Iterable[Token]):
+        self.tokens = iter(tokens)
+        self.buffer = deque()
         self.current = 0
-        self.indent = -2
         
 
-    def get_compiled_xml(self) -> str:
-        xml =  self.compile_class()
-        print(xml, sep='\n')
-        xml = xml.replace('\n', '')
-        pretty_xml = XML.parseString(xml.replace('', '')).toprettyxml(indent="  ")
-        return pretty_xml;
+    def write_xml(self, output: TextIO):
+        XmlVisitor(XmlWriter(output)).visit(self.compile_class())
 
 
-    def compile_class(self) -> str:
-        xml = '<class>\n'
-       
-        xml += self.__consume(Token('keyword', 'class'), "incorrect class")
-        xml += self.compile_identifier()
-        xml += self.__consume(Token('symbol', '{'), "incorrect class")
+    def get_compiled_xml(self) -> str:
+        output = io.StringIO()
+        self.write_xml(output)
+        return output.getvalue()
 
-        # classVarDec
-        xml += self.compile_class_var_dec()
 
-        # subroutineDec
-        xml += self.compile_subroutine()
+    def write_vm(self, output: TextIO):
+        CodeGenerator(VMWriter(output)).visit(self.compile_class())
 
-        xml += self.__consume(Token('symbol', '}'), "incorrect class")
 
-       
-        xml += '</class>\n'
-        return xml
-    
+    def compile_class(self) -> Class:
+        self.__consume(keyword('class'), "incorrect class")
+        name = self.compile_identifier()
+        self.__consume(symbol('{'), "incorrect class")
 
-    def compile_class_var_dec(self) -> str:
-        xml = ''
-        has_class_var_dec: bool = False
+        var_decs = []
+        while self.__check_any(CLASS_VAR_KINDS):
+            var_decs.append(self.compile_class_var_dec())
 
-        while True:
-            if self.__check_token(Token('keyword', 'static')):
-                xml += self.__consume(Token('keyword', 'static'), "incorrect class var dec")
-                    
-            elif self.__check_token(Token('keyword', 'field')):
-                xml += self.__consume(Token('keyword', 'field'), "incorrect class var dec")
-            
-            else:
-                break;
-            
-            has_class_var_dec = True
+        subroutines = []
+        while self.__check_any(SUBROUTINE_KINDS):
+            subroutines.append(self.compile_subroutine())
 
-            xml += self.compile_type()
-            xml += self.compile_identifier()
-
-            while self.__check_token(Token('symbol', ',')):
-                xml += self.__consume(Token('symbol', ','), "incorrect class var dec")
-                xml += self.compile_identifier()
-            
-            xml += self.__consume(Token('symbol', ';'), "incorrect class var dec")
-       
-        if has_class_var_dec:
-            xml = f'<varDec>\n{xml}</varDec>>\n'
-
-        return xml
+        self.__consume(symbol('}'), "incorrect class")
+        return Class(name, var_decs, subroutines)
     
 
-    def compile_subroutine(self) -> str:
-        xml = '<subroutineDec>\n'
-        while True:
-            if self.__check_token(Token('keyword', 'constructor')):
-                xml += self.__consume(Token('keyword', 'constructor'), "incorrect subroutine")
+    def compile_class_var_dec(self) -> ClassVarDec:
+        kind = self.__advance().value
+        type = self.compile_type()
+        names = [self.compile_identifier()]
 
-            elif self.__check_token(Token('keyword', 'function')):
-                xml += self.__consume(Token('keyword', 'function'), "incorrect subroutine")
+        while self.__check_token(symbol(',')):
+            self.__consume(symbol(','), "incorrect class var dec")
+            names.append(self.compile_identifier())
 
-            elif self.__check_token(Token('keyword', 'method')):
-                xml += self.__consume(Token('keyword', 'method'), "incorrect subroutine")
-
-            else:
-                break
-            
-            if self.__check_token(Token('keyword', 'void')):
-                xml += self.__consume(Token('keyword', 'void'), "incorrect subroutine")
-
-            elif self.__is_type():
-                self.compile_type()
-
-            xml += self.compile_identifier()
-
-            xml += self.__consume(Token('symbol', '('), "incorrect subroutine")
-            xml += self.compile_parameter_list()
-            xml += self.__consume(Token('symbol', ')'), "incorrect subroutine")
-
-            # subroutineBody
-            xml += '<subroutineBody>\n'
-            xml += self.__consume(Token('symbol', '{'), "incorrect subroutine body")
-            while self.__check_token(Token('keyword', 'var')):
-                xml += self.compile_var_dec()
-            xml += self.compile_statements()
-            xml += self.__consume(Token('symbol', '}'), "incorrect subroutine body")
-            xml += '</subroutineBody>\n'
-        
-        xml += '</subroutineDec>\n'
-        return xml
+        self.__consume(symbol(';'), "incorrect class var dec")
+        return ClassVarDec(kind, type, names)
     
 
-    def compile_parameter_list(self) -> str:
-        xml = '<parameterList>\n'
-        if self.__is_type():
-            xml += self.compile_type()
-            xml += self.compile_identifier()
-
-        while True:
-            if self.__check_token(Token('symbol', ',')):
-                xml += self.__consume(Token('symbol', ','), 'incorrect parameter list')
-                xml += self.compile_type()
-                xml += self.compile_identifier()
-            else:
-                break               
-
-        xml += '</parameterList>\n'
-        return xml
-
-
-    def compile_var_dec(self) -> str:
-        xml = ''
-
-        xml += '<varDec>\n'
-        xml += self.__consume(Token('keyword', 'var'), 'incorrect var dec')
-        xml += self.compile_type()
-        xml += self.compile_identifier()
-
-        while self.__check_token(Token('symbol', ',')):
-            xml += self.__consume(Token('symbol', ','), 'incorrect var dec')
-            xml += self.compile_identifier()
-
-        xml += self.__consume(Token('symbol', ';'), 'incorrect var dec')
-        xml += '</varDec>\n'
-            
-        return xml
-
-
-    def compile_statements(self) -> str:
-        xml = '<statements>\n'
-        while self.__has_next() and not self.__check_token(Token('symbol', '}')):
-            # let
-            if self.__check_token(Token('keyword', 'let')):
-                xml += self.compile_let()
-                continue
-            # if
-            elif self.__check_token(Token('keyword', 'if')):
-                xml +=  self.compile_if()
-                continue
-            # while
-            elif self.__check_token(Token('keyword', 'while')):
-                xml += self.compile_while()
-                continue
-            # do
-            elif self.__check_token(Token('keyword', 'do')):
-                xml += self.compile_do()
-                continue
-            # return
-            elif self.__check_token(Token('keyword', 'return')):
-                xml += self.comile_return()
-                continue
-
-            else:
-                self.__print_error(f'incorrect statements - token[{self.current}]: {self.__peek()}')
-
-        xml += '</statements>\n'
-        return xml
+    def compile_subroutine(self) -> SubroutineDec:
+        kind = self.__advance().value
 
+        if self.__check_token(keyword('void')):
+            return_type = self.__advance().value
+        else:
+            return_type = self.compile_type()
 
-    def compile_do(self) -> str:
-        xml = '<doStatement>\n'
-        xml += self.__consume(Token('keyword', 'do'), 'in correct do statement')
-        xml += self.compile_subroutine_call()
-        xml += self.__consume(Token('symbol', ';'), 'incorrect do statement')
-        xml += '</doStatement>\n'
-        return xml
-
+        name = self.compile_identifier()
 
-    def compile_let(self) -> str:   
-        xml = '<letStatement>\n'
+        self.__consume(symbol('('), "incorrect subroutine")
+        parameters = self.compile_parameter_list()
+        self.__consume(symbol(')'), "incorrect subroutine")
 
-        xml += self.__consume(Token('keyword', 'let'), "incorrect let statement 1")
+        # subroutineBody
+        self.__consume(symbol('{'), "incorrect subroutine body")
+        var_decs = []
+        while self.__check_token(keyword('var')):
+            var_decs.append(self.compile_var_dec())
+        statements = self.compile_statements()
+        self.__consume(symbol('}'), "incorrect subroutine body")
 
-        xml += self.compile_identifier()
+        return SubroutineDec(kind, return_type, name, parameters, var_decs, statements)
+    
 
-        if self.__check_token(Token('symbol', '[')):
-            xml += self.__consume(Token('symbol', '['), "incorrect let statement 2")
-            xml += self.compile_expression()
-            xml += self.__consume(Token('symbol', ']'), "incorrect let statement 3")
+    def compile_parameter_list(self) -> List[Parameter]:
+        parameters = []
+        if self.__is_type():
+            parameters.append(Parameter(self.compile_type(), self.compile_identifier()))
 
-        xml += self.__consume(Token('symbol', '='), "incorrect let statement 4")
-        xml += self.compile_expression()
-        xml += self.__consume(Token('symbol', ';'), "incorrect let statement 5")
+            while self.__check_token(symbol(',')):
+                self.__consume(symbol(','), 'incorrect parameter list')
+                parameters.append(Parameter(self.compile_type(), self.compile_identifier()))
 
-        xml += '</letStatement>\n'
-        return xml
+        return parameters
 
 
-    def compile_while(self) -> str:
-        xml = '<whileStatement>\n'
+    def compile_var_dec(self) -> VarDec:
+        self.__consume(keyword('var'), 'incorrect var dec')
+        type = self.compile_type()
+        names = [self.compile_identifier()]
 
-        xml += self.__consume(Token('keyword', 'while'), "incorrect while statement")
+        while self.__check_token(symbol(',')):
+            self.__consume(symbol(','), 'incorrect var dec')
+            names.append(self.compile_identifier())
 
-        xml += self.__consume(Token('symbol', '('), "incorrect while statement")
-        xml += self.compile_expression()
-        xml += self.__consume(Token('symbol', ')'), "incorrect while statement")
+        self.__consume(symbol(';'), 'incorrect var dec')
+        return VarDec(type, names)
 
-        xml += self.__consume(Token('symbol', '{'), "incorrect while statement")
-        xml += self.compile_statements()
-        xml += self.__consume(Token('symbol', '}'), "incorrect while statement")
 
-        xml += '</whileStatement>\n'
-        return xml
+    def compile_statements(self) -> List[Statement]:
+        statements: List[Statement] = []
+        while not self.__check_token(symbol('}')):
+            if self.__check_token(keyword('let')):
+                statements.append(self.compile_let())
+            elif self.__check_token(keyword('if')):
+                statements.append(self.compile_if())
+            elif self.__check_token(keyword('while')):
+                statements.append(self.compile_while())
+            elif self.__check_token(keyword('do')):
+                statements.append(self.compile_do())
+            elif self.__check_token(keyword('return')):
+                statements.append(self.compile_return())
+            else:
+                self.__print_error(f'incorrect statements - token[{self.current}]: {self.__peek()}')
+        return statements
 
 
-    def comile_return(self) -> str:
-        xml = '<returnStatement>\n'
+    def compile_do(self) -> DoStatement:
+        self.__consume(keyword('do'), 'in correct do statement')
+        call = self.compile_subroutine_call()
+        self.__consume(symbol(';'), 'incorrect do statement')
+        return DoStatement(call)
 
-        xml += self.__consume(Token('keyword', 'return'), "incorrect return statement")
 
-        if not self.__check_token(Token('symbol', ';')):
-             xml += self.compile_expression()
+    def compile_let(self) -> LetStatement:
+        self.__consume(keyword('let'), "incorrect let statement")
+        name = self.compile_identifier()
 
-        xml += self.__consume(Token('symbol', ';'), "incorrect return statement")
-       
+        index = None
+        if self.__check_token(symbol('[')):
+            self.__consume(symbol('['), "incorrect let statement")
+            index = self.compile_expression()
+            self.__consume(symbol(']'), "incorrect let statement")
 
-        xml += '</returnStatement>\n'
-        return xml
+        self.__consume(symbol('='), "incorrect let statement")
+        value = self.compile_expression()
+        self.__consume(symbol(';'), "incorrect let statement")
+        return LetStatement(name, index, value)
 
 
-    def compile_if(self) -> str:
-        xml = '<ifStatement>\n'
+    def compile_while(self) -> WhileStatement:
+        self.__consume(keyword('while'), "incorrect while statement")
 
-        xml += self.__consume(Token('keyword', 'if'), "incorrect if statement")
-        xml += self.__consume(Token('symbol', '('), "incorrect if statement")
-        xml += self.compile_expression()
-        xml += self.__consume(Token('symbol', ')'), "incorrect if statement")
+        self.__consume(symbol('('), "incorrect while statement")
+        condition = self.compile_expression()
+        self.__consume(symbol(')'), "incorrect while statement")
 
-        xml += self.__consume(Token('symbol', '{'), "incorrect if statement")
-        xml += self.compile_statements()
-        xml += self.__consume(Token('symbol', '}'), "incorrect if statement")
+        self.__consume(symbol('{'), "incorrect while statement")
+        statements = self.compile_statements()
+        self.__consume(symbol('}'), "incorrect while statement")
+        return WhileStatement(condition, statements)
 
-        if (self.__check_token(Token('keyword', 'else'))):
-            xml += self.__consume(Token('keyword', 'else'), "incorrect if statement")
-            xml += self.__consume(Token('symbol', '{'), "incorrect if statement")
-            xml += self.compile_statements()
-            xml += self.__consume(Token('symbol', '}'), "incorrect if statement")
 
-        xml += '</ifStatement>\n'
-        return xml
+    def compile_return(self) -> ReturnStatement:
+        self.__consume(keyword('return'), "incorrect return statement")
 
+        value = None
+        if not self.__check_token(symbol(';')):
+            value = self.compile_expression()
 
-    def compile_expression(self) -> str:
-        xml = '<expression>\n'
-        
-        xml += self.compile_term()
+        self.__consume(symbol(';'), "incorrect return statement")
+        return ReturnStatement(value)
 
-        while self.__peek().value in ['+', '-', '*', '/', '&', '|', '<', '>', '=']:
-            if self.__check_token(Token('symbol', '+')):
-                xml += self.__consume(Token('symbol', '+'), 'incorrect expression')
 
-            elif self.__check_token(Token('symbol', '-')):
-                xml += self.__consume(Token('symbol', '-'), 'incorrect expression')
+    def compile_if(self) -> IfStatement:
+        self.__consume(keyword('if'), "incorrect if statement")
+        self.__consume(symbol('('), "incorrect if statement")
+        condition = self.compile_expression()
+        self.__consume(symbol(')'), "incorrect if statement")
 
-            elif self.__check_token(Token('symbol', '*')):
-                xml += self.__consume(Token('symbol', '*'), 'incorrect expression')
+        self.__consume(symbol('{'), "incorrect if statement")
+        statements = self.compile_statements()
+        self.__consume(symbol('}'), "incorrect if statement")
 
-            elif self.__check_token(Token('symbol', '/')):
-                xml += self.__consume(Token('symbol', '/'), 'incorrect expression')
+        else_statements = None
+        if self.__check_token(keyword('else')):
+            self.__consume(keyword('else'), "incorrect if statement")
+            self.__consume(symbol('{'), "incorrect if statement")
+            else_statements = self.compile_statements()
+            self.__consume(symbol('}'), "incorrect if statement")
 
-            elif self.__check_token(Token('symbol', '&')):
-                xml += self.__consume(Token('symbol', '&'), 'incorrect expression')
+        return IfStatement(condition, statements, else_statements)
 
-            elif self.__check_token(Token('symbol', '|')):
-                xml += self.__consume(Token('symbol', '|'), 'incorrect expression')
 
-            elif self.__check_token(Token('symbol', '<')):
-                xml += self.__consume(Token('symbol', '<'), 'incorrect expression')
+    def compile_expression(self) -> Expression:
+        terms = [self.compile_term()]
+        operators = []
 
-            elif self.__check_token(Token('symbol', '>')):
-                xml += self.__consume(Token('symbol', '>'), 'incorrect expression')
+        while self.__peek().lexeme in BINARY_OPERATORS:
+            operators.append(self.__advance().value)
+            terms.append(self.compile_term())
 
-            elif self.__check_token(Token('symbol', '=')):
-                xml += self.__consume(Token('symbol', '='), 'incorrect expression')
+        return Expression(terms, operators)
 
-            else:
-                self.__print_error('incorrect expression')
 
-            xml += self.compile_term()
+    def compile_term(self) -> Term:
+        token = self.__peek()
 
-        xml += '</expression>\n'
-        return xml
+        if token.kind == INTEGER_CONSTANT:
+            return IntegerConstant(self.__advance().value)
 
+        if token.kind == STRING_CONSTANT:
+            return StringConstant(self.__advance().value)
 
-    def compile_term(self) -> str:
-        xml = '<term>\n'
-        # intergerConstant, stringConstant, keywordConstant
-        if self.__peek().type in ['integerConstant', 'stringConstant'] \
-            or (self.__peek().type == 'keyword' and self.__peek().value in ['true', 'false', 'null', 'this']):
-            token = self.__advance()
-            xml += f'<{token.type}> {escape_xml(token.value)} </{token.type}>'
+        if token.lexeme in KEYWORD_CONSTANTS:
+            return KeywordConstant(self.__advance().value)
 
         # subroutineCall
-        elif self.__peek_next().type == 'symbol' and self.__peek_next().value in ['.', '(']:
-            xml += self.compile_subroutine_call()
+        if token.kind == IDENTIFIER and self.__peek_next().lexeme in CALL_SYMBOLS:
+            return self.compile_subroutine_call()
 
         # varName | varName '[' expression ']'
-        elif self.__peek().type == 'identifier':
-            xml += self.compile_identifier()
-            if self.__check_token(Token('symbol', '[')):
-                xml += self.__consume(Token('symbol', '['), "incorrect let statement")
-                xml += self.compile_expression()
-                xml += self.__consume(Token('symbol', ']'), "incorrect let statement")    
+        if token.kind == IDENTIFIER:
+            name = self.compile_identifier()
+            index = None
+            if self.__check_token(symbol('[')):
+                self.__consume(symbol('['), "incorrect term")
+                index = self.compile_expression()
+                self.__consume(symbol(']'), "incorrect term")
+            return VarTerm(name, index)
 
         # '(' expression ')'
-        elif self.__check_token(Token('symbol', '(')):
-            xml += self.__consume(Token('symbol', '('), 'incorrect term')
-            xml += self.compile_expression()
-            xml += self.__consume(Token('symbol', ')'), 'incorrect term')
+        if self.__check_token(symbol('(')):
+            self.__consume(symbol('('), 'incorrect term')
+            expression = self.compile_expression()
+            self.__consume(symbol(')'), 'incorrect term')
+            return ParenthesizedTerm(expression)
 
         # unaryOp term
-        elif self.__peek().type == 'symbol' and self.__peek().value in ['-', '~']:
-            token = self.__advance()
-            xml += f'<{token.type}> {escape_xml(token.value)} </{token.type}>'
-            xml += self.compile_term()
+        if token.lexeme in UNARY_OPERATORS:
+            operator = self.__advance().value
+            return UnaryTerm(operator, self.compile_term())
         
-        else:           
-            self.__print_error(f'incorrect term - token[{self.current}]: {self.__peek()}')
-
-        xml += '</term>\n'
-        return xml
+        self.__print_error(f'incorrect term - token[{self.current}]: {token}')
 
 
-    def compile_expression_list(self) -> str:
-        xml = '<expressionList>\n'
+    def compile_expression_list(self) -> List[Expression]:
+        expressions = []
 
-        if not self.__check_token(Token('symbol', ')')):
-            xml += self.compile_expression()
-            while self.__check_token(Token('symbol', ',')):
-                xml += self.__consume(Token('symbol', ','), 'incorrect expression list')
-                xml += self.compile_expression()
+        if not self.__check_token(symbol(')')):
+            expressions.append(self.compile_expression())
+            while self.__check_token(symbol(',')):
+                self.__consume(symbol(','), 'incorrect expression list')
+                expressions.append(self.compile_expression())
                 
-        xml += '</expressionList>\n'
-        return xml
+        return expressions
     
 
-    def compile_subroutine_call(self) -> str:
-        xml = ''
+    def compile_subroutine_call(self) -> SubroutineCall:
+        receiver = None
+        name = self.compile_identifier()
 
-        xml += self.compile_identifier()
+        if self.__check_token(symbol('.')):
+            self.__consume(symbol('.'), 'incorrect subroutine call')
+            receiver, name = name, self.compile_identifier()
 
-        if self.__check_token(Token('symbol', '(')):
-            xml += self.__consume(Token('symbol', '('), 'incorrect subroutine call')
-            xml += self.compile_expression_list()
-            xml += self.__consume(Token('symbol', ')'), 'incorrect subroutine call')
-        
-        elif self.__check_token(Token('symbol', '.')):
-            xml += self.__consume(Token('symbol', '.'), 'incorrect subroutine call')
-            xml += self.compile_identifier()
-            xml += self.__consume(Token('symbol', '('), 'incorrect subroutine call')
-            xml += self.compile_expression_list()
-            xml += self.__consume(Token('symbol', ')'), 'incorrect subroutine call')
-
-        return xml
+        self.__consume(symbol('('), 'incorrect subroutine call')
+        arguments = self.compile_expression_list()
+        self.__consume(symbol(')'), 'incorrect subroutine call')
+        return SubroutineCall(receiver, name, arguments)
     
 
-    def compile_type(self) -> str:
-        xml = ''
-        if self.__check_token(Token('keyword', 'int')):
-            xml += self.__consume(Token('keyword', 'int'), "incorrect type")
-        
-        elif self.__check_token(Token('keyword', 'char')):
-            xml += self.__consume(Token('keyword', 'char'), "incorrect type")
-
-        elif self.__check_token(Token('keyword', 'boolean')):
-            xml += self.__consume(Token('keyword', 'boolean'), "incorrect type")
-
-        else:
-            xml += self.compile_identifier()
-
-        return xml
+    def compile_type(self) -> Type:
+        if self.__check_any(TYPE_KEYWORDS):
+            return self.__advance().value
+        return self.compile_identifier()
     
 
     def compile_identifier(self) -> str:
-        xml = ''
-        if self.__check_token_type('identifier'):
-            token = self.__advance()
-            xml += f'<identifier> {escape_xml(token.value)} </identifier>\n'
-        else:
+        if self.__peek().kind != IDENTIFIER:
             self.__print_error(f"! incorrect identifier")
-        return xml
+        return self.__advance().value
 
 
-    def __consume(self, token: Token, error: str) -> str:
+    def __consume(self, token: Token, error: str) -> Token:
+        # token is a keyword/symbol pattern
         if not self.__check_token(token):
             self.__print_error(f"! Error: expected: {token}, actual: {self.__peek()} - {error}")
-        self.current += 1
-        return f'<{token.type}> {escape_xml(token.value)} </{token.type}>\n'
+        return self.__advance()
             
 
-    def __has_next(self) -> bool:
-        return self.current + 1 < len(self.tokens)
+    def __fill(self, size: int) -> bool:
+        while len(self.buffer) < size:
+            token = next(self.tokens, None)
+            if token is None:
+                return False
+            self.buffer.append(token)
+        return True
     
 
     def __peek(self) -> Token:
-        return self.tokens[self.current]
+        if not self.__fill(1):
+            self.__print_error(f'unexpected end of tokens - token[{self.current}]')
+        return self.buffer[0]
     
 
     def __peek_next(self) -> Token:
-        return self.tokens[self.current + 1]
+        if not self.__fill(2):
+            self.__print_error(f'unexpected end of tokens - token[{self.current + 1}]')
+        return self.buffer[1]
     
     
     def __check_token(self, token: Token) -> bool:
-        return self.__peek() == token
-    
+        # token is a keyword/symbol pattern, lexemes are interned
+        return self.__peek().lexeme is token.lexeme
+
 
-    def __check_token_type(self, type: TokenType) -> bool:
-        return self.__peek().type == type
+    def __check_any(self, tokens: List[Token]) -> bool:
+        lexeme = self.__peek().lexeme
+        return any(lexeme is token.lexeme for token in tokens)
 
     
     def __advance(self) -> Token:
         token = self.__peek()
+        self.buffer.popleft()
         self.current += 1
         return token
     
+
     def __is_type(self) -> bool:
-        return self.__check_token(Token('keyword', 'int')) \
-            or self.__check_token(Token('keyword', 'char')) \
-            or self.__check_token(Token('keyword', 'boolean')) \
-            or self.__check_token_type('identifier');
+        return self.__check_any(TYPE_KEYWORDS) or self.__peek().kind == IDENTIFIER
     
 
     def __print_error(self, error: str):
+        if self.buffer:
+            error = f'{self.buffer[0].location()}: {error}'
         raise ValueError(error)
-        # print(error)
-
-
-    def __with_indent(self, xml: str) -> str:
-        return textwrap.indent(xml, prefix=' ' * self.indent)
 
 
 
 if __name__ == '__main__':
     # ce = CompilationEngine([
-    #     Token('keyword', 'class'),
+    #     keyword('class'),
     #     Token('identifier', 'Ping'),
-    #     Token('symbol', '{'),
-    #     Token('keyword', 'field'),
-    #     Token('keyword', 'int'),
+    #     symbol('{'),
+    #     keyword('field'),
+    #     keyword('int'),
     #     Token('identifier', 'x'),
-    #     Token('symbol', ','),
+    #     symbol(','),
     #     Token('identifier', 'y'),
-    #     Token('symbol', ';'),
-    #     Token('symbol', '}'),
+    #     symbol(';'),
+    #     symbol('}'),
     # ])
     ce = CompilationEngine(xml_to_tokens("""
 
@@ -631,4 +519,4 @@ if __name__ == '__main__':
 
 
     """))
-    print(ce.get_compiled_xml())
\ No newline at end of file
+    print(ce.get_compiled_xml(), end='')
\ No newline at end of file
@@ -1,44 +1,113 @@
-from typing import List, Literal, Any
+from typing import Iterable, List, TextIO
 from dataclasses import dataclass
+import argparse
+import glob
+import io
 import sys
-from jack_tokenizer import Token, JackTokenizer
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from jack_tokenizer import Token, JackTokenizer, TokenizerMode
+from compilation_engine import CompilationEngine
+from xml_writer import XmlWriter
+
+
+def write_tokens_xml(tokens: Iterable[Token], output: TextIO):
+    writer = XmlWriter(output, step='')
+    writer.start('tokens')
+    for token in tokens:
+        writer.leaf(token.type, token.value)
+    writer.end('tokens')
 
 
 class JackAnalyzer():
     tokenizer: JackTokenizer
 
-    def __init__(self, code: str):
-        self.tokenizer = JackTokenizer(code)
+    def __init__(self, code: str, mode: TokenizerMode = 'regex', name: str = '<string>'):
+        self.tokenizer = JackTokenizer(code, mode, name)
 
 
     def get_tokens(self) -> List[Token]:
-        tokens = []
-        while self.tokenizer.has_next():
-            token = self.tokenizer.scan_token()
-            if token is not None:
-                tokens.append(token)
-        self.tokenizer.reset()
-        return tokens
+        return self.tokenizer.tokenize()
     
 
+    def write_tokens_xml(self, output: TextIO):
+        write_tokens_xml(self.tokenizer.iter_tokens(), output)
+
+
     def get_tokens_xml(self) -> str:
-        tokens_xml = '<tokens>\n'
+        output = io.StringIO()
+        self.write_tokens_xml(output)
+        return output.getvalue()
+
+
 
-        for token in self.get_tokens():
-            tokens_xml += f'   <{token.type}>{token.value if token.value is not None else ""}</{token.type}>\n'
-        tokens_xml += '</tokens>'
+@dataclass
+class AnalyzeResult:
+    input_file_path: str
+    passed: bool
+    seconds: float
+    message: str = ''
 
-        return tokens_xml
 
+def analyze_file(input_file_path: str, mode: TokenizerMode = 'regex', output_dir: str | None = None) -> AnalyzeResult:
+    # writes Xxx.xml and XxxT.xml next to Xxx.jack, or into output_dir, from
+    # the same tokens
+    start = time.perf_counter()
+    path = Path(input_file_path)
+    directory = Path(output_dir) if output_dir is not None else path.parent
+    try:
+        tokens = JackTokenizer(path.read_text(), mode, path.as_posix()).tokenize()
+        with open(directory / f'{path.stem}T.xml', 'w') as f:
+            write_tokens_xml(tokens, f)
+        with open(directory / f'{path.stem}.xml', 'w') as f:
+            CompilationEngine(tokens).write_xml(f)
+    except Exception as e:
+        return AnalyzeResult(input_file_path, False, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+    return AnalyzeResult(input_file_path, True, time.perf_counter() - start)
+
+
+def find_jack_files(patterns: list[str]) -> list[str]:
+    input_file_paths: list[str] = []
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            input_file_paths += sorted(p.as_posix() for p in path.rglob('*.jack'))
+        elif path.is_file():
+            input_file_paths.append(path.as_posix())
+        else:
+            input_file_paths += sorted(p for p in glob.glob(pattern, recursive=True) if p.endswith('.jack'))
+    return input_file_paths
 
 
 if __name__ == '__main__':
-    filepath = sys.argv[1]
-    with open(filepath, 'r') as f:
-        code = f.read()
-        ce = JackAnalyzer(code)
-        tokens_xml = ce.get_tokens_xml()
-        print(tokens_xml)
-
-        # tokens = ce.get_tokens()
-        # print(*tokens, sep='\n')
+    arg_parser = argparse.ArgumentParser(prog='jack_analyzer.py')
+    arg_parser.add_argument('paths', nargs='+', help='.jack file (prints its tokens), or .jack files, directories and globs to analyze')
+    arg_parser.add_argument('--scan', action='store_true', help='use the char-by-char tokenizer')
+    arg_parser.add_argument('--jobs', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    arg_parser.add_argument('--output-dir', default=None, help='write the .xml files here instead of next to the sources')
+    args = arg_parser.parse_args()
+    mode: TokenizerMode = 'scan' if args.scan else 'regex'
+
+    if len(args.paths) == 1 and args.paths[0].endswith('.jack') and Path(args.paths[0]).is_file():
+        with open(args.paths[0], 'r') as f:
+            JackAnalyzer(f.read(), mode, args.paths[0]).write_tokens_xml(sys.stdout)
+        sys.exit(0)
+
+    start = time.perf_counter()
+    input_file_paths = find_jack_files(args.paths)
+    if not input_file_paths:
+        print(f'No .jack files in: {" ".join(args.paths)}')
+        sys.exit(1)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = list(executor.map(analyze_file, input_file_paths, repeat(mode), repeat(args.output_dir)))
+
+    for result in results:
+        print(f'{"OK  " if result.passed else "FAIL"} {result.input_file_path} ({result.seconds * 1000:.1f} ms)')
+        if result.message:
+            print(f'    {result.message}')
+
+    failed = sum(not result.passed for result in results)
+    print(f'{len(results) - failed} analyzed, {failed} failed in {time.perf_counter() - start:.2f}s')
+    sys.exit(1 if failed else 0)
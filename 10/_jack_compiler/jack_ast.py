@@ -0,0 +1,257 @@
+from typing import Any, Callable, List, Literal
+
+# Typed syntax tree of a Jack class, built by CompilationEngine.
+# Back ends (XML, VM code) walk it with a Visitor.
+
+ClassVarKind = Literal['static', 'field']
+SubroutineKind = Literal['constructor', 'function', 'method']
+KeywordConstantValue = Literal['true', 'false', 'null', 'this']
+
+# 'int', 'char', 'boolean', a class name, or 'void' for return types
+Type = str
+
+PRIMITIVE_TYPES = {'int', 'char', 'boolean', 'void'}
+
+
+class Node:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+# expressions
+
+class Term(Node):
+    __slots__ = ()
+
+
+class Expression(Node):
+    # terms[0] operators[0] terms[1] operators[1] ... evaluated left to right
+    __slots__ = ('terms', 'operators')
+
+    terms: List[Term]
+    operators: List[str]
+
+    def __init__(self, terms: List[Term], operators: List[str]):
+        self.terms = terms
+        self.operators = operators
+
+
+class IntegerConstant(Term):
+    __slots__ = ('value',)
+
+    value: int
+
+    def __init__(self, value: int):
+        self.value = value
+
+
+class StringConstant(Term):
+    __slots__ = ('value',)
+
+    value: str
+
+    def __init__(self, value: str):
+        self.value = value
+
+
+class KeywordConstant(Term):
+    __slots__ = ('value',)
+
+    value: KeywordConstantValue
+
+    def __init__(self, value: KeywordConstantValue):
+        self.value = value
+
+
+class VarTerm(Term):
+    # name or name[index]
+    __slots__ = ('name', 'index')
+
+    name: str
+    index: Expression | None
+
+    def __init__(self, name: str, index: Expression | None = None):
+        self.name = name
+        self.index = index
+
+
+class SubroutineCall(Term):
+    # name(...), or receiver.name(...) where receiver is a variable or a class
+    __slots__ = ('receiver', 'name', 'arguments')
+
+    receiver: str | None
+    name: str
+    arguments: List[Expression]
+
+    def __init__(self, receiver: str | None, name: str, arguments: List[Expression]):
+        self.receiver = receiver
+        self.name = name
+        self.arguments = arguments
+
+
+class ParenthesizedTerm(Term):
+    __slots__ = ('expression',)
+
+    expression: Expression
+
+    def __init__(self, expression: Expression):
+        self.expression = expression
+
+
+class UnaryTerm(Term):
+    __slots__ = ('operator', 'term')
+
+    operator: str
+    term: Term
+
+    def __init__(self, operator: str, term: Term):
+        self.operator = operator
+        self.term = term
+
+
+# statements
+
+class Statement(Node):
+    __slots__ = ()
+
+
+class LetStatement(Statement):
+    __slots__ = ('name', 'index', 'value')
+
+    name: str
+    index: Expression | None
+    value: Expression
+
+    def __init__(self, name: str, index: Expression | None, value: Expression):
+        self.name = name
+        self.index = index
+        self.value = value
+
+
+class IfStatement(Statement):
+    __slots__ = ('condition', 'statements', 'else_statements')
+
+    condition: Expression
+    statements: List[Statement]
+    else_statements: List[Statement] | None
+
+    def __init__(self, condition: Expression, statements: List[Statement], else_statements: List[Statement] | None):
+        self.condition = condition
+        self.statements = statements
+        self.else_statements = else_statements
+
+
+class WhileStatement(Statement):
+    __slots__ = ('condition', 'statements')
+
+    condition: Expression
+    statements: List[Statement]
+
+    def __init__(self, condition: Expression, statements: List[Statement]):
+        self.condition = condition
+        self.statements = statements
+
+
+class DoStatement(Statement):
+    __slots__ = ('call',)
+
+    call: SubroutineCall
+
+    def __init__(self, call: SubroutineCall):
+        self.call = call
+
+
+class ReturnStatement(Statement):
+    __slots__ = ('value',)
+
+    value: Expression | None
+
+    def __init__(self, value: Expression | None):
+        self.value = value
+
+
+# declarations
+
+class ClassVarDec(Node):
+    __slots__ = ('kind', 'type', 'names')
+
+    kind: ClassVarKind
+    type: Type
+    names: List[str]
+
+    def __init__(self, kind: ClassVarKind, type: Type, names: List[str]):
+        self.kind = kind
+        self.type = type
+        self.names = names
+
+
+class VarDec(Node):
+    __slots__ = ('type', 'names')
+
+    type: Type
+    names: List[str]
+
+    def __init__(self, type: Type, names: List[str]):
+        self.type = type
+        self.names = names
+
+
+class Parameter(Node):
+    __slots__ = ('type', 'name')
+
+    type: Type
+    name: str
+
+    def __init__(self, type: Type, name: str):
+        self.type = type
+        self.name = name
+
+
+class SubroutineDec(Node):
+    __slots__ = ('kind', 'return_type', 'name', 'parameters', 'var_decs', 'statements')
+
+    kind: SubroutineKind
+    return_type: Type
+    name: str
+    parameters: List[Parameter]
+    var_decs: List[VarDec]
+    statements: List[Statement]
+
+    def __init__(self, kind: SubroutineKind, return_type: Type, name: str, parameters: List[Parameter], var_decs: List[VarDec], statements: List[Statement]):
+        self.kind = kind
+        self.return_type = return_type
+        self.name = name
+        self.parameters = parameters
+        self.var_decs = var_decs
+        self.statements = statements
+
+
+class Class(Node):
+    __slots__ = ('name', 'var_decs', 'subroutines')
+
+    name: str
+    var_decs: List[ClassVarDec]
+    subroutines: List[SubroutineDec]
+
+    def __init__(self, name: str, var_decs: List[ClassVarDec], subroutines: List[SubroutineDec]):
+        self.name = name
+        self.var_decs = var_decs
+        self.subroutines = subroutines
+
+
+class Visitor():
+    # visit(node) calls visit_<NodeClass>(node); the lookup is cached per class
+    methods: dict[type, Callable[[Node], Any]]
+
+    def __init__(self):
+        self.methods = {}
+
+
+    def visit(self, node: Node) -> Any:
+        method = self.methods.get(type(node))
+        if method is None:
+            method = self.methods[type(node)] = getattr(self, f'visit_{type(node).__name__}')
+        return method(node)
@@ -0,0 +1,189 @@
+from typing import Iterable, Iterator, List, Literal, TextIO
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from itertools import chain
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+# the VM translator and the assembler live in 8/
+sys.path.insert(0, (Path(__file__).resolve().parents[2] / '8').as_posix())
+
+from hack_assembler import assemble, to_hack
+from vm_translator import CodeWriter, ParsedLine, TranslatorOptions, VMClass, inline_functions, prune_functions, translate_command, translate_commands, translate_init
+
+from code_generator import CodeGenerator
+from compilation_engine import CompilationEngine
+from jack_analyzer import find_jack_files, write_tokens_xml
+from jack_ast import Class
+from jack_tokenizer import Token, JackTokenizer
+from vm_writer import VMWriter, CommandSink
+from xml_writer import XmlVisitor, XmlWriter
+
+# Builds Jack classes into a Hack program in one process:
+# tokens -> syntax tree -> VM commands -> assembly -> machine words, all in
+# memory. Without --prune/--inline every class streams through the stages on
+# its own; the assembler takes the whole program, for its label pass. An
+# intermediate format is written to disk, or formatted as text at all, only
+# when it is asked for.
+
+Stage = Literal['tokens', 'xml', 'vm', 'asm', 'hack']
+STAGES: List[Stage] = ['tokens', 'xml', 'vm', 'asm', 'hack']
+
+
+@dataclass
+class BuildResult:
+    words: List[int]
+    # VM functions defined by the program and the ones it calls without defining
+    functions: set[str] = field(default_factory=set)
+    undefined: set[str] = field(default_factory=set)
+    # functions left out as unreachable from Sys.init
+    dropped: List[str] = field(default_factory=list)
+    # the callee of every inlined call
+    inlined: List[str] = field(default_factory=list)
+
+
+def record_function(line: ParsedLine, defined: set[str], called: set[str]) -> ParsedLine:
+    if line.command == 'C_FUNCTION':
+        defined.add(line.arg1)
+    elif line.command == 'C_CALL':
+        called.add(line.arg1)
+    return line
+
+
+def compile_classes(input_file_paths: List[str], output_dir: Path, emit: frozenset[Stage]) -> Iterator[tuple[str, Class]]:
+    # one class at a time; Xxx.jack intermediates are named after their class
+    # and written to output_dir
+    for input_file_path in input_file_paths:
+        path = Path(input_file_path)
+        tokens: Iterable[Token] = JackTokenizer(path.read_text(), name=path.as_posix()).iter_tokens()
+        if 'tokens' in emit:
+            # kept for the engine too
+            tokens = list(tokens)
+            with open(output_dir / f'{path.stem}T.xml', 'w') as f:
+                write_tokens_xml(tokens, f)
+
+        tree = CompilationEngine(tokens).compile_class()
+        if 'xml' in emit:
+            with open(output_dir / f'{path.stem}.xml', 'w') as f:
+                XmlVisitor(XmlWriter(f)).visit(tree)
+        yield path.stem, tree
+
+
+def generate_vm(vm_class_name: str, tree: Class, output_dir: Path, emit: frozenset[Stage], on_command: CommandSink):
+    with open(output_dir / f'{vm_class_name}.vm', 'w') if 'vm' in emit else nullcontext() as vm:
+        CodeGenerator(VMWriter(vm, on_command)).visit(tree)
+
+
+def translate_streamed(trees: Iterable[tuple[str, Class]], output_dir: Path, emit: frozenset[Stage], options: TranslatorOptions, defined: set[str], called: set[str]) -> Iterator[str]:
+    # every command is translated as soon as it is generated
+    for vm_class_name, tree in trees:
+        output = io.StringIO()
+        writer = CodeWriter(output, vm_class_name=vm_class_name, options=options)
+        generate_vm(vm_class_name, tree, output_dir, emit, lambda command, arg1, arg2: translate_command(writer, record_function(ParsedLine(command, arg1, arg2), defined, called)))
+        writer.close()
+        yield output.getvalue()
+
+
+def fragment_lines(fragments: Iterable[str], asm: TextIO | None) -> Iterator[str]:
+    # the assembly of one class at a time, written to asm too when there is one
+    for fragment in fragments:
+        if asm is not None:
+            asm.write(fragment)
+        yield from fragment.split('\n')
+
+
+def build(input_file_paths: List[str], output_dir: Path, program_name: str, emit: frozenset[Stage] = frozenset({'hack'}), options: TranslatorOptions = TranslatorOptions(), prune: bool = False, inline: bool = False) -> BuildResult:
+    # the program itself is <program_name>.asm/.hack
+    defined: set[str] = set()
+    called: set[str] = {'Sys.init'}
+    inlined: List[str] = []
+    dropped: List[str] = []
+
+    trees = compile_classes(input_file_paths, output_dir, emit)
+    fragments: Iterable[str]
+    if not (inline or prune):
+        fragments = translate_streamed(trees, output_dir, emit, options, defined, called)
+    else:
+        # inlining and pruning look at the whole program, its commands are collected first
+        classes: List[VMClass] = []
+        for vm_class_name, tree in trees:
+            commands: List[ParsedLine] = []
+            generate_vm(vm_class_name, tree, output_dir, emit, lambda command, arg1, arg2: commands.append(ParsedLine(command, arg1, arg2)))
+            classes.append((vm_class_name, commands))
+
+        if inline:
+            classes, inlined_per_class = inline_functions(classes)
+            inlined = [function_name for class_inlined in inlined_per_class for function_name in class_inlined]
+        if prune:
+            classes, dropped_per_class = prune_functions(classes)
+            dropped = [function_name for class_dropped in dropped_per_class for function_name in class_dropped]
+        fragments = (
+            translate_commands((record_function(line, defined, called) for line in commands), vm_class_name, options)[0]
+            for vm_class_name, commands in classes
+        )
+
+    asm_path = output_dir / f'{program_name}.asm'
+    try:
+        with open(asm_path, 'w') if 'asm' in emit else nullcontext() as asm:
+            words = assemble(fragment_lines(chain([translate_init(options)[0]], fragments), asm))
+    except ValueError:
+        # no half-written program is left behind
+        if 'asm' in emit:
+            asm_path.unlink(missing_ok=True)
+        raise
+    if 'hack' in emit:
+        (output_dir / f'{program_name}.hack').write_text(to_hack(words))
+
+    return BuildResult(words, defined, called - defined, dropped, inlined)
+
+
+def find_os_files(os_dir: str, input_file_paths: List[str]) -> List[str]:
+    # the program's own classes take precedence over the OS ones
+    classes = {Path(p).stem for p in input_file_paths}
+    return [p.as_posix() for p in sorted(Path(os_dir).glob('*.jack')) if p.stem not in classes]
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='jack_build.py')
+    arg_parser.add_argument('paths', nargs='+', help='.jack files, directories and globs making up the program')
+    arg_parser.add_argument('--os', default=None, metavar='DIR', help='link the .jack classes in DIR (e.g. 12/) the program does not define itself')
+    arg_parser.add_argument('--emit', nargs='+', choices=STAGES, default=['hack'], help='formats to write to disk (default: hack)')
+    arg_parser.add_argument('--output-dir', default=None, help='where to write (default: the directory of the first path)')
+    arg_parser.add_argument('--compact', action='store_true')
+    arg_parser.add_argument('--peephole', action='store_true')
+    arg_parser.add_argument('--shared-compare', action='store_true')
+    arg_parser.add_argument('--prune', action='store_true', help='leave out the functions not reachable from Sys.init')
+    arg_parser.add_argument('--inline', action='store_true', help='replace the calls to small leaf functions by their bodies')
+    args = arg_parser.parse_args()
+    options = TranslatorOptions(compact=args.compact, optimize=args.peephole, shared_compare=args.shared_compare)
+
+    input_file_paths = find_jack_files(args.paths)
+    if not input_file_paths:
+        print(f'No .jack files in: {" ".join(args.paths)}')
+        sys.exit(1)
+    if args.os is not None:
+        input_file_paths += find_os_files(args.os, input_file_paths)
+
+    first = Path(args.paths[0])
+    program_dir = first if first.is_dir() else Path(input_file_paths[0]).parent
+    output_dir = Path(args.output_dir) if args.output_dir is not None else program_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    try:
+        result = build(input_file_paths, output_dir, program_dir.resolve().name, frozenset(args.emit), options, args.prune, args.inline)
+    except ValueError as e:
+        print(f'Error: {e}')
+        sys.exit(1)
+
+    print(f'{len(input_file_paths)} classes, {len(result.functions)} functions, {len(result.words)} words in {(time.perf_counter() - start) * 1000:.0f} ms')
+    if result.inlined:
+        print(f'inlined {len(result.inlined)} calls to {len(set(result.inlined))} functions')
+    if result.dropped:
+        print(f'pruned {len(result.dropped)} unreachable functions: {", ".join(result.dropped)}')
+    if result.undefined:
+        print(f'undefined functions: {", ".join(sorted(result.undefined))}')
+        sys.exit(1)
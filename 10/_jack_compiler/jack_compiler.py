@@ -0,0 +1,53 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+from compilation_engine import CompilationEngine
+from jack_analyzer import AnalyzeResult, find_jack_files
+from jack_tokenizer import JackTokenizer, TokenizerMode
+
+# Compiles .jack classes to .vm files for 8/vm_translator.py.
+
+
+def compile_file(input_file_path: str, mode: TokenizerMode = 'regex', output_dir: str | None = None) -> AnalyzeResult:
+    # writes Xxx.vm next to Xxx.jack, or into output_dir
+    start = time.perf_counter()
+    path = Path(input_file_path)
+    directory = Path(output_dir) if output_dir is not None else path.parent
+    try:
+        engine = CompilationEngine(JackTokenizer(path.read_text(), mode, path.as_posix()).iter_tokens())
+        with open(directory / f'{path.stem}.vm', 'w') as f:
+            engine.write_vm(f)
+    except Exception as e:
+        return AnalyzeResult(input_file_path, False, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+    return AnalyzeResult(input_file_path, True, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='jack_compiler.py')
+    arg_parser.add_argument('paths', nargs='+', help='.jack files, directories and globs to compile')
+    arg_parser.add_argument('--scan', action='store_true', help='use the char-by-char tokenizer')
+    arg_parser.add_argument('--jobs', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    arg_parser.add_argument('--output-dir', default=None, help='write the .vm files here instead of next to the sources')
+    args = arg_parser.parse_args()
+    mode: TokenizerMode = 'scan' if args.scan else 'regex'
+
+    start = time.perf_counter()
+    input_file_paths = find_jack_files(args.paths)
+    if not input_file_paths:
+        print(f'No .jack files in: {" ".join(args.paths)}')
+        sys.exit(1)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = list(executor.map(compile_file, input_file_paths, repeat(mode), repeat(args.output_dir)))
+
+    for result in results:
+        print(f'{"OK  " if result.passed else "FAIL"} {result.input_file_path} ({result.seconds * 1000:.1f} ms)')
+        if result.message:
+            print(f'    {result.message}')
+
+    failed = sum(not result.passed for result in results)
+    print(f'{len(results) - failed} compiled, {failed} failed in {time.perf_counter() - start:.2f}s')
+    sys.exit(1 if failed else 0)
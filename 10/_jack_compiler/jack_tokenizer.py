@@ -1,47 +1,217 @@
-from typing import List, Literal, Any, cast
-from dataclasses import dataclass
+from typing import Iterator, List, Literal, cast, get_args
+from bisect import bisect_left
+import re
 import sys
 import xml.etree.ElementTree as ET
 
 
+TokenType = Literal['keyword', 'symbol', 'identifier', 'integerConstant', 'stringConstant']
+TokenizerMode = Literal['regex', 'scan']
 
+KEYWORDS = {'class', 'constructor', 'method', 'function', 'field', 'static', 'var', 'int', 'char', 'boolean', 'void', 'true', 'false', 'null', 'this', 'let', 'do', 'if', 'else', 'while', 'return'}
+SYMBOLS = {'{', '}', '(', ')', '[', ']', '.', ',', ';', '+', '-', '*', '/', '&', '|', '<', '>', '=', '~'}
 
+# one alternative per token kind, tried in the same order as scan_token;
+# leading whitespace is swallowed by the match itself, and whatever starts
+# no token (a stray character, a string constant without its closing quote
+# on the same line) is an error
+TOKEN_PATTERN = re.compile(r'''
+    [ \n\t\r]*
+  (?:
+    (?P<comment> //[^\n]* | /\*.*?(?:\*/|\Z) )
+  | (?P<symbol> [{}()\[\].,;+\-*/&|<>=~] )
+  | (?P<integerConstant> \d+ )
+  | (?P<stringConstant> "[^"\n]*" )
+  | (?P<identifier> [A-Za-z_]\w* )
+  | (?P<error> [^ \n\t\r] )
+  )
+''', re.VERBOSE | re.DOTALL | re.ASCII)
+
+DIGITS = frozenset('0123456789')
+IDENTIFIER_START = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_')
+IDENTIFIER_CHARS = IDENTIFIER_START | DIGITS
+
+# token type codes, index into TOKEN_TYPES
+TOKEN_TYPES: tuple[TokenType, ...] = get_args(TokenType)
+KEYWORD, SYMBOL, IDENTIFIER, INTEGER_CONSTANT, STRING_CONSTANT = range(len(TOKEN_TYPES))
+
+
+class Source:
+    # the code shared by all tokens of a file, lines are found by bisecting
+    # the offsets of its newlines
+    __slots__ = ('name', 'code', 'newlines')
+
+    name: str
+    code: str
+    newlines: List[int] | None
 
-TokenType = Literal['keyword', 'symbol', 'identifier', 'integerConstant', 'stringConstant']
+    def __init__(self, code: str, name: str = '<string>'):
+        self.name = name
+        self.code = code
+        self.newlines = None
 
-KEYWORDS = {'class', 'method', 'function', 'field', 'static', 'var', 'int', 'char', 'boolean', 'void', 'true', 'false', 'null', 'this', 'let', 'do', 'if', 'else', 'while', 'return'}
-SYMBOLS = {'{', '}', '(', ')', '[', ']', '.', ',', ';', '+', '-', '*', '/', '&', '|', '<', '>', '=', '~'}
+    def position(self, offset: int) -> tuple[int, int]:
+        if self.newlines is None:
+            self.newlines = [match.start() for match in re.finditer('\n', self.code)]
+        line = bisect_left(self.newlines, offset)
+        line_start = self.newlines[line - 1] + 1 if line else 0
+        return line + 1, offset - line_start + 1
 
+    def location(self, offset: int) -> str:
+        line, column = self.position(offset)
+        return f'{self.name}:{line}:{column}'
 
 
-@dataclass
 class Token:
-    type: TokenType
-    value: str | int | None
+    # A token is a (offset, length) slice of its source, the text is only
+    # copied out when asked for. Keyword and symbol tokens share the interned
+    # lexeme of their pattern token (see keyword/symbol), so the engine
+    # compares them by identity.
+    __slots__ = ('kind', 'lexeme', 'source', 'offset', 'length')
+
+    kind: int
+    lexeme: str | None
+    source: Source | None
+    offset: int
+    length: int
+
+    def __init__(self, kind: int, lexeme: str | None, source: Source | None = None, offset: int = -1, length: int = 0):
+        self.kind = kind
+        self.lexeme = lexeme
+        self.source = source
+        self.offset = offset
+        self.length = length
+
+    @property
+    def type(self) -> TokenType:
+        return TOKEN_TYPES[self.kind]
+
+    @property
+    def text(self) -> str:
+        if self.lexeme is not None:
+            return self.lexeme
+        return self.source.code[self.offset: self.offset + self.length]
+
+    @property
+    def value(self) -> str | int:
+        if self.kind == INTEGER_CONSTANT:
+            return int(self.text)
+        if self.kind == STRING_CONSTANT:
+            return self.text[1: -1]
+        return self.text
+
+    @property
+    def line(self) -> int:
+        return self.source.position(self.offset)[0]
+
+    @property
+    def column(self) -> int:
+        return self.source.position(self.offset)[1]
+
+    def location(self) -> str:
+        if self.source is None:
+            return '<unknown>'
+        return self.source.location(self.offset)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Token) and self.kind == other.kind and self.value == other.value
+
+    def __hash__(self) -> int:
+        return hash((self.kind, self.value))
+
+    def __repr__(self) -> str:
+        return f'Token(type={self.type!r}, value={self.value!r})'
+
+
+KEYWORD_TOKENS = {value: Token(KEYWORD, sys.intern(value)) for value in KEYWORDS}
+SYMBOL_TOKENS = {value: Token(SYMBOL, sys.intern(value)) for value in SYMBOLS}
+# source text -> interned lexeme
+KEYWORD_LEXEMES = {value: token.lexeme for value, token in KEYWORD_TOKENS.items()}
+SYMBOL_LEXEMES = {value: token.lexeme for value, token in SYMBOL_TOKENS.items()}
+
+
+def keyword(value: str) -> Token:
+    return KEYWORD_TOKENS[value]
+
+
+def symbol(value: str) -> Token:
+    return SYMBOL_TOKENS[value]
+
+
+def make_token(type: TokenType, value: str | int) -> Token:
+    # a token without a source, for token streams that do not come from code
+    match type:
+        case 'keyword':
+            return KEYWORD_TOKENS[value]
+        case 'symbol':
+            return SYMBOL_TOKENS[value]
+        case 'stringConstant':
+            return Token(STRING_CONSTANT, f'"{value}"')
+        case _:
+            return Token(TOKEN_TYPES.index(type), str(value))
 
 
 
 class JackTokenizer():
     code: str
+    source: Source
     start: int 
     current: int
 
-    tokens: List[Token]
+    mode: TokenizerMode
 
-    def __init__(self, code: str):
+    def __init__(self, code: str, mode: TokenizerMode = 'regex', name: str = '<string>'):
         self.code = code
+        self.source = Source(code, name)
         self.start = 0
         self.current = 0
-        self.tokens = []
+        self.mode = mode
+
+
+    def tokenize(self) -> List[Token]:
+        return list(self.iter_tokens())
+
+
+    def iter_tokens(self) -> Iterator[Token]:
+        if self.mode == 'regex':
+            yield from self.__match_tokens()
+            return
+
+        while self.current < len(self.code):
+            token = self.scan_token()
+            if token is not None:
+                yield token
+        self.reset()
+
+
+    def __match_tokens(self) -> Iterator[Token]:
+        source = self.source
+        for match in TOKEN_PATTERN.finditer(self.code):
+            kind = match.lastgroup
+            if kind == 'comment':
+                continue
+            start, end = match.span(kind)
+            if kind == 'symbol':
+                yield Token(SYMBOL, SYMBOL_LEXEMES[match[kind]], source, start, 1)
+            elif kind == 'identifier':
+                lexeme = KEYWORD_LEXEMES.get(match[kind])
+                yield Token(IDENTIFIER if lexeme is None else KEYWORD, lexeme, source, start, end - start)
+            elif kind == 'integerConstant':
+                yield Token(INTEGER_CONSTANT, None, source, start, end - start)
+            elif kind == 'stringConstant':
+                yield Token(STRING_CONSTANT, None, source, start, end - start)
+            else:
+                raise self.__error(start)
 
 
     def scan_token(self) -> Token | None:
+        self.start = self.current
         c = self.__advance()
 
         # single line comment
         if c == '/' and self.__peek() == '/':
             self.__advance()
-            while self.has_next() and self.__peek() != '\n':
+            while self.__peek() not in {'\n', ''}:
                 self.__advance()
             return None
         
@@ -57,9 +227,9 @@ class JackTokenizer():
             return None
 
         if c in SYMBOLS:
-            return self.__add_token('symbol', c)
+            return self.__add_token(SYMBOL, SYMBOL_LEXEMES[c])
 
-        if c.isdigit():
+        if c in DIGITS:
             return self.__exec_int()
 
         if c == '"':
@@ -67,8 +237,11 @@ class JackTokenizer():
 
         if c in {' ', '\n', '\t', '\r'}:
             return None
-        
-        return self.__exec_identifier()
+
+        if c in IDENTIFIER_START:
+            return self.__exec_identifier()
+
+        raise self.__error(self.start)
 
             
     def __advance(self) -> str:
@@ -78,7 +251,8 @@ class JackTokenizer():
 
 
     def __peek(self) -> str:
-        return self.code[self.current]
+        # '' at the end of the code, so a token may end the file
+        return self.code[self.current] if self.current < len(self.code) else ''
 
 
     def __peek_next(self) -> str | None:
@@ -92,48 +266,47 @@ class JackTokenizer():
         return self.current + 1 < len(self.code)
     
 
-    def __add_token(self, type: TokenType, value: str | int | None) -> Token:
-        self.tokens.append(Token(type, value))
-        return self.tokens[-1]
+    def __add_token(self, kind: int, lexeme: str | None = None) -> Token:
+        return Token(kind, lexeme, self.source, self.start, self.current - self.start)
 
     
     def __exec_int(self) -> Token:
-        self.start = self.current - 1
-
-        while (self.__peek().isdigit()):
+        while (self.__peek() in DIGITS):
             self.__advance()
 
-        return self.__add_token('integerConstant', int(self.code[self.start: self.current]))
+        return self.__add_token(INTEGER_CONSTANT)
 
 
     def __exec_string(self) -> Token:
-        self.start = self.current
-
-        while (self.__peek() != '"'):
+        while (self.__peek() not in {'"', '\n', ''}):
             self.__advance()
 
-        token = self.__add_token('stringConstant', self.code[self.start: self.current])
+        if self.__peek() != '"':
+            raise self.__error(self.start)
         # consume '"'
         self.__advance()
-        return token
+        return self.__add_token(STRING_CONSTANT)
     
 
     def __exec_identifier(self) -> Token:
-        self.start = self.current - 1
-
-        while (self.__peek().isalpha() or self.__peek().isdigit()):
+        while (self.__peek() in IDENTIFIER_CHARS):
             self.__advance()
 
-        text = self.code[self.start: self.current]
-        if text in KEYWORDS:
-            return self.__add_token('keyword', text)
+        lexeme = KEYWORD_LEXEMES.get(self.code[self.start: self.current])
+        if lexeme is not None:
+            return self.__add_token(KEYWORD, lexeme)
         else:
-            return self.__add_token('identifier', text)
+            return self.__add_token(IDENTIFIER)
         
+    def __error(self, offset: int) -> ValueError:
+        if self.code[offset] == '"':
+            return ValueError(f'{self.source.location(offset)}: unterminated string constant')
+        return ValueError(f'{self.source.location(offset)}: unexpected character {self.code[offset]!r}')
+
+
     def reset(self):
         self.start = 0
         self.current = 0
-        self.tokens = []
 
 
 def xml_to_tokens(xml: str) -> List[Token]:
@@ -145,5 +318,5 @@ def xml_to_tokens(xml: str) -> List[Token]:
         assert token.text is not None
         value = token.text[1: -1]
 
-        tokens.append(Token(t, value))
+        tokens.append(make_token(t, value))
     return tokens
@@ -0,0 +1,55 @@
+from typing import Dict, Literal
+from dataclasses import dataclass
+
+SymbolKind = Literal['static', 'field', 'argument', 'local']
+
+# VM segment of every kind of variable
+KIND_SEGMENTS: Dict[SymbolKind, str] = {
+    'static': 'static',
+    'field': 'this',
+    'argument': 'argument',
+    'local': 'local',
+}
+
+
+@dataclass
+class Symbol:
+    name: str
+    type: str
+    kind: SymbolKind
+    index: int
+
+
+class SymbolTable():
+    # class scope (static, field) and the scope of the current subroutine (argument, local)
+    class_symbols: Dict[str, Symbol]
+    subroutine_symbols: Dict[str, Symbol]
+    counts: Dict[SymbolKind, int]
+
+    def __init__(self):
+        self.class_symbols = {}
+        self.subroutine_symbols = {}
+        self.counts = {'static': 0, 'field': 0, 'argument': 0, 'local': 0}
+
+
+    def start_subroutine(self):
+        self.subroutine_symbols = {}
+        self.counts['argument'] = 0
+        self.counts['local'] = 0
+
+
+    def define(self, name: str, type: str, kind: SymbolKind):
+        scope = self.class_symbols if kind in {'static', 'field'} else self.subroutine_symbols
+        scope[name] = Symbol(name, type, kind, self.counts[kind])
+        self.counts[kind] += 1
+
+
+    def var_count(self, kind: SymbolKind) -> int:
+        return self.counts[kind]
+
+
+    def lookup(self, name: str) -> Symbol | None:
+        symbol = self.subroutine_symbols.get(name)
+        if symbol is None:
+            symbol = self.class_symbols.get(name)
+        return symbol
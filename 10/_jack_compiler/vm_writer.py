@@ -0,0 +1,83 @@
+from typing import Callable, Dict, Literal, TextIO
+
+Segment = Literal['argument', 'local', 'static', 'constant', 'this', 'that', 'pointer', 'temp']
+ArithmeticCommand = Literal['add', 'sub', 'neg', 'eq', 'gt', 'lt', 'and', 'or', 'not']
+# the command types of 8/vm_translator.py's ParsedLine
+CommandType = Literal['C_ARITHMETIC', 'C_PUSH', 'C_POP', 'C_LABEL', 'C_GOTO', 'C_IF', 'C_FUNCTION', 'C_RETURN', 'C_CALL']
+# takes the fields of a ParsedLine: command type, arg1, arg2
+CommandSink = Callable[[CommandType, str | None, int | None], None]
+
+COMMAND_KEYWORDS: Dict[CommandType, str] = {
+    'C_PUSH': 'push',
+    'C_POP': 'pop',
+    'C_LABEL': 'label',
+    'C_GOTO': 'goto',
+    'C_IF': 'if-goto',
+    'C_FUNCTION': 'function',
+    'C_RETURN': 'return',
+    'C_CALL': 'call',
+}
+
+
+class VMWriter():
+    # writes VM commands in the format of 8/vm_translator.py's Parser, one per
+    # line, and hands them to on_command as they would be parsed; text is only
+    # formatted when there is an output
+    output: TextIO | None
+    on_command: CommandSink | None
+
+    def __init__(self, output: TextIO | None, on_command: CommandSink | None = None):
+        self.output = output
+        self.on_command = on_command
+
+
+    def write_push(self, segment: Segment, index: int):
+        self.__emit('C_PUSH', segment, index)
+
+
+    def write_pop(self, segment: Segment, index: int):
+        self.__emit('C_POP', segment, index)
+
+
+    def write_arithmetic(self, command: ArithmeticCommand):
+        self.__emit('C_ARITHMETIC', command, None)
+
+
+    def write_label(self, label: str):
+        self.__emit('C_LABEL', label, None)
+
+
+    def write_goto(self, label: str):
+        self.__emit('C_GOTO', label, None)
+
+
+    def write_if(self, label: str):
+        self.__emit('C_IF', label, None)
+
+
+    def write_call(self, name: str, n_args: int):
+        self.__emit('C_CALL', name, n_args)
+
+
+    def write_function(self, name: str, n_locals: int):
+        self.__emit('C_FUNCTION', name, n_locals)
+
+
+    def write_return(self):
+        self.__emit('C_RETURN', None, None)
+
+
+    def __emit(self, command: CommandType, arg1: str | None, arg2: int | None):
+        if self.on_command is not None:
+            self.on_command(command, arg1, arg2)
+        if self.output is None:
+            return
+        match command:
+            case 'C_ARITHMETIC':
+                self.output.write(f'{arg1}\n')
+            case 'C_RETURN':
+                self.output.write('return\n')
+            case 'C_LABEL' | 'C_GOTO' | 'C_IF':
+                self.output.write(f'{COMMAND_KEYWORDS[command]} {arg1}\n')
+            case _:
+                self.output.write(f'{COMMAND_KEYWORDS[command]} {arg1} {arg2}\n')
@@ -0,0 +1,284 @@
+from typing import List, TextIO
+from jack_ast import (
+    PRIMITIVE_TYPES, Visitor, Class, ClassVarDec, SubroutineDec, Parameter, VarDec, Type,
+    Statement, LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    Expression, IntegerConstant, StringConstant, KeywordConstant, VarTerm, SubroutineCall, ParenthesizedTerm, UnaryTerm,
+)
+
+
+def escape_xml(value: str | int | None) -> str | int:
+    if isinstance(value, int):
+        return value
+    if value is None:
+        return ''
+    return (
+        value.replace("&", "&amp;")
+            .replace("<", "&lt;")
+            .replace(">", "&gt;")
+            .replace('"', "&quot;")
+            .replace("'", "&apos;")
+    )
+
+
+class XmlWriter():
+    # Writes elements straight into the output as they are opened and closed,
+    # one per line, children indented by one step; leaves are '<tag> value </tag>'.
+    output: TextIO
+    step: str
+    depth: int
+
+    def __init__(self, output: TextIO, step: str = '  '):
+        self.output = output
+        self.step = step
+        self.depth = 0
+
+
+    def start(self, tag: str):
+        self.output.write(f'{self.step * self.depth}<{tag}>\n')
+        self.depth += 1
+
+
+    def end(self, tag: str):
+        self.depth -= 1
+        self.output.write(f'{self.step * self.depth}</{tag}>\n')
+
+
+    def leaf(self, tag: str, value: str | int | None):
+        self.output.write(f'{self.step * self.depth}<{tag}> {escape_xml(value)} </{tag}>\n')
+
+
+class XmlVisitor(Visitor):
+    # writes the parse tree of the nand2tetris 10/ XML format, the tokens the
+    # syntax tree leaves implicit are written back in place
+    writer: XmlWriter
+
+    def __init__(self, writer: XmlWriter):
+        super().__init__()
+        self.writer = writer
+
+
+    def keyword(self, value: str):
+        self.writer.leaf('keyword', value)
+
+
+    def symbol(self, value: str):
+        self.writer.leaf('symbol', value)
+
+
+    def identifier(self, value: str):
+        self.writer.leaf('identifier', value)
+
+
+    def type(self, type: Type):
+        if type in PRIMITIVE_TYPES:
+            self.keyword(type)
+        else:
+            self.identifier(type)
+
+
+    def names(self, names: List[str]):
+        for i, name in enumerate(names):
+            if i:
+                self.symbol(',')
+            self.identifier(name)
+
+
+    def statements(self, statements: List[Statement]):
+        self.writer.start('statements')
+        for statement in statements:
+            self.visit(statement)
+        self.writer.end('statements')
+
+
+    def block(self, statements: List[Statement]):
+        self.symbol('{')
+        self.statements(statements)
+        self.symbol('}')
+
+
+    def visit_Class(self, node: Class):
+        self.writer.start('class')
+        self.keyword('class')
+        self.identifier(node.name)
+        self.symbol('{')
+        for var_dec in node.var_decs:
+            self.visit(var_dec)
+        for subroutine in node.subroutines:
+            self.visit(subroutine)
+        self.symbol('}')
+        self.writer.end('class')
+
+
+    def visit_ClassVarDec(self, node: ClassVarDec):
+        self.writer.start('classVarDec')
+        self.keyword(node.kind)
+        self.type(node.type)
+        self.names(node.names)
+        self.symbol(';')
+        self.writer.end('classVarDec')
+
+
+    def visit_SubroutineDec(self, node: SubroutineDec):
+        self.writer.start('subroutineDec')
+        self.keyword(node.kind)
+        self.type(node.return_type)
+        self.identifier(node.name)
+        self.symbol('(')
+        self.writer.start('parameterList')
+        for i, parameter in enumerate(node.parameters):
+            if i:
+                self.symbol(',')
+            self.visit(parameter)
+        self.writer.end('parameterList')
+        self.symbol(')')
+
+        self.writer.start('subroutineBody')
+        self.symbol('{')
+        for var_dec in node.var_decs:
+            self.visit(var_dec)
+        self.statements(node.statements)
+        self.symbol('}')
+        self.writer.end('subroutineBody')
+        self.writer.end('subroutineDec')
+
+
+    def visit_Parameter(self, node: Parameter):
+        self.type(node.type)
+        self.identifier(node.name)
+
+
+    def visit_VarDec(self, node: VarDec):
+        self.writer.start('varDec')
+        self.keyword('var')
+        self.type(node.type)
+        self.names(node.names)
+        self.symbol(';')
+        self.writer.end('varDec')
+
+
+    def visit_LetStatement(self, node: LetStatement):
+        self.writer.start('letStatement')
+        self.keyword('let')
+        self.identifier(node.name)
+        if node.index is not None:
+            self.symbol('[')
+            self.visit(node.index)
+            self.symbol(']')
+        self.symbol('=')
+        self.visit(node.value)
+        self.symbol(';')
+        self.writer.end('letStatement')
+
+
+    def visit_IfStatement(self, node: IfStatement):
+        self.writer.start('ifStatement')
+        self.keyword('if')
+        self.symbol('(')
+        self.visit(node.condition)
+        self.symbol(')')
+        self.block(node.statements)
+        if node.else_statements is not None:
+            self.keyword('else')
+            self.block(node.else_statements)
+        self.writer.end('ifStatement')
+
+
+    def visit_WhileStatement(self, node: WhileStatement):
+        self.writer.start('whileStatement')
+        self.keyword('while')
+        self.symbol('(')
+        self.visit(node.condition)
+        self.symbol(')')
+        self.block(node.statements)
+        self.writer.end('whileStatement')
+
+
+    def visit_DoStatement(self, node: DoStatement):
+        self.writer.start('doStatement')
+        self.keyword('do')
+        self.subroutine_call(node.call)
+        self.symbol(';')
+        self.writer.end('doStatement')
+
+
+    def visit_ReturnStatement(self, node: ReturnStatement):
+        self.writer.start('returnStatement')
+        self.keyword('return')
+        if node.value is not None:
+            self.visit(node.value)
+        self.symbol(';')
+        self.writer.end('returnStatement')
+
+
+    def visit_Expression(self, node: Expression):
+        self.writer.start('expression')
+        self.visit(node.terms[0])
+        for operator, term in zip(node.operators, node.terms[1:]):
+            self.symbol(operator)
+            self.visit(term)
+        self.writer.end('expression')
+
+
+    def visit_IntegerConstant(self, node: IntegerConstant):
+        self.writer.start('term')
+        self.writer.leaf('integerConstant', node.value)
+        self.writer.end('term')
+
+
+    def visit_StringConstant(self, node: StringConstant):
+        self.writer.start('term')
+        self.writer.leaf('stringConstant', node.value)
+        self.writer.end('term')
+
+
+    def visit_KeywordConstant(self, node: KeywordConstant):
+        self.writer.start('term')
+        self.keyword(node.value)
+        self.writer.end('term')
+
+
+    def visit_VarTerm(self, node: VarTerm):
+        self.writer.start('term')
+        self.identifier(node.name)
+        if node.index is not None:
+            self.symbol('[')
+            self.visit(node.index)
+            self.symbol(']')
+        self.writer.end('term')
+
+
+    def visit_SubroutineCall(self, node: SubroutineCall):
+        self.writer.start('term')
+        self.subroutine_call(node)
+        self.writer.end('term')
+
+
+    def subroutine_call(self, node: SubroutineCall):
+        # a do statement holds the call without a term around it
+        if node.receiver is not None:
+            self.identifier(node.receiver)
+            self.symbol('.')
+        self.identifier(node.name)
+        self.symbol('(')
+        self.writer.start('expressionList')
+        for i, argument in enumerate(node.arguments):
+            if i:
+                self.symbol(',')
+            self.visit(argument)
+        self.writer.end('expressionList')
+        self.symbol(')')
+
+
+    def visit_ParenthesizedTerm(self, node: ParenthesizedTerm):
+        self.writer.start('term')
+        self.symbol('(')
+        self.visit(node.expression)
+        self.symbol(')')
+        self.writer.end('term')
+
+
+    def visit_UnaryTerm(self, node: UnaryTerm):
+        self.writer.start('term')
+        self.symbol(node.operator)
+        self.visit(node.term)
+        self.writer.end('term')
@@ -0,0 +1,61 @@
+import argparse
+import time
+from pathlib import Path
+from typing import Callable
+
+from hack_assembler import assemble
+from hack_emulator import HackEmulator
+from vm_interpreter import VMInterpreter
+from vm_translator import ParsedLine, TranslatorOptions, parse_lines, translate_commands, translate_init
+
+# Runs FunctionCalls/FibonacciElement with a larger argument to completion,
+# once translated on the CPU emulator (interpreted and block-compiled) and
+# once on the VM interpreter, and compares the wall time.
+
+CHUNK = 1000
+
+
+def fibonacci(n: int) -> int:
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+
+def fibonacci_classes(n: int) -> list[tuple[str, list[ParsedLine]]]:
+    directory = Path(__file__).parent / 'FunctionCalls' / 'FibonacciElement'
+    main_vm = (directory / 'Main.vm').read_text()
+    sys_vm = (directory / 'Sys.vm').read_text().replace('push constant 4', f'push constant {n}')
+    return [('Main', list(parse_lines(main_vm.splitlines()))), ('Sys', list(parse_lines(sys_vm.splitlines())))]
+
+
+def run_to_completion(machine: HackEmulator | VMInterpreter, done: Callable[[], bool]) -> float:
+    start = time.perf_counter()
+    while not done():
+        machine.run(CHUNK)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='bench_vm_interpreter.py')
+    arg_parser.add_argument('-n', type=int, default=18, help='argument of Main.fibonacci')
+    args = arg_parser.parse_args()
+
+    classes = fibonacci_classes(args.n)
+    options = TranslatorOptions()
+    asm = translate_init(options)[0] + ''.join(translate_commands(commands, name, options)[0] for name, commands in classes)
+    words = assemble(asm.split('\n'))
+    # Sys.init is left with the result on top of its empty stack
+    expected = fibonacci(args.n)
+
+    machines: list[tuple[str, HackEmulator | VMInterpreter]] = [
+        ('translated, interpreted', HackEmulator(words)),
+        ('translated, --jit', HackEmulator(words, jit=True)),
+        ('VM interpreter', VMInterpreter(classes, bootstrap=True)),
+    ]
+    baseline = None
+    for name, machine in machines:
+        seconds = run_to_completion(machine, lambda: machine.ram[0] == 262 and machine.ram[261] == expected)
+        baseline = baseline or seconds
+        unit = 'VM commands' if isinstance(machine, VMInterpreter) else 'instructions'
+        print(f'{name:24} {machine.cycles:>11,} {unit:12} {seconds:7.3f}s  {baseline / seconds:6.1f}x')
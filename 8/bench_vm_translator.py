@@ -0,0 +1,78 @@
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from vm_translator import Parser, decode_vmb, write_asm, write_vmb
+
+# Translates a synthetic .vm file and reports VM commands per second, then
+# compares parsing the text with loading the same commands from a .vmb.
+
+COMMANDS = [
+    'push constant {n}',
+    'push local {i}',
+    'pop local {i}',
+    'push argument {i}',
+    'pop that {i}',
+    'push static {i}',
+    'pop temp {t}',
+    'push pointer {p}',
+    'add',
+    'sub',
+    'neg',
+    'eq',
+    'lt',
+    'gt',
+    'and',
+    'or',
+    'not',
+    'label L{n}',
+    'goto L{n}',
+    'if-goto L{n}',
+    'call Main.f{i} {i}',
+    'function Main.f{i} {i}',
+    'return',
+]
+
+
+def best_time(function, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def generate_vm(path: Path, n_lines: int, seed: int = 0):
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        for _ in range(n_lines):
+            command = rng.choice(COMMANDS)
+            f.write(command.format(n=rng.randrange(32768), i=rng.randrange(8), t=rng.randrange(8), p=rng.randrange(2)) + '\n')
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='bench_vm_translator.py')
+    arg_parser.add_argument('--lines', type=int, default=1_000_000)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        input_file_path = Path(directory) / 'Main.vm'
+        output_file_path = Path(directory) / 'Main.asm'
+        generate_vm(input_file_path, args.lines)
+
+        best = best_time(lambda: write_asm(input_file_path=input_file_path.as_posix(), output_file_path=output_file_path.as_posix(), write_mode='w'), args.repeat)
+        print(f'{args.lines} VM commands in {best:.2f}s: {args.lines / best:,.0f} commands/s')
+
+        text_parse = best_time(lambda: list(Parser(input_file_path.as_posix()).commands()), args.repeat)
+        vmb_file_path = Path(write_vmb(input_file_path.as_posix()))
+        vmb_load = best_time(lambda: decode_vmb(vmb_file_path.read_bytes()), args.repeat)
+        print(f'parse .vm:  {text_parse:.2f}s ({input_file_path.stat().st_size:,} bytes)')
+        print(f'load .vmb:  {vmb_load:.2f}s ({vmb_file_path.stat().st_size:,} bytes), {text_parse / vmb_load:.1f}x faster')
+
+        # with the .vmb of the same text next to it, translating Main.vm reads that instead
+        best = best_time(lambda: write_asm(input_file_path=input_file_path.as_posix(), output_file_path=output_file_path.as_posix(), write_mode='w'), args.repeat)
+        print(f'{args.lines} VM commands from .vmb in {best:.2f}s: {args.lines / best:,.0f} commands/s')
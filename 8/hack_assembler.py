@@ -0,0 +1,178 @@
+from typing import Iterable
+from itertools import permutations
+import argparse
+import time
+from pathlib import Path
+
+# Two-pass Hack assembler.
+# The comp/dest/jump fields are encoded through precomputed tables, whole
+# C-instructions are memoized since generated code repeats the same few
+# dozen of them over and over.
+
+COMP_BITS = {
+    '0': 0b0101010,
+    '1': 0b0111111,
+    '-1': 0b0111010,
+    'D': 0b0001100,
+    'A': 0b0110000,
+    '!D': 0b0001101,
+    '!A': 0b0110001,
+    '-D': 0b0001111,
+    '-A': 0b0110011,
+    'D+1': 0b0011111,
+    'A+1': 0b0110111,
+    'D-1': 0b0001110,
+    'A-1': 0b0110010,
+    'D+A': 0b0000010,
+    'D-A': 0b0010011,
+    'A-D': 0b0000111,
+    'D&A': 0b0000000,
+    'D|A': 0b0010101,
+}
+# the same computations on M set the a-bit
+COMP_BITS |= {comp.replace('A', 'M'): bits | 0b1000000 for comp, bits in COMP_BITS.items() if 'A' in comp}
+# commutative spellings
+COMP_BITS |= {comp[::-1]: bits for comp, bits in COMP_BITS.items() if len(comp) == 3 and comp[1] in '+&|'}
+
+DEST_BITS = {
+    ''.join(order): (4 if 'A' in order else 0) | (2 if 'D' in order else 0) | (1 if 'M' in order else 0)
+    for size in range(4)
+    for order in permutations('ADM', size)
+}
+
+JUMP_BITS = {
+    '': 0,
+    'JGT': 1,
+    'JEQ': 2,
+    'JGE': 3,
+    'JLT': 4,
+    'JNE': 5,
+    'JLE': 6,
+    'JMP': 7,
+}
+
+PREDEFINED_SYMBOLS = {
+    'SP': 0,
+    'LCL': 1,
+    'ARG': 2,
+    'THIS': 3,
+    'THAT': 4,
+    **{f'R{i}': i for i in range(16)},
+    'SCREEN': 16384,
+    'KBD': 24576,
+}
+
+VARIABLE_BASE_ADDRESS = 16
+# the largest constant an A-instruction holds, 15 bits
+MAX_CONSTANT = 32767
+
+C_INSTRUCTION_PREFIX = 0b111 << 13
+
+# C-instruction text -> machine word
+encoded_instructions: dict[str, int] = {}
+
+
+def encode_c_instruction(instruction: str) -> int:
+    word = encoded_instructions.get(instruction)
+    if word is not None:
+        return word
+
+    dest, _, rest = instruction.rpartition('=')
+    comp, _, jump = rest.partition(';')
+    if comp not in COMP_BITS or dest not in DEST_BITS or jump not in JUMP_BITS:
+        raise ValueError(f'invalid instruction: {instruction}')
+
+    word = C_INSTRUCTION_PREFIX | COMP_BITS[comp] << 6 | DEST_BITS[dest] << 3 | JUMP_BITS[jump]
+    encoded_instructions[instruction] = word
+    return word
+
+
+def clean_numbered_lines(lines: Iterable[str]) -> list[tuple[int, str]]:
+    # the instructions with the (1-based) number of their source line
+    instructions: list[tuple[int, str]] = []
+    for number, line in enumerate(lines, 1):
+        comment = line.find('//')
+        if comment != -1:
+            line = line[:comment]
+        line = line.strip()
+        if line:
+            if ' ' in line or '\t' in line:
+                line = ''.join(line.split())
+            instructions.append((number, line))
+    return instructions
+
+
+def clean_lines(lines: Iterable[str]) -> list[str]:
+    return [instruction for _, instruction in clean_numbered_lines(lines)]
+
+
+def assemble(lines: Iterable[str]) -> list[int]:
+    instructions = clean_numbered_lines(lines)
+
+    # first pass: label addresses
+    symbols = dict(PREDEFINED_SYMBOLS)
+    code: list[tuple[int, str]] = []
+    for number, instruction in instructions:
+        if instruction[0] == '(':
+            symbols[instruction[1:-1]] = len(code)
+        else:
+            code.append((number, instruction))
+
+    # second pass: encoding, unknown symbols become variables
+    words: list[int] = []
+    next_variable = VARIABLE_BASE_ADDRESS
+    for number, instruction in code:
+        if instruction[0] == '@':
+            value = instruction[1:]
+            if value.isdigit():
+                # bit 15 would make it a C-instruction
+                if int(value) > MAX_CONSTANT:
+                    raise ValueError(f'line {number}: constant out of range (0-{MAX_CONSTANT}): {instruction}')
+                words.append(int(value))
+            else:
+                address = symbols.get(value)
+                if address is None:
+                    address = symbols[value] = next_variable
+                    next_variable += 1
+                words.append(address)
+        else:
+            try:
+                words.append(encode_c_instruction(instruction))
+            except ValueError as e:
+                raise ValueError(f'line {number}: {e}') from None
+    return words
+
+
+def to_hack(words: list[int]) -> str:
+    return ''.join(f'{word:016b}\n' for word in words)
+
+
+def assemble_file(input_file_path: str) -> str:
+    output_file_path = input_file_path[:-4] + '.hack'
+    with open(input_file_path, 'r') as f:
+        words = assemble(f)
+    with open(output_file_path, 'w') as f:
+        f.write(to_hack(words))
+    return output_file_path
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='hack_assembler.py')
+    arg_parser.add_argument('paths', nargs='+', help='.asm files or directories containing them')
+    args = arg_parser.parse_args()
+
+    input_file_paths: list[str] = []
+    for input_path in args.paths:
+        path = Path(input_path)
+        if path.is_dir():
+            input_file_paths += sorted(p.as_posix() for p in path.rglob('*.asm'))
+        elif path.is_file() and path.suffix == '.asm':
+            input_file_paths.append(path.as_posix())
+        else:
+            print(f'Not an .asm file or directory: {input_path}')
+            exit(1)
+
+    for input_file_path in input_file_paths:
+        start = time.perf_counter()
+        output_file_path = assemble_file(input_file_path)
+        print(f'{input_file_path} -> {output_file_path} ({(time.perf_counter() - start) * 1000:.1f} ms)')
@@ -0,0 +1,277 @@
+from typing import Callable
+from array import array
+import argparse
+import re
+import time
+
+from hack_assembler import assemble, COMP_BITS
+
+# Headless Hack CPU emulator.
+# RAM is a preallocated 32K array('h') of signed 16-bit words, ROM holds
+# pre-decoded instruction tuples, so the run loop does no bit twiddling.
+# Registers are kept as signed Python ints, and since the RAM has exactly
+# 32K words a negative A indexes the same cell the 15-bit address bus would.
+
+MEMORY_SIZE = 32768
+
+Comp = Callable[[int, int, int], int]
+
+# Python expression of every computation on A; the M variants are derived from them
+COMP_EXPRESSIONS = {
+    '0': '0',
+    '1': '1',
+    '-1': '-1',
+    'D': 'd',
+    'A': 'a',
+    '!D': '~d',
+    '!A': '~a',
+    '-D': '((32768 - d) & 0xFFFF) - 32768',
+    '-A': '((32768 - a) & 0xFFFF) - 32768',
+    'D+1': '((d + 32769) & 0xFFFF) - 32768',
+    'A+1': '((a + 32769) & 0xFFFF) - 32768',
+    'D-1': '((d + 32767) & 0xFFFF) - 32768',
+    'A-1': '((a + 32767) & 0xFFFF) - 32768',
+    'D+A': '((d + a + 32768) & 0xFFFF) - 32768',
+    'D-A': '((d - a + 32768) & 0xFFFF) - 32768',
+    'A-D': '((a - d + 32768) & 0xFFFF) - 32768',
+    'D&A': 'd & a',
+    'D|A': 'd | a',
+}
+COMP_EXPRESSIONS |= {comp.replace('A', 'M'): expression.replace('a', 'm') for comp, expression in COMP_EXPRESSIONS.items() if 'A' in comp}
+
+
+def to_signed(value: int) -> int:
+    return ((value + 32768) & 0xFFFF) - 32768
+
+
+def alu(comp_bits: int) -> Comp:
+    # fallback for the computations that have no mnemonic
+    zx, nx, zy, ny, f, no = [(comp_bits >> shift) & 1 for shift in range(5, -1, -1)]
+    uses_m = comp_bits & 0b1000000
+
+    def compute(d: int, a: int, m: int) -> int:
+        x = 0 if zx else d
+        y = 0 if zy else (m if uses_m else a)
+        x = ~x if nx else x
+        y = ~y if ny else y
+        out = to_signed(x + y) if f else x & y
+        return ~out if no else out
+
+    return compute
+
+
+COMP_SOURCES: dict[int, str] = {COMP_BITS[comp]: expression for comp, expression in COMP_EXPRESSIONS.items()}
+
+COMP_FUNCTIONS: dict[int, Comp] = {
+    COMP_BITS[comp]: eval(f'lambda d, a, m: {expression}')
+    for comp, expression in COMP_EXPRESSIONS.items()
+}
+
+# the ALU output selects the entry: [0] = zero, [1] = positive, [-1] = negative
+JUMP_TABLES = [
+    None,
+    (False, True, False),
+    (True, False, False),
+    (True, True, False),
+    (False, False, True),
+    (False, True, True),
+    (True, False, True),
+    (True, True, True),
+]
+
+# Python conditions of the jump mnemonics for the block compiler
+JUMP_CONDITIONS = [None, 'out > 0', 'out == 0', 'out >= 0', 'out < 0', 'out != 0', 'out <= 0', 'True']
+
+MAX_BLOCK_SIZE = 256
+
+# (comp, value / unused, dest A, dest D, dest M, jump table), comp is None for A-instructions
+Instruction = tuple[Comp | None, int, bool, bool, bool, tuple[bool, bool, bool] | None]
+
+
+def decode(word: int) -> Instruction:
+    if not word & 0x8000:
+        return (None, word, False, False, False, None)
+    comp_bits = (word >> 6) & 0b1111111
+    comp = COMP_FUNCTIONS.get(comp_bits) or alu(comp_bits)
+    return (comp, 0, bool(word & 0b100000), bool(word & 0b10000), bool(word & 0b1000), JUMP_TABLES[word & 0b111])
+
+
+# a compiled block: (function(ram, a, d) -> (pc, a, d, cycles executed), maximal number of cycles)
+Block = tuple[Callable[[array, int, int], tuple[int, int, int, int]], int]
+
+
+def compile_block(words: list[int], start: int) -> Block:
+    # Straight-line code from start up to the first unconditional jump, conditional
+    # jumps become side exits. Values loaded into A by A-instructions are tracked at
+    # compile time, so '@SP / AM=M-1' turns into plain 'ram[0]' accesses and the
+    # register is only materialized where it is read dynamically or on exit.
+    lines = ['def block(ram, a, d):']
+    namespace: dict[str, Comp] = {}
+    known_a: int | None = None
+    pc = start
+
+    def a_value() -> str:
+        return 'a' if known_a is None else str(known_a)
+
+    while True:
+        word = words[pc] if pc < len(words) else 0
+        pc += 1
+        if not word & 0x8000:
+            known_a = word
+        else:
+            comp_bits = (word >> 6) & 0b1111111
+            if comp_bits in COMP_SOURCES:
+                expression = re.sub(r'\bm\b', f'ram[{a_value()}]', COMP_SOURCES[comp_bits])
+                expression = re.sub(r'\ba\b', a_value(), expression)
+            else:
+                namespace[f'alu_{comp_bits}'] = alu(comp_bits)
+                expression = f'alu_{comp_bits}(d, {a_value()}, ram[{a_value()}])'
+            dest_a, dest_d, dest_m = word & 0b100000, word & 0b10000, word & 0b1000
+            jump = JUMP_CONDITIONS[word & 0b111]
+            target = str(known_a & 0x7FFF) if known_a is not None else 'a & 0x7FFF'
+
+            lines.append(f'    out = {expression}')
+            if dest_m:
+                lines.append(f'    ram[{a_value()}] = out')
+            if jump is not None and dest_a:
+                lines.append(f'    target = {target}')
+                target = 'target'
+            if dest_a:
+                lines.append('    a = out')
+                known_a = None
+            if dest_d:
+                lines.append('    d = out')
+            if jump == 'True':
+                lines.append(f'    return {target}, {a_value()}, d, {pc - start}')
+                break
+            if jump is not None:
+                lines.append(f'    if {jump}:')
+                lines.append(f'        return {target}, {a_value()}, d, {pc - start}')
+        if pc - start == MAX_BLOCK_SIZE or pc == MEMORY_SIZE:
+            lines.append(f'    return {pc & 0x7FFF}, {a_value()}, d, {pc - start}')
+            break
+
+    exec(compile('\n'.join(lines), f'<block {start}>', 'exec'), namespace)
+    return namespace['block'], pc - start
+
+
+class HackEmulator:
+    rom: list[Instruction]
+    words: list[int]
+    program_size: int
+    jit: bool
+    blocks: dict[int, Block]
+    ram: array
+    a: int
+    d: int
+    pc: int
+    cycles: int
+
+    def __init__(self, words: list[int], jit: bool = False):
+        # past the program the ROM reads as zeros, i.e. @0
+        self.rom = [decode(word) for word in words] + [decode(0)] * (MEMORY_SIZE - len(words))
+        self.words = words
+        self.program_size = len(words)
+        # block-compiling mode: code is compiled to Python functions per entry point on first use
+        self.jit = jit
+        self.blocks = {}
+        self.reset()
+
+    @classmethod
+    def from_file(cls, file_path: str, jit: bool = False) -> 'HackEmulator':
+        with open(file_path, 'r') as f:
+            if file_path.endswith('.hack'):
+                return cls([int(line, 2) for line in f.read().split()], jit)
+            return cls(assemble(f), jit)
+
+    def reset(self):
+        self.ram = array('h', bytes(2 * MEMORY_SIZE))
+        self.a = 0
+        self.d = 0
+        self.pc = 0
+        self.cycles = 0
+
+    def run(self, cycles: int):
+        if self.jit:
+            self.run_blocks(cycles)
+        else:
+            self.interpret(cycles)
+
+    def run_blocks(self, cycles: int):
+        blocks = self.blocks
+        ram = self.ram
+        a = self.a
+        d = self.d
+        pc = self.pc
+        remaining = cycles
+
+        while remaining > 0:
+            block = blocks.get(pc)
+            if block is None:
+                block = blocks[pc] = compile_block(self.words, pc)
+            function, size = block
+            if size > remaining:
+                # a block may run to its end, the last few cycles are interpreted
+                break
+            pc, a, d, executed = function(ram, a, d)
+            remaining -= executed
+
+        self.a = a
+        self.d = d
+        self.pc = pc
+        self.cycles += cycles - remaining
+        if remaining > 0:
+            self.interpret(remaining)
+
+    def interpret(self, cycles: int):
+        rom = self.rom
+        ram = self.ram
+        a = self.a
+        d = self.d
+        pc = self.pc
+
+        for _ in range(cycles):
+            comp, value, dest_a, dest_d, dest_m, jump = rom[pc]
+            if comp is None:
+                a = value
+                pc = (pc + 1) & 0x7FFF
+                continue
+
+            out = comp(d, a, ram[a])
+            if dest_m:
+                ram[a] = out
+            if jump is not None and jump[(out > 0) - (out < 0)]:
+                pc = a & 0x7FFF
+            else:
+                pc = (pc + 1) & 0x7FFF
+            if dest_a:
+                a = out
+            if dest_d:
+                d = out
+
+        self.a = a
+        self.d = d
+        self.pc = pc
+        self.cycles += cycles
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='hack_emulator.py')
+    arg_parser.add_argument('filename', help='.hack or .asm program')
+    arg_parser.add_argument('--cycles', type=int, default=1_000_000)
+    arg_parser.add_argument('--jit', action='store_true', help='compile straight-line code blocks to Python functions')
+    arg_parser.add_argument('--set', nargs=2, type=int, action='append', default=[], metavar=('ADDRESS', 'VALUE'), help='set RAM[ADDRESS] before running')
+    arg_parser.add_argument('--ram', nargs='*', type=int, default=list(range(5)), metavar='ADDRESS', help='RAM cells to print afterwards')
+    args = arg_parser.parse_args()
+
+    emulator = HackEmulator.from_file(args.filename, args.jit)
+    for address, value in args.set:
+        emulator.ram[address] = value
+
+    start = time.perf_counter()
+    emulator.run(args.cycles)
+    elapsed = time.perf_counter() - start
+
+    for address in args.ram:
+        print(f'RAM[{address}] = {emulator.ram[address]}')
+    print(f'{args.cycles} cycles in {elapsed:.2f}s: {args.cycles / elapsed:,.0f} instructions/s')
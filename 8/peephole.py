@@ -0,0 +1,155 @@
+from typing import Callable
+import re
+
+# Peephole optimizer for the Hack assembly produced by CodeWriter.
+#
+# Every VM command is emitted from a fixed template, so neighbouring commands
+# leave easy-to-spot redundancies behind (a push whose value is popped right
+# away, an @SP reload whose A value is overwritten before use, ...).
+# Comments and blank lines are transparent to the rules; labels are not, since
+# control can enter the program there.
+
+PUSH_D = ['@SP', 'A=M', 'M=D', '@SP', 'M=M+1']
+POP_D = ['@SP', 'AM=M-1', 'D=M']
+
+SMALL_CONSTANTS = {
+    ('@0', 'D=A'): 'D=0',
+    ('@1', 'D=A'): 'D=1',
+    ('@0', 'D=-A'): 'D=0',
+    ('@1', 'D=-A'): 'D=-1',
+    ('@0', 'D=!A'): 'D=-1',
+}
+
+UNARY_CONSTANTS = {
+    'M=-M': 'D=-A',
+    'M=!M': 'D=!A',
+}
+
+C_INSTRUCTION = re.compile(r'^(?:(?P<dest>[AMD]+)=)?(?P<comp>[^;]+)(?:;(?P<jump>J\w\w))?$')
+
+# a rule gets the code window starting at the current position and returns
+# (number of instructions matched, replacement) or None
+Rule = Callable[[list[str]], tuple[int, list[str]] | None]
+
+
+def is_a_instruction(instruction: str) -> bool:
+    return instruction.startswith('@')
+
+
+def writes_only_a(instruction: str) -> bool:
+    if is_a_instruction(instruction):
+        return True
+    match = C_INSTRUCTION.match(instruction)
+    return match is not None and match['dest'] == 'A' and match['jump'] is None
+
+
+def fuse_push_pop(window: list[str]) -> tuple[int, list[str]] | None:
+    # push ... ; pop ...  ->  D already holds the value, keep A pointing at the old top
+    if window[:8] == PUSH_D + POP_D:
+        return 8, ['@SP', 'A=M']
+    return None
+
+
+def fold_unary_constant(window: list[str]) -> tuple[int, list[str]] | None:
+    # push constant c ; neg/not  ->  push the folded constant
+    if len(window) >= 11 and window[0][1:].isdigit() and window[1] == 'D=A' \
+            and window[2:7] == PUSH_D and window[7:9] == ['@SP', 'A=M-1'] \
+            and window[9] in UNARY_CONSTANTS and is_a_instruction(window[10]):
+        return 10, [window[0], UNARY_CONSTANTS[window[9]]] + PUSH_D
+    return None
+
+
+def fold_small_constant(window: list[str]) -> tuple[int, list[str]] | None:
+    # @0 / @1 loaded only to compute D
+    if len(window) >= 3 and (window[0], window[1]) in SMALL_CONSTANTS and is_a_instruction(window[2]):
+        return 2, [SMALL_CONSTANTS[(window[0], window[1])]]
+    return None
+
+
+def drop_dead_address(window: list[str]) -> tuple[int, list[str]] | None:
+    # A is overwritten by the next instruction before anything reads it
+    if len(window) >= 2 and writes_only_a(window[0]) and is_a_instruction(window[1]):
+        return 1, []
+    return None
+
+
+def merge_address_arithmetic(window: list[str]) -> tuple[int, list[str]] | None:
+    if window[:2] == ['A=M', 'A=A-1']:
+        return 2, ['A=M-1']
+    if window[:2] == ['A=M', 'A=A+1']:
+        return 2, ['A=M+1']
+    return None
+
+
+def drop_top_reload(window: list[str]) -> tuple[int, list[str]] | None:
+    # A still points at the top of the stack after writing it
+    if len(window) >= 5 and window[:2] == ['@SP', 'A=M-1'] and window[2].startswith('M=') \
+            and window[3:5] == ['@SP', 'A=M-1']:
+        return 5, window[:3]
+    if len(window) >= 7 and window[:4] == POP_D + ['A=A-1'] and window[4].startswith('M=') \
+            and window[5:7] == ['@SP', 'A=M-1']:
+        return 7, window[:5]
+    return None
+
+
+RULES: list[Rule] = [
+    fuse_push_pop,
+    fold_unary_constant,
+    fold_small_constant,
+    merge_address_arithmetic,
+    drop_top_reload,
+    drop_dead_address,
+]
+
+WINDOW_SIZE = 11
+
+
+def is_label(line: str) -> bool:
+    return line.startswith('(')
+
+
+def is_code(line: str) -> bool:
+    return line != '' and not line.startswith('//')
+
+
+def optimize_pass(lines: list[str]) -> tuple[list[str], int]:
+    # indices of the instructions and labels, comments and blank lines are skipped
+    code = [i for i, line in enumerate(lines) if is_code(line.strip())]
+    result: list[list[str]] = [[line] for line in lines]
+    saved = 0
+
+    cursor = 0
+    while cursor < len(code):
+        window: list[str] = []
+        for index in code[cursor: cursor + WINDOW_SIZE]:
+            line = lines[index].strip()
+            if is_label(line):
+                break
+            window.append(line)
+
+        for rule in RULES:
+            match = rule(window) if window else None
+            if match is not None:
+                break
+        else:
+            cursor += 1
+            continue
+
+        length, replacement = match
+        matched = code[cursor: cursor + length]
+        for index in matched:
+            result[index] = []
+        result[matched[0]] = replacement
+        saved += length - len(replacement)
+        cursor += length
+
+    return [line for replaced in result for line in replaced], saved
+
+
+def optimize(lines: list[str]) -> tuple[list[str], list[int]]:
+    saved_per_pass: list[int] = []
+    while True:
+        lines, saved = optimize_pass(lines)
+        saved_per_pass.append(saved)
+        if saved == 0:
+            return lines, saved_per_pass
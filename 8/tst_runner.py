@@ -0,0 +1,290 @@
+from typing import Literal
+import argparse
+import io
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from pathlib import Path
+
+from hack_assembler import assemble
+from hack_emulator import HackEmulator
+from vm_interpreter import VMInterpreter
+from vm_translator import CodeWriter, TranslatorOptions, translate_files, translate_init
+
+# Runs the .tst scripts of the 7/ and 8/ suites headlessly and checks the
+# output table against the 'compare-to' file. The CPU emulator scripts load a
+# program rebuilt in memory from the .vm files next to the script and run it
+# on HackEmulator; the VM emulator scripts (*VME.tst) run the .vm files on
+# VMInterpreter.
+
+TST_TOKEN = re.compile(r'[{},;]|[^\s{},;]+')
+OUTPUT_SPEC = re.compile(r'^(?P<name>.+)%(?P<format>[BDXS])(?P<left>\d+)\.(?P<width>\d+)\.(?P<right>\d+)$')
+RAM_NAME = re.compile(r'^RAM\[(\d+)\]$')
+SEGMENT_NAME = re.compile(r'^(local|argument|this|that|temp)\[(\d+)\]$')
+
+# VM emulator names of the segment pointers
+POINTER_NAMES = {'sp': 0, 'local': 1, 'argument': 2, 'this': 3, 'that': 4}
+
+Format = Literal['B', 'D', 'X', 'S']
+
+
+@dataclass
+class TstCommand:
+    name: str
+    args: list[str]
+    body: list['TstCommand'] = field(default_factory=list)
+
+
+@dataclass
+class OutputColumn:
+    name: str
+    format: Format
+    left: int
+    width: int
+    right: int
+
+
+@dataclass
+class TstResult:
+    tst_path: str
+    passed: bool
+    cycles: int
+    seconds: float
+    message: str = ''
+
+
+def strip_comments(text: str) -> str:
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    return re.sub(r'//[^\n]*', '', text)
+
+
+def parse_tst(text: str) -> list[TstCommand]:
+    tokens = TST_TOKEN.findall(strip_comments(text))
+    commands, _ = parse_commands(tokens, 0)
+    return commands
+
+
+def parse_commands(tokens: list[str], cursor: int) -> tuple[list[TstCommand], int]:
+    commands: list[TstCommand] = []
+    words: list[str] = []
+    while cursor < len(tokens):
+        token = tokens[cursor]
+        cursor += 1
+        if token in {',', ';'}:
+            if words:
+                commands.append(TstCommand(words[0], words[1:]))
+            words = []
+        elif token == '{':
+            body, cursor = parse_commands(tokens, cursor)
+            commands.append(TstCommand(words[0], words[1:], body))
+            words = []
+        elif token == '}':
+            break
+        else:
+            words.append(token)
+    if words:
+        commands.append(TstCommand(words[0], words[1:]))
+    return commands, cursor
+
+
+def parse_output_column(spec: str) -> OutputColumn:
+    match = OUTPUT_SPEC.match(spec)
+    if match is None:
+        raise ValueError(f'invalid output-list entry: {spec}')
+    return OutputColumn(match['name'], match['format'], int(match['left']), int(match['width']), int(match['right']))
+
+
+def format_header(column: OutputColumn) -> str:
+    total = column.left + column.width + column.right
+    name = column.name[:total]
+    left = (total - len(name)) // 2
+    return ' ' * left + name + ' ' * (total - len(name) - left)
+
+
+def format_value(column: OutputColumn, value: int) -> str:
+    match column.format:
+        case 'D':
+            text = str(value)
+        case 'B':
+            text = f'{value & 0xFFFF:016b}'[-column.width:]
+        case 'X':
+            text = f'{value & 0xFFFF:04X}'[-column.width:]
+        case 'S':
+            text = chr(value) if 0 <= value < 0x110000 else ''
+    return ' ' * column.left + text.rjust(column.width) + ' ' * column.right
+
+
+def lines_match(actual: str, expected: str) -> bool:
+    # '*' in the compare file matches any character
+    return len(actual) == len(expected) and all(e == '*' or a == e for a, e in zip(actual, expected))
+
+
+def translate_suite(directory: Path, options: TranslatorOptions) -> str:
+    input_file_paths = sorted(p.as_posix() for p in directory.glob('*.vm'))
+    if (directory / 'Sys.vm').is_file():
+        asm, _ = translate_init(options)
+    else:
+        # the script sets up the stack itself, only the (self-skipping) stubs are needed
+        output = io.StringIO()
+        writer = CodeWriter(output, vm_class_name='$init', options=options)
+        writer.write_stubs()
+        writer.close()
+        asm = output.getvalue()
+    return asm + ''.join(fragment.asm for fragment in translate_files(input_file_paths, options))
+
+
+class TstRunner:
+    def __init__(self, tst_path: str, options: TranslatorOptions = TranslatorOptions(), write_out: bool = False, jit: bool = False):
+        self.tst_path = Path(tst_path)
+        self.directory = self.tst_path.parent
+        self.options = options
+        self.write_out = write_out
+        self.jit = jit
+        self.emulator: HackEmulator | VMInterpreter | None = None
+        self.columns: list[OutputColumn] = []
+        self.output: list[str] = []
+        self.output_file: Path | None = None
+        self.compare_file: Path | None = None
+
+    def run(self) -> TstResult:
+        start = time.perf_counter()
+        with open(self.tst_path, 'r') as f:
+            commands = parse_tst(f.read())
+        self.execute(commands)
+        passed, message = self.compare()
+        if self.write_out and self.output_file is not None:
+            self.output_file.write_text(''.join(f'{line}\n' for line in self.output))
+        cycles = self.emulator.cycles if self.emulator is not None else 0
+        return TstResult(self.tst_path.as_posix(), passed, cycles, time.perf_counter() - start, message)
+
+    def execute(self, commands: list[TstCommand]):
+        for command in commands:
+            match command.name:
+                case 'load':
+                    self.load(command.args[0] if command.args else '')
+                case 'output-file':
+                    self.output_file = self.directory / command.args[0]
+                case 'compare-to':
+                    self.compare_file = self.directory / command.args[0]
+                case 'output-list':
+                    self.columns = [parse_output_column(spec) for spec in command.args]
+                    self.output.append('|' + '|'.join(format_header(column) for column in self.columns) + '|')
+                case 'set':
+                    self.set(command.args[0], int(command.args[1]))
+                case 'repeat':
+                    cycles = int(command.args[0])
+                    if all(c.name in {'ticktock', 'vmstep'} for c in command.body):
+                        self.emulator.run(cycles * len(command.body))
+                    else:
+                        for _ in range(cycles):
+                            self.execute(command.body)
+                case 'ticktock' | 'vmstep':
+                    self.emulator.run(1)
+                case 'output':
+                    self.output.append('|' + '|'.join(format_value(column, self.get(column.name)) for column in self.columns) + '|')
+                case 'echo' | 'tick' | 'tock':
+                    pass
+                case _:
+                    raise ValueError(f'unsupported .tst command: {command.name}')
+
+    def load(self, program: str):
+        # a VM emulator script loads one .vm file or, without a name, the whole directory
+        if program.endswith('.vm'):
+            self.emulator = VMInterpreter.from_files([(self.directory / program).as_posix()])
+        elif program == '':
+            self.emulator = VMInterpreter.from_files(sorted(p.as_posix() for p in self.directory.glob('*.vm')))
+        elif program.endswith('.hack'):
+            self.emulator = HackEmulator.from_file((self.directory / program).as_posix(), self.jit)
+        else:
+            asm = translate_suite(self.directory, self.options)
+            self.emulator = HackEmulator(assemble(asm.split('\n')), self.jit)
+
+    def set(self, name: str, value: int):
+        address = self.address(name)
+        if address is not None:
+            self.emulator.ram[address] = value
+        elif name in {'A', 'D', 'PC'}:
+            setattr(self.emulator, name.lower(), value)
+        else:
+            raise ValueError(f'unsupported variable: {name}')
+
+    def get(self, name: str) -> int:
+        address = self.address(name)
+        if address is not None:
+            return self.emulator.ram[address]
+        if name == 'time':
+            return self.emulator.cycles
+        return getattr(self.emulator, name.lower())
+
+    def address(self, name: str) -> int | None:
+        match = RAM_NAME.match(name)
+        if match is not None:
+            return int(match[1])
+        if isinstance(self.emulator, VMInterpreter):
+            if name in POINTER_NAMES:
+                return POINTER_NAMES[name]
+            match = SEGMENT_NAME.match(name)
+            if match is not None:
+                base = 5 if match[1] == 'temp' else self.emulator.ram[POINTER_NAMES[match[1]]]
+                return base + int(match[2])
+        return None
+
+    def compare(self) -> tuple[bool, str]:
+        if self.compare_file is None:
+            return True, ''
+        with open(self.compare_file, 'r') as f:
+            expected = [line.rstrip('\r\n') for line in f if line.strip()]
+        for i, (actual, wanted) in enumerate(zip(self.output, expected)):
+            if not lines_match(actual, wanted):
+                return False, f'comparison failure at line {i + 1}:\nexpected {wanted}\nactual   {actual}'
+        if len(self.output) != len(expected):
+            return False, f'expected {len(expected)} output lines, got {len(self.output)}'
+        return True, ''
+
+
+def run_tst(tst_path: str, options: TranslatorOptions = TranslatorOptions(), write_out: bool = False, jit: bool = False) -> TstResult:
+    try:
+        return TstRunner(tst_path, options, write_out, jit).run()
+    except Exception as e:
+        return TstResult(tst_path, False, 0, 0.0, f'{type(e).__name__}: {e}')
+
+
+def find_tst_files(paths: list[Path], vme: bool = True) -> list[str]:
+    # the *VME.tst scripts target the VM emulator, not the CPU
+    tst_files: list[str] = []
+    for path in paths:
+        candidates = sorted(path.rglob('*.tst')) if path.is_dir() else [path]
+        tst_files += [p.as_posix() for p in candidates if vme or not p.name.endswith('VME.tst')]
+    return tst_files
+
+
+if __name__ == '__main__':
+    here = Path(__file__).parent
+    arg_parser = argparse.ArgumentParser(prog='tst_runner.py')
+    arg_parser.add_argument('paths', nargs='*', type=Path, default=[here.parent / '7', here], help='.tst files or directories to search (default: 7/ and 8/)')
+    arg_parser.add_argument('--jobs', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    arg_parser.add_argument('--compact', action='store_true')
+    arg_parser.add_argument('--peephole', action='store_true')
+    arg_parser.add_argument('--shared-compare', action='store_true')
+    arg_parser.add_argument('--jit', action='store_true', help='run the programs in the block-compiling emulator mode')
+    arg_parser.add_argument('--write-out', action='store_true', help='write the output-file named by each script')
+    arg_parser.add_argument('--no-vme', action='store_true', help='skip the VM emulator scripts (*VME.tst)')
+    args = arg_parser.parse_args()
+    options = TranslatorOptions(compact=args.compact, optimize=args.peephole, shared_compare=args.shared_compare)
+
+    start = time.perf_counter()
+    tst_files = find_tst_files(args.paths, not args.no_vme)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = list(executor.map(run_tst, tst_files, repeat(options), repeat(args.write_out), repeat(args.jit)))
+
+    for result in results:
+        print(f'{"PASS" if result.passed else "FAIL"} {result.tst_path} ({result.cycles} cycles, {result.seconds * 1000:.0f} ms)')
+        for line in result.message.splitlines():
+            print(f'    {line}')
+
+    failed = sum(not result.passed for result in results)
+    print(f'{len(results) - failed} passed, {failed} failed in {time.perf_counter() - start:.2f}s')
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,304 @@
+from typing import Iterable
+from array import array
+import argparse
+import time
+from pathlib import Path
+
+from vm_os import Halt, Native, NativeOS, OS_CLASSES, write_pbm
+from vm_translator import ParsedLine, SEGMENT_BASE_ADDRESSES, VMB_SUFFIX, read_commands
+
+# Runs .vm programs directly, without translating them to Hack.
+# Commands are decoded once into (opcode, x, y) tuples: labels and function
+# entry points are resolved to code indices and statics to RAM addresses, and
+# the labels themselves are dropped (the VM emulator does not count them as
+# steps either). The stack, the segment pointers and the segments live in a
+# 32K array('h') RAM laid out exactly as the translated program would use it.
+# Calls to the OS classes chosen native in a NativeOS run as Python functions
+# on that RAM instead.
+
+MEMORY_SIZE = 32768
+STACK_BASE = 256
+STATIC_BASE = 16
+
+(
+    PUSH_CONSTANT, PUSH_SEGMENT, PUSH_ADDRESS, POP_SEGMENT, POP_ADDRESS,
+    ADD, SUB, NEG, EQ, GT, LT, AND, OR, NOT,
+    GOTO, IF_GOTO, FUNCTION, CALL, CALL_NATIVE, RETURN,
+) = range(20)
+
+ARITHMETIC_OPCODES = {
+    'add': ADD,
+    'sub': SUB,
+    'neg': NEG,
+    'eq': EQ,
+    'gt': GT,
+    'lt': LT,
+    'and': AND,
+    'or': OR,
+    'not': NOT,
+}
+
+# RAM address of the base pointer of every pointer-based segment
+SEGMENT_POINTERS = {
+    'local': 1,
+    'argument': 2,
+    'this': 3,
+    'that': 4,
+}
+
+Instruction = tuple[int, int | Native, int | array]
+
+
+class VMInterpreter:
+    code: list[Instruction]
+    functions: dict[str, int]
+    statics: dict[str, int]
+    bootstrap: bool
+    native_os: NativeOS | None
+    natives: dict[str, Native]
+    ram: array
+    pc: int
+    # executed VM commands, a native call counts as one
+    cycles: int
+    # set once Sys.halt (or Sys.error) has run natively
+    halted: bool
+    halt_reason: str
+
+    def __init__(self, classes: Iterable[tuple[str, Iterable[ParsedLine]]], bootstrap: bool = False, native_os: NativeOS | None = None):
+        # bootstrap: start like the translated program, SP=256 and 'call Sys.init 0';
+        # otherwise start at Sys.init (or the first command) with the RAM left to the caller
+        self.bootstrap = bootstrap
+        self.native_os = native_os
+        self.natives = native_os.functions() if native_os is not None else {}
+        self.functions = {}
+        self.statics = {}
+        self.code = []
+        labels: dict[str, int] = {}
+        if bootstrap:
+            self.code.append((CALL, 'Sys.init', 0))
+
+        if native_os is not None:
+            # the bytecode of the native classes is not loaded
+            classes = [(name, commands) for name, commands in classes if name not in native_os.classes]
+            classes += native_os.vm_classes()
+
+        for vm_class_name, commands in classes:
+            function_name = None
+            for line in commands:
+                match line.command:
+                    case 'C_ARITHMETIC':
+                        self.code.append((ARITHMETIC_OPCODES[line.arg1], 0, 0))
+                    case 'C_PUSH' | 'C_POP':
+                        self.code.append(self.decode_push_pop(line, vm_class_name))
+                    case 'C_LABEL':
+                        labels[scoped_label(function_name, line.arg1)] = len(self.code)
+                    case 'C_GOTO':
+                        self.code.append((GOTO, scoped_label(function_name, line.arg1), 0))
+                    case 'C_IF':
+                        self.code.append((IF_GOTO, scoped_label(function_name, line.arg1), 0))
+                    case 'C_FUNCTION':
+                        function_name = line.arg1
+                        self.functions[function_name] = len(self.code)
+                        self.code.append((FUNCTION, line.arg2, array('h', bytes(2 * line.arg2))))
+                    case 'C_RETURN':
+                        self.code.append((RETURN, 0, 0))
+                    case 'C_CALL':
+                        self.code.append((CALL, line.arg1, line.arg2))
+
+        # return addresses are pushed onto the 16-bit stack
+        if len(self.code) > 0x7FFF:
+            raise ValueError(f'program too large: {len(self.code)} VM commands')
+        self.code = [self.resolve(instruction, labels) for instruction in self.code]
+        self.reset()
+
+    @classmethod
+    def from_files(cls, input_file_paths: list[str], bootstrap: bool = False, native_os: NativeOS | None = None) -> 'VMInterpreter':
+        return cls(((Path(p).stem, read_commands(p)) for p in input_file_paths), bootstrap, native_os)
+
+    def decode_push_pop(self, line: ParsedLine, vm_class_name: str) -> Instruction:
+        segment, index = line.arg1, line.arg2
+        if segment == 'constant':
+            if line.command == 'C_POP':
+                raise ValueError('pop constant')
+            return (PUSH_CONSTANT, index, 0)
+        if segment in SEGMENT_POINTERS:
+            return (PUSH_SEGMENT if line.command == 'C_PUSH' else POP_SEGMENT, SEGMENT_POINTERS[segment], index)
+
+        if segment == 'static':
+            # allocated contiguously from 16 in order of first use, as the VM emulator does
+            address = self.statics.setdefault(f'{vm_class_name}.static.{index}', STATIC_BASE + len(self.statics))
+        else:
+            address = SEGMENT_BASE_ADDRESSES[segment] + index
+        return (PUSH_ADDRESS if line.command == 'C_PUSH' else POP_ADDRESS, address, 0)
+
+    def resolve(self, instruction: Instruction, labels: dict[str, int]) -> Instruction:
+        op, x, y = instruction
+        if op in (GOTO, IF_GOTO):
+            if x not in labels:
+                raise ValueError(f'undefined label {x}')
+            return (op, labels[x], y)
+        if op == CALL:
+            if x in self.natives:
+                return (CALL_NATIVE, self.natives[x], y)
+            if x not in self.functions:
+                raise ValueError(f'undefined function {x}')
+            return (op, self.functions[x], y)
+        return instruction
+
+    def reset(self):
+        self.ram = array('h', bytes(2 * MEMORY_SIZE))
+        self.cycles = 0
+        self.halted = False
+        self.halt_reason = ''
+        if self.native_os is not None:
+            self.native_os.reset(self.ram)
+        if self.bootstrap:
+            self.ram[0] = STACK_BASE
+            self.pc = 0
+        else:
+            self.pc = self.functions.get('Sys.init', 0)
+
+    def run(self, cycles: int):
+        if self.halted:
+            return
+        code = self.code
+        ram = self.ram
+        pc = self.pc
+        # SP lives in a local while running and is written back to RAM[0] afterwards
+        sp = ram[0]
+        step = -1
+
+        try:
+            for step in range(cycles):
+                op, x, y = code[pc]
+                pc += 1
+                if op == PUSH_SEGMENT:
+                    ram[sp] = ram[ram[x] + y]
+                    sp += 1
+                elif op == PUSH_CONSTANT:
+                    ram[sp] = x
+                    sp += 1
+                elif op == POP_SEGMENT:
+                    sp -= 1
+                    ram[ram[x] + y] = ram[sp]
+                elif op == PUSH_ADDRESS:
+                    ram[sp] = ram[x]
+                    sp += 1
+                elif op == POP_ADDRESS:
+                    sp -= 1
+                    ram[x] = ram[sp]
+                elif op == ADD:
+                    sp -= 1
+                    out = ram[sp - 1] + ram[sp]
+                    ram[sp - 1] = out - 0x10000 if out > 0x7FFF else out + 0x10000 if out < -0x8000 else out
+                elif op == SUB:
+                    sp -= 1
+                    out = ram[sp - 1] - ram[sp]
+                    ram[sp - 1] = out - 0x10000 if out > 0x7FFF else out + 0x10000 if out < -0x8000 else out
+                elif op == IF_GOTO:
+                    sp -= 1
+                    if ram[sp]:
+                        pc = x
+                elif op == GOTO:
+                    pc = x
+                elif op == CALL:
+                    # return address, LCL, ARG, THIS, THAT
+                    ram[sp] = pc
+                    ram[sp + 1:sp + 5] = ram[1:5]
+                    sp += 5
+                    ram[2] = sp - 5 - y
+                    ram[1] = sp
+                    pc = x
+                elif op == CALL_NATIVE:
+                    # the arguments are replaced by the result, like a VM function's return does;
+                    # SP is visible to the native and reloaded in case it poked it
+                    sp -= y
+                    ram[0] = sp
+                    out = x(*ram[sp:sp + y])
+                    sp = ram[0]
+                    ram[sp] = out
+                    sp += 1
+                elif op == FUNCTION:
+                    ram[sp:sp + x] = y
+                    sp += x
+                elif op == RETURN:
+                    frame = ram[1]
+                    pc = ram[frame - 5]
+                    arg = ram[2]
+                    ram[arg] = ram[sp - 1]
+                    sp = arg + 1
+                    ram[1:5] = ram[frame - 4:frame]
+                elif op == EQ:
+                    sp -= 1
+                    ram[sp - 1] = -(ram[sp - 1] == ram[sp])
+                elif op == GT:
+                    sp -= 1
+                    ram[sp - 1] = -(ram[sp - 1] > ram[sp])
+                elif op == LT:
+                    sp -= 1
+                    ram[sp - 1] = -(ram[sp - 1] < ram[sp])
+                elif op == NOT:
+                    ram[sp - 1] = ~ram[sp - 1]
+                elif op == AND:
+                    sp -= 1
+                    ram[sp - 1] &= ram[sp]
+                elif op == OR:
+                    sp -= 1
+                    ram[sp - 1] |= ram[sp]
+                elif op == NEG:
+                    out = -ram[sp - 1]
+                    ram[sp - 1] = -0x8000 if out == 0x8000 else out
+
+        except Halt as e:
+            self.halted = True
+            self.halt_reason = str(e)
+
+        ram[0] = sp
+        self.pc = pc
+        self.cycles += step + 1
+
+
+def scoped_label(function_name: str | None, label: str) -> str:
+    # the same scoping as CodeWriter.scoped_label
+    return label if function_name is None else f'{function_name}${label}'
+
+
+def find_vm_files(path: Path) -> list[str]:
+    if path.is_dir():
+        # a .vmb stands in for a missing .vm, as in vm_translator.py
+        return sorted(p.as_posix() for p in path.rglob('*') if p.suffix == '.vm' or (p.suffix == VMB_SUFFIX and not p.with_suffix('.vm').is_file()))
+    return [path.as_posix()]
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='vm_interpreter.py')
+    arg_parser.add_argument('path', type=Path, help='.vm/.vmb file or directory of .vm/.vmb files')
+    arg_parser.add_argument('--cycles', type=int, default=1_000_000, help='VM commands to execute')
+    arg_parser.add_argument('--no-bootstrap', action='store_true', help='start at Sys.init without setting SP and calling it (programs without a Sys.vm always start at their first command)')
+    arg_parser.add_argument('--set', nargs=2, type=int, action='append', default=[], metavar=('ADDRESS', 'VALUE'), help='set RAM[ADDRESS] before running')
+    arg_parser.add_argument('--ram', nargs='*', type=int, default=list(range(5)), metavar='ADDRESS', help='RAM cells to print afterwards')
+    arg_parser.add_argument('--native', nargs='*', default=None, choices=OS_CLASSES, metavar='CLASS', help='run these OS classes (all of them if none is named) as Python code')
+    arg_parser.add_argument('--keys', default='', help='keyboard input for Keyboard.readChar/readLine/readInt of the native OS')
+    arg_parser.add_argument('--screen', default=None, metavar='FILE', help='write the screen to FILE as a PBM image afterwards')
+    args = arg_parser.parse_args()
+
+    native_os = None
+    if args.native is not None:
+        native_os = NativeOS(args.native or OS_CLASSES, args.keys)
+    input_file_paths = find_vm_files(args.path)
+    has_sys = any(Path(p).stem == 'Sys' for p in input_file_paths) or (native_os is not None and 'Sys' in native_os.classes)
+    interpreter = VMInterpreter.from_files(input_file_paths, not args.no_bootstrap and has_sys, native_os)
+    for address, value in args.set:
+        interpreter.ram[address] = value
+
+    start = time.perf_counter()
+    interpreter.run(args.cycles)
+    elapsed = time.perf_counter() - start
+
+    for address in args.ram:
+        print(f'RAM[{address}] = {interpreter.ram[address]}')
+    if args.screen is not None:
+        write_pbm(interpreter.ram, args.screen)
+    if interpreter.halted:
+        print(f'halted ({interpreter.halt_reason})')
+    print(f'{interpreter.cycles} VM commands in {elapsed:.2f}s: {interpreter.cycles / elapsed:,.0f} commands/s')
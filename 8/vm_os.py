@@ -0,0 +1,598 @@
+from typing import Callable, Iterable
+from array import array
+from bisect import insort
+from math import isqrt
+
+from vm_translator import ParsedLine, parse_lines
+
+# Python implementations of the Jack OS classes (12/) for VMInterpreter.
+# They act on the interpreter's RAM image: the heap is 2048-16383, the screen
+# 16384-24575 (32 words per row, bit 0 is the leftmost pixel) and the keyboard
+# 24576. Errors are reported the way the Jack OS does, with the Sys.error codes.
+#
+# The classes are chosen one by one, a native class replaces the bytecode of
+# the same class. Native objects are laid out as
+#   String: [maxLength, length, chars...]
+# and allocated from the native heap, so the classes that allocate or read
+# these objects can only be native together (NATIVE_DEPENDENCIES).
+
+OS_CLASSES = ['Array', 'Keyboard', 'Math', 'Memory', 'Output', 'Screen', 'String', 'Sys']
+
+NATIVE_DEPENDENCIES = {
+    'Array': {'Memory'},
+    'String': {'Memory'},
+    'Output': {'String'},
+    'Keyboard': {'String', 'Output'},
+}
+
+MEMORY_SIZE = 32768
+HEAP_BASE = 2048
+HEAP_END = 16384
+SCREEN = 16384
+KBD = 24576
+
+NEW_LINE = 128
+BACKSPACE = 129
+DOUBLE_QUOTE = 34
+
+ROWS = 23
+COLUMNS = 64
+
+# with Sys native, Sys.init initializes the OS classes in the order of the Jack OS and runs Main.main
+SYS_INIT = """\
+function Sys.init 0
+call Memory.init 0
+pop temp 0
+call Math.init 0
+pop temp 0
+call Screen.init 0
+pop temp 0
+call Output.init 0
+pop temp 0
+call Keyboard.init 0
+pop temp 0
+call Main.main 0
+pop temp 0
+call Sys.halt 0
+pop temp 0
+"""
+
+# 8x11 character bitmaps of Output.initMap, one row per entry, bit 0 leftmost
+FONT = {
+    0: (63, 63, 63, 63, 63, 63, 63, 63, 63, 0, 0),  # black square
+    32: (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0),  # ' '
+    33: (12, 30, 30, 30, 12, 12, 0, 12, 12, 0, 0),  # '!'
+    34: (54, 54, 20, 0, 0, 0, 0, 0, 0, 0, 0),  # '"'
+    35: (0, 18, 18, 63, 18, 18, 63, 18, 18, 0, 0),  # '#'
+    36: (12, 30, 51, 3, 30, 48, 51, 30, 12, 12, 0),  # '$'
+    37: (0, 0, 35, 51, 24, 12, 6, 51, 49, 0, 0),  # '%'
+    38: (12, 30, 30, 12, 54, 27, 27, 27, 54, 0, 0),  # '&'
+    39: (12, 12, 6, 0, 0, 0, 0, 0, 0, 0, 0),  # "'"
+    40: (24, 12, 6, 6, 6, 6, 6, 12, 24, 0, 0),  # '('
+    41: (6, 12, 24, 24, 24, 24, 24, 12, 6, 0, 0),  # ')'
+    42: (0, 0, 0, 51, 30, 63, 30, 51, 0, 0, 0),  # '*'
+    43: (0, 0, 0, 12, 12, 63, 12, 12, 0, 0, 0),  # '+'
+    44: (0, 0, 0, 0, 0, 0, 0, 12, 12, 6, 0),  # ','
+    45: (0, 0, 0, 0, 0, 63, 0, 0, 0, 0, 0),  # '-'
+    46: (0, 0, 0, 0, 0, 0, 0, 12, 12, 0, 0),  # '.'
+    47: (0, 0, 32, 48, 24, 12, 6, 3, 1, 0, 0),  # '/'
+    48: (12, 30, 51, 51, 51, 51, 51, 30, 12, 0, 0),  # '0'
+    49: (12, 14, 15, 12, 12, 12, 12, 12, 63, 0, 0),  # '1'
+    50: (30, 51, 48, 24, 12, 6, 3, 51, 63, 0, 0),  # '2'
+    51: (30, 51, 48, 48, 28, 48, 48, 51, 30, 0, 0),  # '3'
+    52: (16, 24, 28, 26, 25, 63, 24, 24, 60, 0, 0),  # '4'
+    53: (63, 3, 3, 31, 48, 48, 48, 51, 30, 0, 0),  # '5'
+    54: (28, 6, 3, 3, 31, 51, 51, 51, 30, 0, 0),  # '6'
+    55: (63, 49, 48, 48, 24, 12, 12, 12, 12, 0, 0),  # '7'
+    56: (30, 51, 51, 51, 30, 51, 51, 51, 30, 0, 0),  # '8'
+    57: (30, 51, 51, 51, 62, 48, 48, 24, 14, 0, 0),  # '9'
+    58: (0, 0, 12, 12, 0, 0, 12, 12, 0, 0, 0),  # ':'
+    59: (0, 0, 12, 12, 0, 0, 12, 12, 6, 0, 0),  # ';'
+    60: (0, 0, 24, 12, 6, 3, 6, 12, 24, 0, 0),  # '<'
+    61: (0, 0, 0, 63, 0, 0, 63, 0, 0, 0, 0),  # '='
+    62: (0, 0, 3, 6, 12, 24, 12, 6, 3, 0, 0),  # '>'
+    63: (30, 51, 51, 24, 12, 12, 0, 12, 12, 0, 0),  # '?'
+    64: (30, 51, 51, 59, 59, 59, 27, 3, 30, 0, 0),  # '@'
+    65: (12, 30, 51, 51, 63, 51, 51, 51, 51, 0, 0),  # 'A'
+    66: (31, 51, 51, 51, 31, 51, 51, 51, 31, 0, 0),  # 'B'
+    67: (28, 54, 35, 3, 3, 3, 35, 54, 28, 0, 0),  # 'C'
+    68: (15, 27, 51, 51, 51, 51, 51, 27, 15, 0, 0),  # 'D'
+    69: (63, 51, 35, 11, 15, 11, 35, 51, 63, 0, 0),  # 'E'
+    70: (63, 51, 35, 11, 15, 11, 3, 3, 3, 0, 0),  # 'F'
+    71: (28, 54, 35, 3, 59, 51, 51, 54, 44, 0, 0),  # 'G'
+    72: (51, 51, 51, 51, 63, 51, 51, 51, 51, 0, 0),  # 'H'
+    73: (30, 12, 12, 12, 12, 12, 12, 12, 30, 0, 0),  # 'I'
+    74: (60, 24, 24, 24, 24, 24, 27, 27, 14, 0, 0),  # 'J'
+    75: (51, 51, 51, 27, 15, 27, 51, 51, 51, 0, 0),  # 'K'
+    76: (3, 3, 3, 3, 3, 3, 35, 51, 63, 0, 0),  # 'L'
+    77: (33, 51, 63, 63, 51, 51, 51, 51, 51, 0, 0),  # 'M'
+    78: (51, 51, 55, 55, 63, 59, 59, 51, 51, 0, 0),  # 'N'
+    79: (30, 51, 51, 51, 51, 51, 51, 51, 30, 0, 0),  # 'O'
+    80: (31, 51, 51, 51, 31, 3, 3, 3, 3, 0, 0),  # 'P'
+    81: (30, 51, 51, 51, 51, 51, 63, 59, 30, 48, 0),  # 'Q'
+    82: (31, 51, 51, 51, 31, 27, 51, 51, 51, 0, 0),  # 'R'
+    83: (30, 51, 51, 6, 28, 48, 51, 51, 30, 0, 0),  # 'S'
+    84: (63, 63, 45, 12, 12, 12, 12, 12, 30, 0, 0),  # 'T'
+    85: (51, 51, 51, 51, 51, 51, 51, 51, 30, 0, 0),  # 'U'
+    86: (51, 51, 51, 51, 51, 30, 30, 12, 12, 0, 0),  # 'V'
+    87: (51, 51, 51, 51, 51, 63, 63, 63, 18, 0, 0),  # 'W'
+    88: (51, 51, 30, 30, 12, 30, 30, 51, 51, 0, 0),  # 'X'
+    89: (51, 51, 51, 51, 30, 12, 12, 12, 30, 0, 0),  # 'Y'
+    90: (63, 51, 49, 24, 12, 6, 35, 51, 63, 0, 0),  # 'Z'
+    91: (30, 6, 6, 6, 6, 6, 6, 6, 30, 0, 0),  # '['
+    92: (0, 0, 1, 3, 6, 12, 24, 48, 32, 0, 0),  # '\\'
+    93: (30, 24, 24, 24, 24, 24, 24, 24, 30, 0, 0),  # ']'
+    94: (8, 28, 54, 0, 0, 0, 0, 0, 0, 0, 0),  # '^'
+    95: (0, 0, 0, 0, 0, 0, 0, 0, 0, 63, 0),  # '_'
+    96: (6, 12, 24, 0, 0, 0, 0, 0, 0, 0, 0),  # '`'
+    97: (0, 0, 0, 14, 24, 30, 27, 27, 54, 0, 0),  # 'a'
+    98: (3, 3, 3, 15, 27, 51, 51, 51, 30, 0, 0),  # 'b'
+    99: (0, 0, 0, 30, 51, 3, 3, 51, 30, 0, 0),  # 'c'
+    100: (48, 48, 48, 60, 54, 51, 51, 51, 30, 0, 0),  # 'd'
+    101: (0, 0, 0, 30, 51, 63, 3, 51, 30, 0, 0),  # 'e'
+    102: (28, 54, 38, 6, 15, 6, 6, 6, 15, 0, 0),  # 'f'
+    103: (0, 0, 30, 51, 51, 51, 62, 48, 51, 30, 0),  # 'g'
+    104: (3, 3, 3, 27, 55, 51, 51, 51, 51, 0, 0),  # 'h'
+    105: (12, 12, 0, 14, 12, 12, 12, 12, 30, 0, 0),  # 'i'
+    106: (48, 48, 0, 56, 48, 48, 48, 48, 51, 30, 0),  # 'j'
+    107: (3, 3, 3, 51, 27, 15, 15, 27, 51, 0, 0),  # 'k'
+    108: (14, 12, 12, 12, 12, 12, 12, 12, 30, 0, 0),  # 'l'
+    109: (0, 0, 0, 29, 63, 43, 43, 43, 43, 0, 0),  # 'm'
+    110: (0, 0, 0, 29, 51, 51, 51, 51, 51, 0, 0),  # 'n'
+    111: (0, 0, 0, 30, 51, 51, 51, 51, 30, 0, 0),  # 'o'
+    112: (0, 0, 0, 30, 51, 51, 51, 31, 3, 3, 0),  # 'p'
+    113: (0, 0, 0, 30, 51, 51, 51, 62, 48, 48, 0),  # 'q'
+    114: (0, 0, 0, 29, 55, 51, 3, 3, 7, 0, 0),  # 'r'
+    115: (0, 0, 0, 30, 51, 6, 24, 51, 30, 0, 0),  # 's'
+    116: (4, 6, 6, 15, 6, 6, 6, 54, 28, 0, 0),  # 't'
+    117: (0, 0, 0, 27, 27, 27, 27, 27, 54, 0, 0),  # 'u'
+    118: (0, 0, 0, 51, 51, 51, 51, 30, 12, 0, 0),  # 'v'
+    119: (0, 0, 0, 51, 51, 51, 63, 63, 18, 0, 0),  # 'w'
+    120: (0, 0, 0, 51, 30, 12, 12, 30, 51, 0, 0),  # 'x'
+    121: (0, 0, 0, 51, 51, 51, 62, 48, 24, 15, 0),  # 'y'
+    122: (0, 0, 0, 63, 27, 12, 6, 51, 63, 0, 0),  # 'z'
+    123: (56, 12, 12, 12, 7, 12, 12, 12, 56, 0, 0),  # '{'
+    124: (12, 12, 12, 12, 12, 12, 12, 12, 12, 0, 0),  # '|'
+    125: (7, 12, 12, 12, 56, 12, 12, 12, 7, 0, 0),  # '}'
+    126: (38, 45, 25, 0, 0, 0, 0, 0, 0, 0, 0),  # '~'
+}
+
+Native = Callable[..., int]
+
+
+class Halt(Exception):
+    pass
+
+
+def to_word(value: int) -> int:
+    return ((value + 0x8000) & 0xFFFF) - 0x8000
+
+
+class NativeOS:
+    classes: set[str]
+    keys: list[int]
+    ram: array
+    error_code: int | None
+    # Memory: free blocks as sorted [address, size] pairs, sizes of the allocated ones
+    free: list[list[int]]
+    allocated: dict[int, int]
+    # Screen
+    color: bool
+    # Output cursor
+    row: int
+    column: int
+    # Keyboard input left to read
+    input: list[int]
+
+    def __init__(self, classes: Iterable[str] = OS_CLASSES, keys: str = ''):
+        self.classes = set(classes)
+        for name in self.classes:
+            if name not in OS_CLASSES:
+                raise ValueError(f'not an OS class: {name}')
+            missing = NATIVE_DEPENDENCIES.get(name, set()) - self.classes
+            if missing:
+                raise ValueError(f'native {name} needs native {", ".join(sorted(missing))}')
+        # keys typed on the keyboard for readChar/readLine/readInt, '\n' is Enter and '\b' Backspace
+        self.keys = [NEW_LINE if c == '\n' else BACKSPACE if c == '\b' else ord(c) for c in keys]
+        self.reset(array('h', bytes(2 * MEMORY_SIZE)))
+
+    def reset(self, ram: array):
+        self.ram = ram
+        self.error_code = None
+        self.free = [[HEAP_BASE, HEAP_END - HEAP_BASE]]
+        self.allocated = {}
+        self.color = True
+        self.row = 0
+        self.column = 0
+        self.input = list(self.keys)
+
+    def functions(self) -> dict[str, Native]:
+        table: dict[str, Native] = {
+            'Array.new': self.array_new,
+            'Array.dispose': self.memory_de_alloc,
+            'Keyboard.init': self.nothing,
+            'Keyboard.keyPressed': self.key_pressed,
+            'Keyboard.readChar': self.read_char,
+            'Keyboard.readLine': self.read_line,
+            'Keyboard.readInt': self.read_int,
+            'Math.init': self.nothing,
+            'Math.multiply': self.multiply,
+            'Math.divide': self.divide,
+            'Math.sqrt': self.sqrt,
+            'Math.max': self.max,
+            'Math.min': self.min,
+            'Math.abs': self.abs,
+            'Memory.init': self.nothing,
+            'Memory.peek': self.peek,
+            'Memory.poke': self.poke,
+            'Memory.alloc': self.alloc,
+            'Memory.deAlloc': self.memory_de_alloc,
+            'Output.init': self.output_init,
+            'Output.moveCursor': self.move_cursor,
+            'Output.printChar': self.print_char,
+            'Output.printString': self.print_string,
+            'Output.printInt': self.print_int,
+            'Output.println': self.println,
+            'Output.backSpace': self.output_back_space,
+            'Screen.init': self.nothing,
+            'Screen.clearScreen': self.clear_screen,
+            'Screen.setColor': self.set_color,
+            'Screen.drawPixel': self.draw_pixel,
+            'Screen.drawLine': self.draw_line,
+            'Screen.drawRectangle': self.draw_rectangle,
+            'Screen.drawCircle': self.draw_circle,
+            'String.new': self.string_new,
+            'String.dispose': self.memory_de_alloc,
+            'String.length': self.length,
+            'String.charAt': self.char_at,
+            'String.setCharAt': self.set_char_at,
+            'String.appendChar': self.append_char,
+            'String.eraseLastChar': self.erase_last_char,
+            'String.intValue': self.int_value,
+            'String.setInt': self.set_int,
+            'String.newLine': lambda: NEW_LINE,
+            'String.backSpace': lambda: BACKSPACE,
+            'String.doubleQuote': lambda: DOUBLE_QUOTE,
+            'Sys.halt': self.halt,
+            'Sys.wait': self.wait,
+            'Sys.error': self.error,
+        }
+        return {name: function for name, function in table.items() if name.split('.')[0] in self.classes}
+
+    def vm_classes(self) -> list[tuple[str, list[ParsedLine]]]:
+        # the parts of the native classes that have to run as VM code
+        if 'Sys' in self.classes:
+            return [('Sys', list(parse_lines(SYS_INIT.splitlines())))]
+        return []
+
+    def nothing(self) -> int:
+        return 0
+
+    # Math
+
+    def multiply(self, x: int, y: int) -> int:
+        return to_word(x * y)
+
+    def divide(self, x: int, y: int) -> int:
+        if y == 0:
+            self.error(3)
+        quotient = abs(x) // abs(y)
+        return to_word(quotient if (x < 0) == (y < 0) else -quotient)
+
+    def sqrt(self, x: int) -> int:
+        if x < 0:
+            self.error(4)
+        return isqrt(x)
+
+    def max(self, a: int, b: int) -> int:
+        return a if a > b else b
+
+    def min(self, a: int, b: int) -> int:
+        return a if a < b else b
+
+    def abs(self, x: int) -> int:
+        return to_word(abs(x))
+
+    # Memory
+
+    def peek(self, address: int) -> int:
+        return self.ram[address]
+
+    def poke(self, address: int, value: int) -> int:
+        self.ram[address] = value
+        return 0
+
+    def alloc(self, size: int) -> int:
+        if size <= 0:
+            self.error(5)
+        for i, (address, free_size) in enumerate(self.free):
+            if free_size >= size:
+                if free_size == size:
+                    del self.free[i]
+                else:
+                    self.free[i] = [address + size, free_size - size]
+                self.allocated[address] = size
+                return address
+        self.error(6)
+
+    def memory_de_alloc(self, address: int) -> int:
+        size = self.allocated.pop(address, None)
+        if size is None:
+            return 0
+        insort(self.free, [address, size])
+        # merge with the neighbouring free blocks
+        i = self.free.index([address, size])
+        if i + 1 < len(self.free) and address + size == self.free[i + 1][0]:
+            self.free[i][1] += self.free.pop(i + 1)[1]
+        if i > 0 and self.free[i - 1][0] + self.free[i - 1][1] == address:
+            self.free[i - 1][1] += self.free.pop(i)[1]
+        return 0
+
+    # Array
+
+    def array_new(self, size: int) -> int:
+        if size <= 0:
+            self.error(2)
+        return self.alloc(size)
+
+    # String
+
+    def string_new(self, max_length: int) -> int:
+        if max_length < 0:
+            self.error(14)
+        this = self.alloc(max_length + 2)
+        self.ram[this] = max_length
+        self.ram[this + 1] = 0
+        return this
+
+    def length(self, this: int) -> int:
+        return self.ram[this + 1]
+
+    def char_at(self, this: int, j: int) -> int:
+        if not 0 <= j < self.ram[this + 1]:
+            self.error(15)
+        return self.ram[this + 2 + j]
+
+    def set_char_at(self, this: int, j: int, c: int) -> int:
+        if not 0 <= j < self.ram[this + 1]:
+            self.error(16)
+        self.ram[this + 2 + j] = c
+        return 0
+
+    def append_char(self, this: int, c: int) -> int:
+        length = self.ram[this + 1]
+        if length == self.ram[this]:
+            self.error(17)
+        self.ram[this + 2 + length] = c
+        self.ram[this + 1] = length + 1
+        return this
+
+    def erase_last_char(self, this: int) -> int:
+        if self.ram[this + 1] == 0:
+            self.error(18)
+        self.ram[this + 1] -= 1
+        return 0
+
+    def int_value(self, this: int) -> int:
+        # the leading digits, after an optional '-'
+        text = self.read_string(this)
+        sign = -1 if text.startswith('-') else 1
+        value = 0
+        for c in text[1:] if sign < 0 else text:
+            if not '0' <= c <= '9':
+                break
+            value = value * 10 + ord(c) - ord('0')
+        return to_word(sign * value)
+
+    def set_int(self, this: int, value: int) -> int:
+        text = str(value)
+        if len(text) > self.ram[this]:
+            self.error(19)
+        self.ram[this + 2:this + 2 + len(text)] = array('h', map(ord, text))
+        self.ram[this + 1] = len(text)
+        return 0
+
+    def read_string(self, this: int) -> str:
+        return ''.join(map(chr, self.ram[this + 2:this + 2 + self.ram[this + 1]]))
+
+    def make_string(self, text: str) -> int:
+        this = self.string_new(len(text))
+        self.ram[this + 2:this + 2 + len(text)] = array('h', map(ord, text))
+        self.ram[this + 1] = len(text)
+        return this
+
+    # Screen
+
+    def clear_screen(self) -> int:
+        self.ram[SCREEN:KBD] = array('h', bytes(2 * (KBD - SCREEN)))
+        return 0
+
+    def set_color(self, b: int) -> int:
+        self.color = b != 0
+        return 0
+
+    def set_bits(self, address: int, mask: int):
+        word = self.ram[address] & 0xFFFF
+        word = word | mask if self.color else word & ~mask
+        self.ram[address] = word - 0x10000 if word & 0x8000 else word
+
+    def set_pixel(self, x: int, y: int):
+        self.set_bits(SCREEN + y * 32 + (x >> 4), 1 << (x & 15))
+
+    def draw_horizontal(self, y: int, x1: int, x2: int):
+        # x1 <= x2, whole words are written at once
+        row = SCREEN + y * 32
+        first, last = x1 >> 4, x2 >> 4
+        if first == last:
+            self.set_bits(row + first, ((2 << (x2 & 15)) - 1) & ~((1 << (x1 & 15)) - 1))
+            return
+        self.set_bits(row + first, 0xFFFF & ~((1 << (x1 & 15)) - 1))
+        self.ram[row + first + 1:row + last] = array('h', [-1 if self.color else 0]) * (last - first - 1)
+        self.set_bits(row + last, (2 << (x2 & 15)) - 1)
+
+    def draw_pixel(self, x: int, y: int) -> int:
+        if not (0 <= x < 512 and 0 <= y < 256):
+            self.error(7)
+        self.set_pixel(x, y)
+        return 0
+
+    def draw_line(self, x1: int, y1: int, x2: int, y2: int) -> int:
+        if not (0 <= x1 < 512 and 0 <= x2 < 512 and 0 <= y1 < 256 and 0 <= y2 < 256):
+            self.error(8)
+        if x1 > x2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        dx, dy = x2 - x1, y2 - y1
+        if dy == 0:
+            self.draw_horizontal(y1, x1, x2)
+            return 0
+
+        # the pixel-by-pixel walk of the Jack OS, so both draw the same pixels
+        step = 1 if dy > 0 else -1
+        dy = abs(dy)
+        a = b = diff = 0
+        y = y1
+        while a <= dx and b <= dy:
+            self.set_pixel(x1 + a, y)
+            if diff < 0:
+                a += 1
+                diff += dy
+            else:
+                b += 1
+                y += step
+                diff -= dx
+        return 0
+
+    def draw_rectangle(self, x1: int, y1: int, x2: int, y2: int) -> int:
+        if not (0 <= x1 <= x2 < 512 and 0 <= y1 <= y2 < 256):
+            self.error(9)
+        for y in range(y1, y2 + 1):
+            self.draw_horizontal(y, x1, x2)
+        return 0
+
+    def draw_circle(self, x: int, y: int, r: int) -> int:
+        if not (0 <= x < 512 and 0 <= y < 256):
+            self.error(12)
+        if not 0 <= r <= 181:
+            self.error(13)
+        # rows and columns off the screen are clipped
+        for dy in range(max(-r, -y), min(r, 255 - y) + 1):
+            half_width = isqrt(r * r - dy * dy)
+            self.draw_horizontal(y + dy, max(x - half_width, 0), min(x + half_width, 511))
+        return 0
+
+    # Output
+
+    def output_init(self) -> int:
+        self.row = 0
+        self.column = 0
+        return 0
+
+    def draw_char(self, c: int):
+        bitmap = FONT.get(c, FONT[0])
+        address = SCREEN + self.row * 11 * 32 + (self.column >> 1)
+        # two characters per word, the odd column in the high byte
+        shift = 8 if self.column & 1 else 0
+        keep = 0x00FF if shift else 0xFF00
+        ram = self.ram
+        for bits in bitmap:
+            word = (ram[address] & keep) | (bits << shift)
+            ram[address] = word - 0x10000 if word & 0x8000 else word
+            address += 32
+
+    def move_cursor(self, i: int, j: int) -> int:
+        if not (0 <= i < ROWS and 0 <= j < COLUMNS):
+            self.error(20)
+        self.row = i
+        self.column = j
+        self.draw_char(ord(' '))
+        return 0
+
+    def print_char(self, c: int) -> int:
+        if c == NEW_LINE:
+            return self.println()
+        if c == BACKSPACE:
+            return self.output_back_space()
+        self.draw_char(c)
+        self.column += 1
+        if self.column == COLUMNS:
+            self.println()
+        return 0
+
+    def print_string(self, s: int) -> int:
+        for c in self.ram[s + 2:s + 2 + self.ram[s + 1]]:
+            self.print_char(c)
+        return 0
+
+    def print_int(self, i: int) -> int:
+        for c in str(i):
+            self.print_char(ord(c))
+        return 0
+
+    def println(self) -> int:
+        self.column = 0
+        self.row = (self.row + 1) % ROWS
+        return 0
+
+    def output_back_space(self) -> int:
+        if self.column > 0:
+            self.column -= 1
+        elif self.row > 0:
+            self.row -= 1
+            self.column = COLUMNS - 1
+        return 0
+
+    # Keyboard
+
+    def key_pressed(self) -> int:
+        return self.ram[KBD]
+
+    def read_char(self) -> int:
+        # the headless keyboard is the keys given to the constructor
+        if not self.input:
+            raise Halt('end of keyboard input')
+        c = self.input.pop(0)
+        self.print_char(c)
+        return c
+
+    def read_line(self, message: int) -> int:
+        self.print_string(message)
+        line: list[str] = []
+        while (c := self.read_char()) != NEW_LINE:
+            if c == BACKSPACE:
+                if line:
+                    line.pop()
+            else:
+                line.append(chr(c))
+        return self.make_string(''.join(line))
+
+    def read_int(self, message: int) -> int:
+        line = self.read_line(message)
+        value = self.int_value(line)
+        self.memory_de_alloc(line)
+        return value
+
+    # Sys
+
+    def halt(self) -> int:
+        raise Halt('Sys.halt')
+
+    def wait(self, duration: int) -> int:
+        # nothing to wait for without a display
+        if duration < 0:
+            self.error(1)
+        return 0
+
+    def error(self, code: int):
+        self.error_code = code
+        for c in f'ERR{code}':
+            self.print_char(ord(c))
+        raise Halt(f'ERR{code}')
+
+
+def write_pbm(ram: array, output_file_path: str):
+    # the screen as a plain 512x256 bitmap, 1 is black
+    with open(output_file_path, 'w') as f:
+        f.write('P1\n512 256\n')
+        for y in range(256):
+            row = ram[SCREEN + y * 32:SCREEN + (y + 1) * 32]
+            f.write(''.join(f'{word & 0xFFFF:016b}'[::-1] for word in row) + '\n')
@@ -1,14 +1,27 @@
-from typing import Literal, get_args
+from typing import Iterable, Iterator, Literal, TextIO, get_args
+from array import array
+import argparse
+import hashlib
+import io
+import os
+import struct
 import sys
 import textwrap
-from dataclasses import dataclass
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
 from pathlib import Path
 
+import peephole
+
 Command = Literal['C_ARITHMETIC', 'C_PUSH', 'C_POP', 'C_LABEL', 'C_GOTO', 'C_IF', 'C_FUNCTION', 'C_RETURN', 'C_CALL']
 Arithmetic = Literal["add", "sub", 'eq', 'lt', 'gt', 'neg', 'and', 'or', 'not']
 
 Segment = Literal['local', 'argument', 'this', 'that', 'constant', 'temp', 'pointer', 'static']
 
+ARITHMETIC_COMMANDS = frozenset(get_args(Arithmetic))
+
 def to_command(command: str) -> Command | None:
         match command:
             case 'push':
@@ -28,7 +41,7 @@ def to_command(command: str) -> Command | None:
             case 'call':
                 return 'C_CALL'
             case _:
-                if command in set(get_args(Arithmetic)):
+                if command in ARITHMETIC_COMMANDS:
                     return 'C_ARITHMETIC'
                 else:
                     return None
@@ -40,401 +53,611 @@ class ParsedLine:
     arg2: int | None
 
 
+def parse_line(line: str) -> ParsedLine | None:
+    if line.startswith('//'):
+        return None
+    line_splitted: list[str] = line.split()
+    if len(line_splitted) == 0:
+        return None
+
+    command = to_command(line_splitted[0])
+    if command is None:
+        return None
+    
+    if command == 'C_ARITHMETIC':
+        arg1 = line_splitted[0]
+        arg2 = None
+
+    elif command in {'C_LABEL', 'C_GOTO', 'C_IF'}:
+        arg1 = line_splitted[1]
+        arg2 = None
+
+    elif command == 'C_RETURN':
+        arg1 = None
+        arg2 = None
+
+    else:
+        arg1 = line_splitted[1]
+        arg2 = int(line_splitted[2])
+
+    return ParsedLine(command=command, arg1=arg1, arg2=arg2)
+
+
+def parse_lines(lines: Iterable[str]) -> Iterator[ParsedLine]:
+    for line in lines:
+        parsed_line = parse_line(line)
+        if parsed_line is not None:
+            yield parsed_line
+
+
 class Parser:
     def __init__(self, input_file_path: str):
         self.file = open(input_file_path, 'r')
-        self.lines = self.file.readlines()
-        self.cursor = 0
+        # lines are read lazily, one line of lookahead answers has_more_commands
+        self.next_line = self.file.readline()
 
     def has_more_commands(self) -> bool:
-        return self.cursor < len(self.lines)
+        return self.next_line != ''
 
     def advance(self) -> ParsedLine | None:
-        line = self.lines[self.cursor]
-        self.cursor += 1;
-
-        if line.startswith('//'):
-            return None
-        line_splitted: list[str] = line.split()
-        if len(line_splitted) == 0:
-            return None
-
-        command = to_command(line_splitted[0])
-        if command is None:
-            return None
-        
-        if command == 'C_ARITHMETIC':
-            arg1 = line_splitted[0]
-            arg2 = None
+        line = self.next_line
+        self.next_line = self.file.readline()
+        if self.next_line == '':
+            self.file.close()
+        return parse_line(line)
 
-        elif command in {'C_LABEL', 'C_GOTO', 'C_IF'}:
-            arg1 = line_splitted[1]
-            arg2 = None
+    def commands(self) -> Iterator[ParsedLine]:
+        while self.has_more_commands():
+            line = self.advance()
+            if line is not None:
+                yield line
 
-        elif command == 'C_RETURN':
-            arg1 = None
-            arg2 = None
 
-        else:
-            arg1 = line_splitted[1]
-            arg2 = int(line_splitted[2])
+# .vmb: the parsed commands of a .vm file in binary, so repeated builds skip the text parsing.
+#   header: b'VMB2', the sha256 of the .vm file it was written from, u32 number of
+#           commands, u32 size of the string table (little-endian)
+#   string table: the label and function names in UTF-8, joined by '\n'
+#   commands: one u32 each, opcode | segment << 8 | argument << 16
+# The argument is the index of push/pop and the string table index of the name
+# of label/goto/if-goto/function/call; function and call keep nLocals/nArgs in
+# the segment byte.
 
-        return ParsedLine(command=command, arg1=arg1, arg2=arg2)
-            
+VMB_MAGIC = b'VMB2'
+VMB_HEADER = struct.Struct('<4s32sII')
+VMB_SUFFIX = '.vmb'
+
+VMB_OPCODES: list[tuple[Command, str | None]] = [('C_ARITHMETIC', arithmetic) for arithmetic in get_args(Arithmetic)] + [
+    ('C_PUSH', None), ('C_POP', None), ('C_LABEL', None), ('C_GOTO', None), ('C_IF', None), ('C_FUNCTION', None), ('C_CALL', None), ('C_RETURN', None),
+]
+VMB_OPCODE_NUMBERS = {key: opcode for opcode, key in enumerate(VMB_OPCODES)}
+VMB_SEGMENTS: list[Segment] = list(get_args(Segment))
+
+
+def encode_vmb(commands: Iterable[ParsedLine], source_digest: bytes = bytes(32)) -> bytes:
+    strings: dict[str, int] = {}
+    words = array('I')
+    for line in commands:
+        segment = argument = 0
+        match line.command:
+            case 'C_ARITHMETIC':
+                opcode = VMB_OPCODE_NUMBERS[('C_ARITHMETIC', line.arg1)]
+            case 'C_PUSH' | 'C_POP':
+                opcode = VMB_OPCODE_NUMBERS[(line.command, None)]
+                segment = VMB_SEGMENTS.index(line.arg1)
+                argument = line.arg2
+            case 'C_LABEL' | 'C_GOTO' | 'C_IF':
+                opcode = VMB_OPCODE_NUMBERS[(line.command, None)]
+                argument = strings.setdefault(line.arg1, len(strings))
+            case 'C_FUNCTION' | 'C_CALL':
+                opcode = VMB_OPCODE_NUMBERS[(line.command, None)]
+                segment = line.arg2
+                argument = strings.setdefault(line.arg1, len(strings))
+            case 'C_RETURN':
+                opcode = VMB_OPCODE_NUMBERS[('C_RETURN', None)]
+        if not (0 <= segment <= 0xFF and 0 <= argument <= 0xFFFF):
+            raise ValueError(f'does not fit in a .vmb command: {line}')
+        words.append(opcode | segment << 8 | argument << 16)
+
+    if sys.byteorder == 'big':
+        words.byteswap()
+    table = '\n'.join(strings).encode()
+    return VMB_HEADER.pack(VMB_MAGIC, source_digest, len(words), len(table)) + table + words.tobytes()
+
+
+def decode_vmb(data: bytes) -> list[ParsedLine]:
+    magic, _, count, table_size = VMB_HEADER.unpack_from(data)
+    if magic != VMB_MAGIC:
+        raise ValueError('not a .vmb file')
+    view = memoryview(data)
+    strings = bytes(view[VMB_HEADER.size:VMB_HEADER.size + table_size]).decode().split('\n')
+    words = array('I')
+    words.frombytes(view[VMB_HEADER.size + table_size:VMB_HEADER.size + table_size + 4 * count])
+    if sys.byteorder == 'big':
+        words.byteswap()
+
+    # equal commands decode to the same ParsedLine instance, treat them as read-only
+    decoded: dict[int, ParsedLine] = {}
+    lines: list[ParsedLine] = []
+    for word in words:
+        line = decoded.get(word)
+        if line is None:
+            command, arithmetic = VMB_OPCODES[word & 0xFF]
+            segment, argument = (word >> 8) & 0xFF, word >> 16
+            match command:
+                case 'C_ARITHMETIC':
+                    line = ParsedLine(command, arithmetic, None)
+                case 'C_PUSH' | 'C_POP':
+                    line = ParsedLine(command, VMB_SEGMENTS[segment], argument)
+                case 'C_LABEL' | 'C_GOTO' | 'C_IF':
+                    line = ParsedLine(command, strings[argument], None)
+                case 'C_FUNCTION' | 'C_CALL':
+                    line = ParsedLine(command, strings[argument], segment)
+                case 'C_RETURN':
+                    line = ParsedLine(command, None, None)
+            decoded[word] = line
+        lines.append(line)
+    return lines
+
+
+def vmb_path(input_file_path: str) -> str:
+    return input_file_path[:-len('.vm')] + VMB_SUFFIX
+
+
+def write_vmb(input_file_path: str) -> str:
+    output_file_path = vmb_path(input_file_path)
+    text = Path(input_file_path).read_bytes()
+    with open(output_file_path, 'wb') as f:
+        f.write(encode_vmb(parse_lines(text.decode().splitlines()), hashlib.sha256(text).digest()))
+    return output_file_path
+
+
+def has_current_vmb(input_file_path: str) -> bool:
+    # the .vmb was written from the .vm as it is now, whatever their modification times
+    binary_path = vmb_path(input_file_path)
+    if not os.path.isfile(binary_path):
+        return False
+    with open(binary_path, 'rb') as f:
+        header = f.read(VMB_HEADER.size)
+    if len(header) < VMB_HEADER.size:
+        return False
+    magic, source_digest, _, _ = VMB_HEADER.unpack(header)
+    return magic == VMB_MAGIC and source_digest == hashlib.sha256(Path(input_file_path).read_bytes()).digest()
+
+
+def read_commands(input_file_path: str) -> Iterable[ParsedLine]:
+    # a .vm file is read from its .vmb when that was written from the same text
+    if input_file_path.endswith('.vm') and has_current_vmb(input_file_path):
+        input_file_path = vmb_path(input_file_path)
+    if input_file_path.endswith(VMB_SUFFIX):
+        with open(input_file_path, 'rb') as f:
+            return decode_vmb(f.read())
+    return Parser(input_file_path).commands()
+
+
+# Instruction templates, dedented once at import time and filled in with str.format.
+
+PUSH_D = textwrap.dedent("""\
+    @SP
+    A=M
+    M=D
+    @SP
+    M=M+1
+    """)
+
+BOOTSTRAP = textwrap.dedent("""\
+    @256
+    D=A
+    @SP
+    M=D
+    """)
+
+ARITHMETIC_TEMPLATES = {
+    'add': textwrap.dedent("""\
+        @SP
+        AM=M-1
+        D=M
+        A=A-1
+        M=D+M
+        """),
+    'sub': textwrap.dedent("""\
+        @SP
+        AM=M-1
+        D=M
+        A=A-1
+        M=M-D
+        """),
+    'neg': textwrap.dedent("""\
+        @SP
+        A=M-1
+        M=-M
+        """),
+    'and': textwrap.dedent("""\
+        @SP
+        AM=M-1
+        D=M
+        A=A-1
+        M=D&M
+        """),
+    'or': textwrap.dedent("""\
+        @SP
+        AM=M-1
+        D=M
+        A=A-1
+        M=D|M
+        """),
+    'not': textwrap.dedent("""\
+        @SP
+        A=M-1
+        M=!M
+        """),
+}
+
+COMPARE_JUMPS = {'eq': 'JEQ', 'lt': 'JLT', 'gt': 'JGT'}
+
+COMPARE = textwrap.dedent("""\
+    @SP
+    AM=M-1
+    D=M
+    A=A-1
+    D=M-D
+    @label.true.{label}
+    D;{jump}
+    @SP
+    A=M-1
+    M=0
+    @label.end.{label}
+    0;JMP
+    (label.true.{label})
+    @SP
+    A=M-1
+    M=-1
+    (label.end.{label})
+    """)
+
+SHARED_COMPARE = textwrap.dedent("""\
+    @label.cmp.{label}
+    D=A
+    @$${arithmetic}
+    0;JMP
+    (label.cmp.{label})
+    """)
+
+# $$eq/$$lt/$$gt: D = return address, replaces the two topmost values by the comparison result
+COMPARE_STUB = textwrap.dedent("""\
+    ($${arithmetic})
+    @R15
+    M=D
+    @SP
+    AM=M-1
+    D=M
+    A=A-1
+    D=M-D
+    M=-1
+    @$${arithmetic}.end
+    D;{jump}
+    @SP
+    A=M-1
+    M=0
+    ($${arithmetic}.end)
+    @R15
+    A=M
+    0;JMP
+    """)
+
+PUSH_CONSTANT = textwrap.dedent("""\
+    @{index}
+    D=A
+    """) + PUSH_D
+
+PUSH_ADDRESS = textwrap.dedent("""\
+    @{address}
+    D=M
+    """) + PUSH_D
+
+POP_ADDRESS = textwrap.dedent("""\
+    @SP
+    AM=M-1
+    D=M
+    @{address}
+    M=D
+    """)
+
+PUSH_SEGMENT = textwrap.dedent("""\
+    @{register}
+    D=M
+    @{index}
+    A=D+A
+    D=M
+    """) + PUSH_D
+
+POP_SEGMENT = textwrap.dedent("""\
+    @{register}
+    D=M
+    @{index}
+    D=D+A
+    @label.temp.addr
+    M=D
+    @SP
+    AM=M-1
+    D=M
+    @label.temp.addr
+    A=M
+    M=D
+    """)
+
+LABEL = '({label})\n'
+
+GOTO = textwrap.dedent("""\
+    @{label}
+    0;JMP
+    """)
+
+IF_GOTO = textwrap.dedent("""\
+    @SP
+    AM=M-1
+    D=M
+    @{label}
+    D;JNE
+    """)
+
+PUSH_REGISTER = textwrap.dedent("""\
+    @{register}
+    D=M
+    """) + PUSH_D
+
+CALL = textwrap.dedent("""\
+    @{return_label}
+    D=A
+    """) + PUSH_D + '\n' + '\n'.join(PUSH_REGISTER.format(register=register) for register in ['LCL', 'ARG', 'THIS', 'THAT']) + '\n' + textwrap.dedent("""\
+    @SP
+    D=M
+    @{frame_size}
+    D=D-A
+    @ARG
+    M=D
+
+    @SP
+    D=M
+    @LCL
+    M=D
+
+    @{function_name}
+    0;JMP
+
+    ({return_label})
+    """)
+
+# $$call: R13 = 5 + nArgs, R14 = callee address, D = return address
+COMPACT_CALL = textwrap.dedent("""\
+    @{frame_size}
+    D=A
+    @R13
+    M=D
+    @{function_name}
+    D=A
+    @R14
+    M=D
+    @{return_label}
+    D=A
+    @$$call
+    0;JMP
+    ({return_label})
+    """)
+
+CALL_STUB = '($$call)\n' + PUSH_D + ''.join(PUSH_REGISTER.format(register=register) for register in ['LCL', 'ARG', 'THIS', 'THAT']) + textwrap.dedent("""\
+    @SP
+    D=M
+    @R13
+    D=D-M
+    @ARG
+    M=D
+    @SP
+    D=M
+    @LCL
+    M=D
+    @R14
+    A=M
+    0;JMP
+    """)
+
+RESTORE_REGISTER = textwrap.dedent("""\
+    @label.temp.FRAME
+    D=M
+    @{offset}
+    A=D-A
+    D=M
+    @{register}
+    M=D
+    """)
+
+RETURN = textwrap.dedent("""\
+    @LCL
+    D=M
+    @label.temp.FRAME
+    M=D
+    @label.temp.FRAME
+    D=M
+    @5
+    A=D-A
+    D=M
+    @label.temp.RET
+    M=D
+    """) + POP_SEGMENT.format(register='ARG', index=0) + textwrap.dedent("""\
+    @ARG
+    D=M
+    @SP
+    M=D+1
+    """) + ''.join(RESTORE_REGISTER.format(offset=i + 1, register=register) for i, register in enumerate(['THAT', 'THIS', 'ARG', 'LCL'])) + textwrap.dedent("""\
+    @label.temp.RET
+    A=M
+    0;JMP
+    """)
+
+COMPACT_RETURN = textwrap.dedent("""\
+    @$$return
+    0;JMP
+    """)
+
+# $$return: R13 = FRAME, R14 = return address
+RETURN_STUB = textwrap.dedent("""\
+    ($$return)
+    @LCL
+    D=M
+    @R13
+    M=D
+    @5
+    A=D-A
+    D=M
+    @R14
+    M=D
+    @SP
+    AM=M-1
+    D=M
+    @ARG
+    A=M
+    M=D
+    @ARG
+    D=M
+    @SP
+    M=D+1
+    """) + ''.join(textwrap.dedent(f"""\
+    @R13
+    AM=M-1
+    D=M
+    @{register}
+    M=D
+    """) for register in ['THAT', 'THIS', 'ARG', 'LCL']) + textwrap.dedent("""\
+    @R14
+    A=M
+    0;JMP
+    """)
+
+PUSH_ZERO = PUSH_CONSTANT.format(index=0)
+
+SEGMENT_REGISTERS = {
+    'local': 'LCL',
+    'argument': 'ARG',
+    'this': 'THIS',
+    'that': 'THAT',
+}
+
+SEGMENT_BASE_ADDRESSES = {
+    'temp': 5,
+    'pointer': 3,
+}
+
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# part of the fragment cache key, bump it whenever the emitted assembly changes
+TRANSLATOR_VERSION = '8.2'
+
+CACHE_DIR_NAME = '.vmcache'
 
 WriteMode = Literal['w', 'a']
 
+@dataclass(frozen=True)
+class TranslatorOptions:
+    # compact calling convention: every call/return jumps to the shared $$call/$$return stubs
+    compact: bool = False
+    # instructions are buffered and run through the peephole optimizer
+    optimize: bool = False
+    # eq/lt/gt jump to one shared $$eq/$$lt/$$gt routine instead of being expanded inline
+    shared_compare: bool = False
+
+
 class CodeWriter:
-    def __init__(self, output_file_path: str, vm_class_name: str | None, write_mode: WriteMode):
-         self.file = open(output_file_path, write_mode)
+    def __init__(self, output: TextIO, vm_class_name: str, options: TranslatorOptions = TranslatorOptions()):
+         self.output = output
+         self.file = io.StringIO() if options.optimize else output
          self.vm_class_name =  vm_class_name
+         # VM labels are scoped to the function they appear in
+         self.function_name: str | None = None
          self.label = 0
+         self.compact = options.compact
+         self.shared_compare = options.shared_compare
+         self.optimize = options.optimize
+         self.saved_per_pass: list[int] = []
 
     def write_init(self):
-        self.file.write(textwrap.dedent(f"""\
-        @256
-        D=A
-        @SP
-        M=D                                
-        """));
+        self.file.write(BOOTSTRAP)
         self.write_call('Sys.init', 0)
+        self.write_stubs()
+
+    def write_stubs(self):
+        if not (self.compact or self.shared_compare):
+            return
+        # the stubs are only entered through jumps, falling through skips them
+        self.write_goto('$$stubs.end')
+        if self.compact:
+            self.write_call_stubs()
+        if self.shared_compare:
+            self.write_compare_stubs()
+        self.write_label('$$stubs.end')
+
+    def write_compare_stubs(self):
+        for arithmetic, jump in COMPARE_JUMPS.items():
+            self.file.write(COMPARE_STUB.format(arithmetic=arithmetic, jump=jump))
+
+    def write_call_stubs(self):
+        self.file.write(CALL_STUB)
+        self.file.write(RETURN_STUB)
 
     def write_arithmetic(self, arithmetic: Arithmetic):
-        match arithmetic:
-            case 'add':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                AM=M-1
-                D=M
-                A=A-1
-                M=D+M
-                """));
-            
-            case 'sub':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                AM=M-1
-                D=M
-                A=A-1
-                M=M-D
-                """));
-            
-            case 'gt':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                AM=M-1
-                D=M
-                A=A-1
-                D=M-D
-                @label.true.{self.label}
-                D;JGT
-                @SP
-                A=M-1
-                M=0
-                @label.end.{self.label}
-                0;JMP
-                (label.true.{self.label})
-                @SP
-                A=M-1
-                M=-1
-                (label.end.{self.label})
-                """));
-                self.label += 1
-
-            case 'lt':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                AM=M-1
-                D=M
-                A=A-1
-                D=M-D
-                @label.true.{self.label}
-                D;JLT
-                @SP
-                A=M-1
-                M=0
-                @label.end.{self.label}
-                0;JMP
-                (label.true.{self.label})
-                @SP
-                A=M-1
-                M=-1
-                (label.end.{self.label})
-                """));
-                self.label += 1
-
-            case 'eq':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                AM=M-1
-                D=M
-                A=A-1
-                D=M-D
-                @label.true.{self.label}
-                D;JEQ
-                @SP
-                A=M-1
-                M=0
-                @label.end.{self.label}
-                0;JMP
-                (label.true.{self.label})
-                @SP
-                A=M-1
-                M=-1
-                (label.end.{self.label})
-                """));
-                self.label += 1
-
-            case 'neg':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                A=M-1
-                M=-M
-                """));
-    
-            case 'and':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                AM=M-1
-                D=M
-                A=A-1
-                M=D&M
-                """));
-    
-            case 'or':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                AM=M-1
-                D=M
-                A=A-1
-                M=D|M
-                """));
-    
-            case 'not':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                A=M-1
-                M=!M
-                """));
+        if arithmetic in COMPARE_JUMPS:
+            if self.shared_compare:
+                self.file.write(SHARED_COMPARE.format(label=self.__next_label(), arithmetic=arithmetic))
+            else:
+                self.file.write(COMPARE.format(label=self.__next_label(), jump=COMPARE_JUMPS[arithmetic]))
+        else:
+            self.file.write(ARITHMETIC_TEMPLATES[arithmetic])
 
     def write_push_pop(self, command: Command, segment: Segment, index: int):
         if segment == 'constant':
             if command == 'C_PUSH':
-                self.file.write(textwrap.dedent(f"""\
-                @{index}
-                D=A
-                @SP
-                A=M
-                M=D
-                @SP
-                M=M+1
-                """));
+                self.file.write(PUSH_CONSTANT.format(index=index))
     
-        elif segment in {'temp', 'pointer'}:
-            if segment == 'temp':
-                base_address = 5
-            if segment == 'pointer':
-                base_address = 3
+        elif segment in {'temp', 'pointer', 'static'}:
+            if segment == 'static':
+                address = f'{self.vm_class_name}.static.{index}'
+            else:
+                address = SEGMENT_BASE_ADDRESSES[segment] + index
 
             if command == 'C_PUSH':
-                self.file.write(textwrap.dedent(f"""\
-                @{base_address + index}
-                D=M
-                @SP
-                A=M
-                M=D
-                @SP
-                M=M+1
-                """));
+                self.file.write(PUSH_ADDRESS.format(address=address))
             
             if command == 'C_POP':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                AM=M-1
-                D=M
-                @{base_address + index}
-                M=D
-                """));
-        
-        elif segment == 'static':
-            if command == 'C_PUSH':
-                self.file.write(textwrap.dedent(f"""\
-                @{self.vm_class_name}.static.{index}
-                D=M
-                @SP
-                A=M
-                M=D
-                @SP
-                M=M+1
-                """));
-            
-            if command == 'C_POP':
-                self.file.write(textwrap.dedent(f"""\
-                @SP
-                AM=M-1
-                D=M
-                @{self.vm_class_name}.static.{index}
-                M=D
-                """));
+                self.file.write(POP_ADDRESS.format(address=address))
 
         else:
             if command == 'C_PUSH':
-                self.file.write(textwrap.dedent(f"""\
-                @{self.__get_address_ref(segment)}
-                D=M
-                @{index}
-                A=D+A
-                D=M
-                @SP
-                A=M
-                M=D
-                @SP
-                M=M+1
-                """));
+                self.file.write(PUSH_SEGMENT.format(register=self.__get_address_ref(segment), index=index))
             
             if command == 'C_POP':
-                self.file.write(textwrap.dedent(f"""\
-                @{self.__get_address_ref(segment)}
-                D=M
-                @{index}
-                D=D+A
-                @label.temp.addr
-                M=D
-                @SP
-                AM=M-1
-                D=M
-                @label.temp.addr
-                A=M
-                M=D
-                """));
+                self.file.write(POP_SEGMENT.format(register=self.__get_address_ref(segment), index=index))
 
     def write_label(self, label: str):
-        self.file.write(textwrap.dedent(f"""\
-        ({label})             
-        """));
+        self.file.write(LABEL.format(label=label))
     
     def write_goto(self, label: str):
-        self.file.write(textwrap.dedent(f"""\
-        @{label}
-        0;JMP
-        """));
+        self.file.write(GOTO.format(label=label))
     
     def write_if(self, label: str):
-        self.file.write(textwrap.dedent(f"""\
-        @SP
-        AM=M-1
-        D=M
-        @{label}
-        D;JNE
-        """));
+        self.file.write(IF_GOTO.format(label=label))
     
     def write_call(self, function_name: str, n_args: int):
-        self.file.write(textwrap.dedent(f"""\
-        @{function_name}.ret.{self.label}
-        D=A
-        @SP
-        A=M
-        M=D
-        @SP
-        M=M+1
-
-        @LCL
-        D=M
-        @SP
-        A=M
-        M=D
-        @SP
-        M=M+1
-        
-        @ARG
-        D=M
-        @SP
-        A=M
-        M=D
-        @SP
-        M=M+1
-                                        
-        @THIS
-        D=M
-        @SP
-        A=M
-        M=D
-        @SP
-        M=M+1
-                                        
-        @THAT
-        D=M
-        @SP
-        A=M
-        M=D
-        @SP
-        M=M+1
-                                        
-        @SP
-        D=M
-        @{5 + n_args}
-        D=D-A
-        @ARG
-        M=D
-
-        @SP
-        D=M
-        @LCL
-        M=D
-
-        @{function_name}
-        0;JMP
-
-        ({function_name}.ret.{self.label})
-        """));
-        self.label += 1
+        template = COMPACT_CALL if self.compact else CALL
+        self.file.write(template.format(function_name=function_name, frame_size=5 + n_args, return_label=f'{function_name}.ret.{self.__next_label()}'))
 
     def write_return(self):
-        self.file.write(textwrap.dedent(f"""\
-        @LCL
-        D=M
-        @label.temp.FRAME
-        M=D              
-        """));
-        self.file.write(textwrap.dedent(f"""\
-        @label.temp.FRAME
-        D=M
-        @5
-        A=D-A
-        D=M
-        @label.temp.RET
-        M=D
-        """));
-        self.write_push_pop('C_POP', 'argument', 0)
-        self.file.write(textwrap.dedent(f"""\
-        @ARG
-        D=M
-        @SP
-        M=D+1
-        """));
-        for i, addr_ref in enumerate(['THAT', 'THIS', 'ARG', 'LCL']):
-            offset: int = i + 1
-            self.file.write(textwrap.dedent(f"""\
-            @label.temp.FRAME
-            D=M
-            @{offset}
-            A=D-A
-            D=M
-            @{addr_ref}
-            M=D
-            """));
-        self.file.write(textwrap.dedent(f"""\
-        @label.temp.RET
-        A=M
-        0;JMP
-        """));
-
+        self.file.write(COMPACT_RETURN if self.compact else RETURN)
 
     def write_function(self, function_name: str, num_locals: int):
         self.write_label(function_name)
-        for _ in range(num_locals):
-            self.write_push_pop('C_PUSH', 'constant', 0)
+        self.function_name = function_name
+        self.file.write(PUSH_ZERO * num_locals)
 
+    def scoped_label(self, label: str) -> str:
+        return label if self.function_name is None else f'{self.function_name}${label}'
 
     def write_comment(self, comment: str):
         self.file.write(f'// {comment}\n')
@@ -443,74 +666,437 @@ class CodeWriter:
         self.file.write('\n')
         
 
+    def __next_label(self) -> str:
+        # generated labels are namespaced by file, so files can be translated independently
+        label = f'{self.vm_class_name}.{self.label}'
+        self.label += 1
+        return label
+
     def __get_address_ref(self, segment: Literal['local', 'argument', 'this', 'that']) -> Literal['LCL', 'ARG', 'THIS', 'THAT']:
-        map_ref = {
-            'local': 'LCL',
-            'argument': 'ARG',
-            'this': 'THIS',
-            'that': 'THAT',
-        }
-        return map_ref[segment]
+        return SEGMENT_REGISTERS[segment]
 
     def close(self):
-        self.file.close()        
+        # the output stream belongs to the caller, only the peephole buffer is flushed here
+        if self.optimize:
+            lines, self.saved_per_pass = peephole.optimize(self.file.getvalue().split('\n'))
+            self.output.write('\n'.join(lines))
+
 
-def write_init(output_file_path: str):
-    writer = CodeWriter(output_file_path=output_file_path, vm_class_name=None, write_mode='w')
+def translate_init(options: TranslatorOptions = TranslatorOptions()) -> tuple[str, list[int]]:
+    output = io.StringIO()
+    writer = CodeWriter(output, vm_class_name='$init', options=options)
     writer.write_init()
     writer.close()
-    
+    return output.getvalue(), writer.saved_per_pass
 
-def write_asm(input_file_path: str, output_file_path: str, write_mode: WriteMode):
-    parser = Parser(input_file_path)
-    writer = CodeWriter(output_file_path, vm_class_name=input_file_path.split('/')[-1].split('.')[0], write_mode=write_mode)
 
-    while parser.has_more_commands():
-        line = parser.advance()
-        if line is not None:
-            writer.write_comment(line)
-            match line.command:
-                case 'C_ARITHMETIC':
-                    writer.write_arithmetic(arithmetic=line.arg1)
-                case 'C_PUSH' | 'C_POP':
-                    writer.write_push_pop(command=line.command, segment=line.arg1, index=line.arg2)
-                case 'C_LABEL':
-                    writer.write_label(label=line.arg1)
-                case 'C_GOTO':
-                    writer.write_goto(label=line.arg1)
-                case 'C_IF':
-                    writer.write_if(label=line.arg1)
-                case 'C_FUNCTION':
-                    writer.write_function(function_name=line.arg1, num_locals=line.arg2)
-                case 'C_RETURN':
-                    writer.write_return()
-                case 'C_CALL':
-                    writer.write_call(function_name=line.arg1, n_args=line.arg2)
-            writer.write_empty_line()
+def translate_command(writer: CodeWriter, line: ParsedLine):
+    writer.write_comment(line)
+    match line.command:
+        case 'C_ARITHMETIC':
+            writer.write_arithmetic(arithmetic=line.arg1)
+        case 'C_PUSH' | 'C_POP':
+            writer.write_push_pop(command=line.command, segment=line.arg1, index=line.arg2)
+        case 'C_LABEL':
+            writer.write_label(label=writer.scoped_label(line.arg1))
+        case 'C_GOTO':
+            writer.write_goto(label=writer.scoped_label(line.arg1))
+        case 'C_IF':
+            writer.write_if(label=writer.scoped_label(line.arg1))
+        case 'C_FUNCTION':
+            writer.write_function(function_name=line.arg1, num_locals=line.arg2)
+        case 'C_RETURN':
+            writer.write_return()
+        case 'C_CALL':
+            writer.write_call(function_name=line.arg1, n_args=line.arg2)
+    writer.write_empty_line()
+
+
+def translate_commands(commands: Iterable[ParsedLine], vm_class_name: str, options: TranslatorOptions = TranslatorOptions()) -> tuple[str, list[int]]:
+    output = io.StringIO()
+    writer = CodeWriter(output, vm_class_name=vm_class_name, options=options)
+
+    for line in commands:
+        translate_command(writer, line)
     writer.close()
+    return output.getvalue(), writer.saved_per_pass
 
 
-if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python vm_translator.py <filename>")
+def to_vm_class_name(input_file_path: str) -> str:
+    return input_file_path.split('/')[-1].split('.')[0]
+
+
+def translate_vm(input_file_path: str, options: TranslatorOptions = TranslatorOptions()) -> tuple[str, list[int]]:
+    return translate_commands(read_commands(input_file_path), to_vm_class_name(input_file_path), options)
+
+
+# Whole-program dead-function elimination: only the functions reachable from
+# Sys.init, the function the bootstrap calls, are kept.
+
+ENTRY_FUNCTION = 'Sys.init'
+
+VMClass = tuple[str, list[ParsedLine]]
+
+
+def split_functions(commands: list[ParsedLine]) -> list[tuple[str | None, list[ParsedLine]]]:
+    # the commands before the first function are under None
+    functions: list[tuple[str | None, list[ParsedLine]]] = [(None, [])]
+    for line in commands:
+        if line.command == 'C_FUNCTION':
+            functions.append((line.arg1, []))
+        functions[-1][1].append(line)
+    return functions if functions[0][1] else functions[1:]
+
+
+def reachable_functions(classes: list[VMClass], entry: str = ENTRY_FUNCTION) -> set[str]:
+    callees: dict[str, set[str]] = {}
+    roots = {entry}
+    for _, commands in classes:
+        functions = split_functions(commands)
+        for i, (function_name, lines) in enumerate(functions):
+            calls = {line.arg1 for line in lines if line.command == 'C_CALL'}
+            if function_name is None:
+                roots |= calls
+                continue
+            callees.setdefault(function_name, set()).update(calls)
+            # a function that does not end in return or goto runs on into the next one
+            if lines[-1].command not in {'C_RETURN', 'C_GOTO'} and i + 1 < len(functions):
+                callees[function_name].add(functions[i + 1][0])
+
+    reachable: set[str] = set()
+    pending = list(roots)
+    while pending:
+        function_name = pending.pop()
+        if function_name not in reachable:
+            reachable.add(function_name)
+            pending += callees.get(function_name, ())
+    return reachable
+
+
+def prune_functions(classes: list[VMClass], entry: str = ENTRY_FUNCTION) -> tuple[list[VMClass], list[list[str]]]:
+    # returns the classes without their unreachable functions, and those functions per class;
+    # a program without the entry function (the 7/ and 8/ tests without a Sys.vm) is kept whole
+    defined = {line.arg1 for _, commands in classes for line in commands if line.command == 'C_FUNCTION'}
+    if entry not in defined:
+        return classes, [[] for _ in classes]
+
+    reachable = reachable_functions(classes, entry)
+    pruned: list[VMClass] = []
+    dropped: list[list[str]] = []
+    for vm_class_name, commands in classes:
+        functions = split_functions(commands)
+        pruned.append((vm_class_name, [line for function_name, lines in functions if function_name is None or function_name in reachable for line in lines]))
+        dropped.append([function_name for function_name, _ in functions if function_name is not None and function_name not in reachable])
+    return pruned, dropped
+
+
+# Inlining: a call to a small leaf function is replaced by the function's
+# body. The arguments are popped into locals added to the caller, the callee's
+# argument/local accesses are remapped onto them, its labels are renamed per
+# call site and a return before the end becomes a goto past the body. THIS/THAT
+# are saved around a body that sets them, as the return would have restored
+# them. Callees using statics are only inlined into their own class.
+
+# most commands between 'function' and the final 'return' of an inlined function
+INLINE_MAX_SIZE = 12
+
+UNARY_COMMANDS = frozenset({'neg', 'not'})
+
+
+@dataclass
+class InlineBody:
+    vm_class_name: str
+    num_locals: int
+    commands: list[ParsedLine]
+
+
+def segment_accesses(commands: Iterable[ParsedLine], segment: Segment) -> list[ParsedLine]:
+    return [line for line in commands if line.command in ('C_PUSH', 'C_POP') and line.arg1 == segment]
+
+
+def inline_body(vm_class_name: str, lines: list[ParsedLine], max_size: int = INLINE_MAX_SIZE) -> InlineBody | None:
+    # the body must only work on its own part of the stack and return with exactly the
+    # return value on it; it branches with nothing else on it, as compiled Jack does
+    commands = lines[1:-1]
+    if len(commands) > max_size or lines[-1].command != 'C_RETURN':
+        return None
+    depth = 0
+    for line in lines[1:]:
+        match line.command:
+            case 'C_PUSH':
+                depth += 1
+            case 'C_POP' if depth >= 1:
+                depth -= 1
+            case 'C_ARITHMETIC' if depth >= (1 if line.arg1 in UNARY_COMMANDS else 2):
+                depth -= line.arg1 not in UNARY_COMMANDS
+            case 'C_LABEL' | 'C_GOTO' if depth == 0:
+                pass
+            case 'C_IF' | 'C_RETURN' if depth == 1:
+                depth = 0
+            case _:
+                return None
+    return InlineBody(vm_class_name, lines[0].arg2, commands)
+
+
+def expand_call(body: InlineBody, n_args: int, base: int, prefix: str) -> list[ParsedLine] | None:
+    # the body of a call with n_args arguments on locals base, base + 1, ... of the caller,
+    # with its labels renamed to prefix:label
+    if any(line.arg2 >= n_args for line in segment_accesses(body.commands, 'argument')):
+        return None
+    # a single argument that is only pushed, first thing, stays where it is on the stack;
+    # with more, the pops below would take it for the one under it
+    commands = body.commands
+    on_stack = n_args == 1 and commands[0] == ParsedLine('C_PUSH', 'argument', 0) and not segment_accesses(commands[1:], 'argument')
+    if on_stack:
+        commands = commands[1:]
+    expansion = [ParsedLine('C_POP', 'local', base + i) for i in reversed(range(n_args - on_stack))]
+
+    # locals the body may read before writing them start at 0, as in a called function;
+    # with branches, a write earlier in the body may not be on the way to a read
+    branches = any(line.command == 'C_LABEL' for line in commands)
+    initialized: set[int] = set()
+    for line in segment_accesses(commands, 'local'):
+        if line.command == 'C_PUSH' and line.arg2 not in initialized:
+            expansion += [ParsedLine('C_PUSH', 'constant', 0), ParsedLine('C_POP', 'local', base + n_args + line.arg2)]
+            initialized.add(line.arg2)
+        elif line.command == 'C_POP' and not branches:
+            initialized.add(line.arg2)
+
+    saved = sorted({line.arg2 for line in segment_accesses(commands, 'pointer') if line.command == 'C_POP'})
+    save_base = base + n_args + body.num_locals
+    for i, pointer in enumerate(saved):
+        expansion += [ParsedLine('C_PUSH', 'pointer', pointer), ParsedLine('C_POP', 'local', save_base + i)]
+
+    for line in commands:
+        match line.command, line.arg1:
+            case ('C_PUSH' | 'C_POP'), 'argument':
+                expansion.append(ParsedLine(line.command, 'local', base + line.arg2))
+            case ('C_PUSH' | 'C_POP'), 'local':
+                expansion.append(ParsedLine(line.command, 'local', base + n_args + line.arg2))
+            case ('C_LABEL' | 'C_GOTO' | 'C_IF'), label:
+                expansion.append(ParsedLine(line.command, f'{prefix}:{label}', None))
+            case 'C_RETURN', _:
+                expansion.append(ParsedLine('C_GOTO', prefix, None))
+            case _:
+                expansion.append(line)
+    if any(line.command == 'C_RETURN' for line in commands):
+        expansion.append(ParsedLine('C_LABEL', prefix, None))
+
+    # the return value stays on top
+    for i, pointer in enumerate(saved):
+        expansion += [ParsedLine('C_PUSH', 'local', save_base + i), ParsedLine('C_POP', 'pointer', pointer)]
+    return expansion
+
+
+def inline_functions(classes: list[VMClass], max_size: int = INLINE_MAX_SIZE) -> tuple[list[VMClass], list[list[str]]]:
+    # returns the classes with the calls inlined, and the callee of every inlined call per class;
+    # a caller whose calls have all been inlined is a leaf itself in the next round
+    inlined: list[list[str]] = [[] for _ in classes]
+    # numbers the call sites, their labels are unique in the whole program
+    site = 0
+    while True:
+        bodies: dict[str, InlineBody] = {}
+        for vm_class_name, commands in classes:
+            for function_name, lines in split_functions(commands):
+                if function_name is not None and (body := inline_body(vm_class_name, lines, max_size)) is not None:
+                    bodies[function_name] = body
+
+        changed = False
+        inlined_classes: list[VMClass] = []
+        for i, (vm_class_name, commands) in enumerate(classes):
+            class_commands: list[ParsedLine] = []
+            for function_name, lines in split_functions(commands):
+                if function_name is None:
+                    class_commands += lines
+                    continue
+                # the call sites share the locals added past the caller's own
+                base = lines[0].arg2
+                extra = 0
+                function_commands: list[ParsedLine] = []
+                for line in lines[1:]:
+                    body = bodies.get(line.arg1) if line.command == 'C_CALL' else None
+                    if body is not None and body.vm_class_name != vm_class_name and segment_accesses(body.commands, 'static'):
+                        body = None
+                    expansion = expand_call(body, line.arg2, base, f'{line.arg1}:{site}') if body is not None else None
+                    if expansion is None:
+                        function_commands.append(line)
+                        continue
+                    function_commands += expansion
+                    extra = max(extra, max((local.arg2 - base + 1 for local in segment_accesses(expansion, 'local')), default=0))
+                    inlined[i].append(line.arg1)
+                    site += 1
+                    changed = True
+                class_commands.append(ParsedLine('C_FUNCTION', function_name, base + extra) if extra else lines[0])
+                class_commands += function_commands
+            inlined_classes.append((vm_class_name, class_commands))
+
+        classes = inlined_classes
+        if not changed:
+            return classes, inlined
+
+
+@dataclass
+class Fragment:
+    name: str
+    asm: str
+    saved_per_pass: list[int]
+    cached: bool = False
+    # functions left out as unreachable from Sys.init
+    dropped: list[str] = field(default_factory=list)
+    # the callee of every call inlined into this file
+    inlined: list[str] = field(default_factory=list)
+
+
+def fragment_key(input_file_path: str, options: TranslatorOptions) -> str:
+    # the file name is part of the key, it names the statics and the generated labels
+    digest = hashlib.sha256(f'{TRANSLATOR_VERSION}\0{options}\0{Path(input_file_path).name}\0'.encode())
+    digest.update(Path(input_file_path).read_bytes())
+    return digest.hexdigest()
+
+
+def translate_files(input_file_paths: list[str], options: TranslatorOptions = TranslatorOptions(), jobs: int = 1, cache_dir: Path | None = None) -> list[Fragment]:
+    fragments: dict[str, Fragment] = {}
+    keys: dict[str, str] = {}
+
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for input_file_path in input_file_paths:
+            keys[input_file_path] = fragment_key(input_file_path, options)
+            cache_file = cache_dir / f'{keys[input_file_path]}.asm'
+            if cache_file.is_file():
+                fragments[input_file_path] = Fragment(Path(input_file_path).name, cache_file.read_text(), [], cached=True)
+
+    missing = [input_file_path for input_file_path in input_file_paths if input_file_path not in fragments]
+    if jobs > 1 and len(missing) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            translated = list(executor.map(translate_vm, missing, repeat(options)))
     else:
-        input_file_path = sys.argv[1]
-        path = Path(input_file_path)
-
-        if path.is_file():
-            if input_file_path.endswith('.vm'):
-                output_file_path = input_file_path[:-3] + '.asm'
-                write_init(output_file_path=output_file_path)
-                write_asm(input_file_path=input_file_path, output_file_path=output_file_path, write_mode='a')
-            else:
-                exit(1)
+        translated = [translate_vm(input_file_path, options) for input_file_path in missing]
+
+    for input_file_path, (asm, saved_per_pass) in zip(missing, translated):
+        fragments[input_file_path] = Fragment(Path(input_file_path).name, asm, saved_per_pass)
+        if cache_dir is not None:
+            cache_file = cache_dir / f'{keys[input_file_path]}.asm'
+            temp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+            temp_file.write_text(asm)
+            os.replace(temp_file, cache_file)
+
+    return [fragments[input_file_path] for input_file_path in input_file_paths]
+
+
+def translate_linked(input_file_paths: list[str], options: TranslatorOptions = TranslatorOptions(), jobs: int = 1, prune: bool = False, inline: bool = False) -> list[Fragment]:
+    # what becomes of a file depends on the whole program, so these fragments are not cached
+    classes = [(to_vm_class_name(input_file_path), list(read_commands(input_file_path))) for input_file_path in input_file_paths]
+    inlined: list[list[str]] = [[] for _ in classes]
+    dropped: list[list[str]] = [[] for _ in classes]
+    if inline:
+        classes, inlined = inline_functions(classes)
+    # after inlining, so that functions whose every call was inlined are dropped too
+    if prune:
+        classes, dropped = prune_functions(classes)
+    names = [vm_class_name for vm_class_name, _ in classes]
+    commands = [class_commands for _, class_commands in classes]
+    if jobs > 1 and len(classes) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            translated = list(executor.map(translate_commands, commands, names, repeat(options)))
+    else:
+        translated = [translate_commands(class_commands, name, options) for class_commands, name in zip(commands, names)]
+
+    return [
+        Fragment(Path(input_file_path).name, asm, saved_per_pass, dropped=class_dropped, inlined=class_inlined)
+        for input_file_path, (asm, saved_per_pass), class_dropped, class_inlined in zip(input_file_paths, translated, dropped, inlined)
+    ]
+
+
+def write_init(output_file_path: str, options: TranslatorOptions = TranslatorOptions()) -> list[int]:
+    asm, saved_per_pass = translate_init(options)
+    with open(output_file_path, 'w', buffering=OUTPUT_BUFFER_SIZE) as f:
+        f.write(asm)
+    return saved_per_pass
+    
+
+def write_asm(input_file_path: str, output_file_path: str, write_mode: WriteMode, options: TranslatorOptions = TranslatorOptions()) -> list[int]:
+    asm, saved_per_pass = translate_vm(input_file_path, options)
+    with open(output_file_path, write_mode, buffering=OUTPUT_BUFFER_SIZE) as f:
+        f.write(asm)
+    return saved_per_pass
+
+
+def write_program(input_file_paths: list[str], output_file_path: str, options: TranslatorOptions = TranslatorOptions(), jobs: int = 1, cache_dir: Path | None = None, prune: bool = False, inline: bool = False) -> list[Fragment]:
+    # the bootstrap comes first, then the files in the given order, whatever order the workers finish in
+    init_asm, init_saved_per_pass = translate_init(options)
+    fragments = [Fragment('bootstrap', init_asm, init_saved_per_pass)]
+    if prune or inline:
+        fragments += translate_linked(input_file_paths, options, jobs, prune, inline)
+    else:
+        fragments += translate_files(input_file_paths, options, jobs, cache_dir)
+
+    with open(output_file_path, 'w', buffering=OUTPUT_BUFFER_SIZE) as f:
+        for fragment in fragments:
+            f.write(fragment.asm)
+
+    return fragments
+
 
-        elif path.is_dir():
-            output_file_path = str(path) + '/' + path.name + '.asm'
-            write_init(output_file_path=output_file_path)
-            for p in path.rglob("*"):
-                if p.is_file() and p.suffix == '.vm':
-                    write_asm(input_file_path=p.as_posix(), output_file_path=output_file_path, write_mode='a')
+def print_peephole_stats(name: str, saved_per_pass: list[int]):
+    passes = ', '.join(f'pass {i + 1}: {saved}' for i, saved in enumerate(saved_per_pass))
+    print(f'peephole {name}: saved {sum(saved_per_pass)} instructions ({passes})')
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog='vm_translator.py')
+    arg_parser.add_argument('filename')
+    arg_parser.add_argument('--compact', action='store_true', help='route call/return through shared $$call/$$return stubs')
+    arg_parser.add_argument('--peephole', action='store_true', help='run the peephole optimizer over the emitted assembly')
+    arg_parser.add_argument('--shared-compare', action='store_true', help='emit eq/lt/gt as calls to shared comparison routines')
+    arg_parser.add_argument('--jobs', type=int, default=1, help='translate the .vm files of a directory on N worker processes')
+    arg_parser.add_argument('--cache', action='store_true', help='reuse the translation of unchanged files from .vmcache/ next to the output')
+    arg_parser.add_argument('--prune', action='store_true', help='emit only the functions reachable from Sys.init and list the ones left out (bypasses --cache)')
+    arg_parser.add_argument('--inline', action='store_true', help=f'replace the calls to leaf functions of at most {INLINE_MAX_SIZE} commands by their bodies (bypasses --cache)')
+    arg_parser.add_argument('--vmb', action='store_true', help='write the parsed commands of every .vm file to a .vmb next to it, later builds read those instead while the .vm is unchanged')
+    args = arg_parser.parse_args()
+    options = TranslatorOptions(compact=args.compact, optimize=args.peephole, shared_compare=args.shared_compare)
 
+    input_file_path = args.filename
+    path = Path(input_file_path)
+
+    if path.is_file():
+        if input_file_path.endswith('.vm') or input_file_path.endswith(VMB_SUFFIX):
+            output_file_path = input_file_path[:input_file_path.rindex('.')] + '.asm'
+            input_file_paths = [input_file_path]
         else:
-            print('Path does not exist.');
\ No newline at end of file
+            exit(1)
+
+    elif path.is_dir():
+        output_file_path = str(path) + '/' + path.name + '.asm'
+        # a .vmb stands in for a missing .vm
+        input_file_paths = sorted(p.as_posix() for p in path.rglob("*") if p.is_file() and (p.suffix == '.vm' or (p.suffix == VMB_SUFFIX and not p.with_suffix('.vm').is_file())))
+
+    else:
+        print('Path does not exist.');
+        exit(1)
+
+    if args.vmb:
+        for vm_file_path in input_file_paths:
+            if vm_file_path.endswith('.vm') and not has_current_vmb(vm_file_path):
+                write_vmb(vm_file_path)
+
+    cache_dir = Path(output_file_path).parent / CACHE_DIR_NAME if args.cache else None
+    fragments = write_program(input_file_paths, output_file_path, options, args.jobs, cache_dir, args.prune, args.inline)
+    if args.prune:
+        dropped = [fragment for fragment in fragments if fragment.dropped]
+        print(f'pruned {sum(len(fragment.dropped) for fragment in dropped)} unreachable functions')
+        for fragment in dropped:
+            print(f'    {fragment.name}: {", ".join(fragment.dropped)}')
+    if args.inline:
+        inlined = [fragment for fragment in fragments if fragment.inlined]
+        print(f'inlined {sum(len(fragment.inlined) for fragment in inlined)} calls')
+        for fragment in inlined:
+            print(f'    {fragment.name}: {", ".join(f"{function_name} x{count}" for function_name, count in Counter(fragment.inlined).items())}')
+    if args.peephole:
+        for fragment in fragments:
+            if not fragment.cached:
+                print_peephole_stats(fragment.name, fragment.saved_per_pass)
+    if args.cache:
+        cached = [fragment.name for fragment in fragments if fragment.cached]
+        print(f'cache: {len(cached)} reused, {len(input_file_paths) - len(cached)} translated')